@@ -0,0 +1,127 @@
+"""Dashboard counters maintained at write time.
+
+The counters are a flat ``{"dimension:value": count}`` dict persisted as the
+``analytics`` collection, so reading them never walks the publication or
+report lists.  Each entry contributes a handful of keys (see ``keys``); a
+handler that adds or edits an entry takes the keys before and after the
+change and passes both to ``Analytics.move``, which adjusts only those
+counts and returns the keys to save.
+
+``recount`` derives the same dict from scratch; ``rebuild`` replaces the
+counters with it and ``check`` lists where the two disagree.
+"""
+import re
+
+from storage import PUBLICATION_KINDS, index_fields
+
+# bump when keys() changes so stored counters are rebuilt on startup
+VERSION = 1
+
+DIMENSIONS = ('kind', 'institute', 'department', 'year', 'indexing', 'impact', 'reports')
+
+# indexing label -> patterns recognised in the free-text indexing field
+INDEXING = {
+    'Scopus': re.compile(r'scopus', re.I),
+    'UGC': re.compile(r'\bugc\b', re.I),
+    'WoS': re.compile(r'\bwos\b|web\s*of\s*science|\bsci\b|\bssci\b', re.I),
+}
+
+# (upper bound, label) for impact factor buckets, checked in order
+IMPACT_BUCKETS = ((1, '<1'), (2, '1-2'), (5, '2-5'), (float('inf'), '5+'))
+
+
+def impact_bucket(value):
+    try:
+        factor = float(str(value).strip())
+    except ValueError:
+        return 'none'
+    if factor <= 0:
+        return 'none'
+    for bound, label in IMPACT_BUCKETS:
+        if factor < bound:
+            return label
+
+
+def keys(name, entry):
+    """The counter keys an entry of collection name contributes to."""
+    if name == 'faculty_reports':
+        return [f'reports:{entry.get("status") or "pending"}']
+    if name not in PUBLICATION_KINDS:
+        return []
+    fields = index_fields(name, entry)
+    result = [
+        f'kind:{name}',
+        f'institute:{fields.get("institute") or "unknown"}',
+        f'department:{entry.get("department") or "unknown"}',
+        f'year:{fields.get("year") or "unknown"}',
+    ]
+    text = ' '.join(filter(None, [entry.get('indexing'), entry.get('journal_type')]))
+    labels = [label for label, pattern in INDEXING.items() if pattern.search(text)]
+    if 'UGC' not in labels and (entry.get('ugc_approved') or '').strip().lower() in ('yes', 'y', 'true', '1'):
+        labels.append('UGC')
+    result.extend(f'indexing:{label}' for label in labels or ['none'])
+    if name == 'research_papers':
+        result.append(f'impact:{impact_bucket(entry.get("impact_factor"))}')
+    return result
+
+
+def recount(collections):
+    # collections: {name: entries}; a full pass over everything
+    counts = {'version': VERSION}
+    for name, entries in collections.items():
+        for entry in entries:
+            for key in keys(name, entry):
+                counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+class Analytics:
+    def __init__(self, counts):
+        # the live analytics collection, shared with the store
+        self.counts = counts
+
+    def current(self):
+        return self.counts.get('version') == VERSION
+
+    def move(self, before, after):
+        # Take away the keys an entry contributed before a change and add
+        # the ones it contributes now; returns the keys whose count changed.
+        delta = {}
+        for key in before:
+            delta[key] = delta.get(key, 0) - 1
+        for key in after:
+            delta[key] = delta.get(key, 0) + 1
+        changed = []
+        for key, step in delta.items():
+            if not step:
+                continue
+            count = self.counts.get(key, 0) + step
+            if count > 0:
+                self.counts[key] = count
+            else:
+                self.counts.pop(key, None)
+            changed.append(key)
+        return changed
+
+    def rebuild(self, collections):
+        fresh = recount(collections)
+        self.counts.clear()
+        self.counts.update(fresh)
+
+    def check(self, collections):
+        # [(key, stored, recounted)] for every counter that is off
+        fresh = recount(collections)
+        return [(key, self.counts.get(key), fresh.get(key))
+                for key in sorted(set(self.counts) | set(fresh), key=str)
+                if self.counts.get(key) != fresh.get(key)]
+
+    def summary(self):
+        # {dimension: {value: count}}, largest first; proportional to the
+        # number of distinct values, not entries
+        grouped = {dimension: {} for dimension in DIMENSIONS}
+        for key, count in self.counts.items():
+            dimension, _, value = key.partition(':')
+            if dimension in grouped:
+                grouped[dimension][value] = count
+        return {dimension: dict(sorted(values.items(), key=lambda item: (-item[1], item[0])))
+                for dimension, values in grouped.items()}
@@ -0,0 +1,75 @@
+"""Encoding for the read-only JSON API (``/api/v1``, routes in app.py).
+
+A list response is ``{"data": [...], "next": cursor}``.  Reports and
+publications are paged by position rather than by offset: entries are only
+ever appended, so the cursor, the position after a page's last entry,
+still names the same place when entries are added, and the store starts
+reading there instead of skipping everything before it.  ``next`` is null
+on the last page.
+
+Responses are streamed.  Each entry is encoded on its own as it is read
+from the store (sqlite rows go out as stored when no projection is asked
+for), the text is sent in chunks of about ``CHUNK_SIZE`` bytes, and those
+are gzip-compressed on the fly when the client accepts it.
+"""
+import json
+import zlib
+
+CHUNK_SIZE = 64 * 1024
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def parse_fields(value):
+    # ?fields=title,status -> ('title', 'status'); None when not given
+    fields = tuple(dict.fromkeys(field.strip() for field in (value or '').split(',') if field.strip()))
+    return fields or None
+
+
+def project(entry, fields):
+    # the entry reduced to fields (those it has), or as it is
+    if fields is None:
+        return entry
+    return {field: entry[field] for field in fields if field in entry}
+
+
+def page(items, limit, encode=json.dumps):
+    """Yield the JSON text of one page.
+
+    items yields ``(cursor after the entry, entry)`` and encode turns an
+    entry into JSON text.  The page holds the first limit entries; one more
+    is read, but not encoded, to tell whether there is a next page.
+    """
+    yield '{"data":['
+    after = None
+    for count, (cursor, entry) in enumerate(items):
+        if count == limit:
+            yield f'],"next":{json.dumps(str(after))}}}'
+            return
+        yield f',{encode(entry)}' if count else encode(entry)
+        after = cursor
+    yield '],"next":null}'
+
+
+def chunks(texts, size=CHUNK_SIZE):
+    # the texts joined into byte chunks of about size bytes
+    buffer, length = [], 0
+    for text in texts:
+        buffer.append(text)
+        length += len(text)
+        if length >= size:
+            yield ''.join(buffer).encode()
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def gzipped(chunks):
+    # a gzip stream of chunks, compressed as they come
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
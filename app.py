@@ -1,120 +1,244 @@
-from flask import Flask, render_template, request, redirect, url_for, session
-from datetime import datetime
-import secrets
+from flask import (Flask, Response, abort, before_render_template, flash, g, jsonify, make_response,
+                   render_template, request, redirect, send_from_directory, stream_with_context,
+                   template_rendered, url_for, session)
+from werkzeug.utils import secure_filename
+from datetime import date, datetime, timedelta
+from bisect import bisect_right
+from functools import wraps
+import click
+from storage import PUBLICATION_KINDS, awaiting, index_fields, open_store, is_collection
+from approvals import ApprovalIndex, legacy_report_ids, new_report_id
+import analytics as counters
+import search as fulltext
+import profiles
+import dedup
+import questionbank
+import gradehistory
+import blobs
+import pagecache
+import aqar
+import api
+import assets
+import metrics
+from lazy import Lazy, LazyConfig
+import exporter
+import importer
+import io
 import json
+import mimetypes
+import atexit
+import secrets
+import threading
+import time
 import os
 
 app = Flask(__name__)
 # NOTE: keep a secure secret in production (env var or config)
 app.secret_key = 'dev-secret-change-me'
 
-# JSON-based data storage
+# JSON-based data storage. Saves go through a pluggable backend (see
+# storage.py); the default journal backend only appends the changed entries.
+# Pass the indexes (or, for GRADES, the keys) of entries edited in place so
+# they can be journaled; newly appended entries are picked up automatically.
+# Set IQAC_SHARED=1 when several worker processes serve the same data: writes
+# then take a file/database lock and every request first picks up changes
+# other workers made. Handlers wrap each read-modify-write in store.locked().
+# IQAC_DURABILITY=group|async hands saves to a background writer that batches
+# them (single-process deployments only); store.flush() forces it out.
+DATA_DIR = os.environ.get('IQAC_DATA_DIR', '.')
+
+# Per-process metrics, served to admins on /metrics (see metrics.py). Set
+# IQAC_METRICS_TOKEN to let a scraper in with "Authorization: Bearer <token>"
+# and IQAC_SLOW_REQUEST_MS to log slower requests with sampled stacks.
+registry = metrics.Registry()
+request_count = registry.counter('iqac_http_requests_total', 'Requests by endpoint, method and status.',
+                                 ('endpoint', 'method', 'status'))
+request_latency = registry.histogram('iqac_http_request_duration_seconds',
+                                     'Time to produce a response, by endpoint and method.', ('endpoint', 'method'))
+requests_in_flight = registry.gauge('iqac_http_requests_in_flight', 'Requests being handled.')
+storage_latency = registry.histogram('iqac_storage_duration_seconds',
+                                     'Time spent in store load/save calls, by collection.',
+                                     ('operation', 'collection'))
+render_latency = registry.histogram('iqac_template_render_duration_seconds', 'Template render time.',
+                                    ('template',))
+slow_requests = (metrics.SlowRequests(int(os.environ['IQAC_SLOW_REQUEST_MS']) / 1000)
+                 if os.environ.get('IQAC_SLOW_REQUEST_MS') else None)
+
+DURABILITY = os.environ.get('IQAC_DURABILITY', 'sync')
+store = metrics.TimedStore(open_store(os.environ.get('IQAC_STORAGE', 'journal'), DATA_DIR,
+                                      shared=os.environ.get('IQAC_SHARED') == '1', durability=DURABILITY),
+                           storage_latency)
+atexit.register(store.close)
+
+# Report text (content, auditor notes) lives in a content-addressed pack
+# beside the collections (see blobs.py); IQAC_BLOB_MMAP=1 reads it through
+# a memory map.
+bodies = blobs.BlobStore(os.path.join(DATA_DIR, 'report_bodies.pack'),
+                         mmap=os.environ.get('IQAC_BLOB_MMAP') == '1', sync=DURABILITY == 'sync')
+atexit.register(bodies.close)
+
+# Static files built by "flask build-assets" (see assets.py):
+# url_for('static', filename=...) points at their content-hashed copies,
+# which are served with far-future caching and gzip-compressed when accepted.
+static_assets = assets.Manifest(app.static_folder)
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+@app.url_defaults
+def built_static_file(endpoint, values):
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = static_assets.url(values['filename'])
+
+@app.route(f'{app.static_url_path}/{assets.DIST}/<path:filename>')
+def built_asset(filename):
+    directory = os.path.join(app.static_folder, assets.DIST)
+    # a built file's name changes with its content, so it never goes stale;
+    # the manifest keeps its name and is revalidated like any static file
+    immutable = filename != assets.MANIFEST
+    max_age = IMMUTABLE_MAX_AGE if immutable else None
+    if request.accept_encodings['gzip'] and os.path.isfile(os.path.join(directory, f'{filename}.gz')):
+        response = send_from_directory(directory, f'{filename}.gz', mimetype=mimetypes.guess_type(filename)[0],
+                                       max_age=max_age)
+        response.content_encoding = 'gzip'
+    else:
+        response = send_from_directory(directory, filename, max_age=max_age)
+    response.vary.add('Accept-Encoding')
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
+
+def storage_written():
+    # read at scrape time from the backend's own counters
+    written = dict(store.written, report_bodies=bodies.written)
+    return [('counter', 'iqac_storage_written_bytes_total', 'Bytes of serialized data written, by collection.',
+             ('collection',), {(name,): size for name, size in written.items()})]
+
+registry.collect(storage_written)
+
+# per-collection change counters; rendered pages are cached against them
+versions = pagecache.Versions()
+page_cache = pagecache.PageCache()
+
 def load_institutes():
-    try:
-        with open('institutes.json', 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+    return store.load('institutes', [])
 
-def save_institutes():
-    with open('institutes.json', 'w') as f:
-        json.dump(app.config['INSTITUTES'], f)
+def save_institutes(*changed):
+    store.save('institutes', app.config['INSTITUTES'], changed)
+    versions.bump('institutes')
 
 def load_faculty_details():
-    try:
-        with open('faculty_details.json', 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # store as a list of faculty entries
-        return []
-
-def save_faculty_details():
-    with open('faculty_details.json', 'w') as f:
-        json.dump(app.config['FACULTY_DETAILS'], f)
+    # the old append-only list, only read to fold it into faculty_profiles
+    return store.load('faculty_details', [])
+
+def load_faculty_profiles():
+    # one-off: the first read of empty profiles folds the old
+    # faculty_details list into them; afterwards the list is never read
+    with store.locked('faculty_profiles', 'faculty_details'):
+        keyed = store.load('faculty_profiles', {})
+        if not keyed:
+            folded = profiles.fold(load_faculty_details())
+            if folded:
+                keyed.update(folded)
+                store.save('faculty_profiles', keyed)
+    return keyed
+
+def save_faculty_profiles(*changed):
+    store.save('faculty_profiles', app.config['FACULTY_PROFILES'], changed)
+    versions.bump('faculty_profiles')
 
 def load_faculty_reports():
-    try:
-        with open('faculty_reports.json', 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+    reports = store.load('faculty_reports', [])
+    if isinstance(reports, list):
+        # sqlite reports got their ids when they were migrated
+        legacy_report_ids(reports)
+    return reports
 
-def save_faculty_reports():
-    with open('faculty_reports.json', 'w') as f:
-        json.dump(app.config['FACULTY_REPORTS'], f)
+def save_faculty_reports(*changed):
+    store.save('faculty_reports', app.config['FACULTY_REPORTS'], changed)
+    versions.bump('faculty_reports')
 
 def load_grades():
-    try:
-        with open('grades.json', 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
+    return store.load('grades', {})
+
+def save_grades(*changed):
+    store.save('grades', app.config['GRADES'], changed)
+    versions.bump('grades')
+
+def load_grade_history():
+    return store.load('grade_history', {})
 
-def save_grades():
-    with open('grades.json', 'w') as f:
-        json.dump(app.config['GRADES'], f)
+def save_grade_history(*changed):
+    store.save('grade_history', app.config['GRADE_HISTORY'], changed)
+    versions.bump('grade_history')
 
 def load_credits_data():
-    try:
-        with open('credits.json', 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+    return store.load('credits', [])
 
 def load_research_papers():
-    try:
-        with open('research_papers.json', 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+    return store.load('research_papers', [])
 
-def save_research_papers():
-    with open('research_papers.json', 'w') as f:
-        json.dump(app.config['RESEARCH_PAPERS'], f)
+def save_research_papers(*changed):
+    store.save('research_papers', app.config['RESEARCH_PAPERS'], changed)
+    versions.bump('research_papers')
 
 def load_conference_papers():
-    try:
-        with open('conference_papers.json', 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+    return store.load('conference_papers', [])
 
-def save_conference_papers():
-    with open('conference_papers.json', 'w') as f:
-        json.dump(app.config['CONFERENCE_PAPERS'], f)
+def save_conference_papers(*changed):
+    store.save('conference_papers', app.config['CONFERENCE_PAPERS'], changed)
+    versions.bump('conference_papers')
 
 def load_book_publications():
-    try:
-        with open('book_publications.json', 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+    return store.load('book_publications', [])
 
-def save_book_publications():
-    with open('book_publications.json', 'w') as f:
-        json.dump(app.config['BOOK_PUBLICATIONS'], f)
+def save_book_publications(*changed):
+    store.save('book_publications', app.config['BOOK_PUBLICATIONS'], changed)
+    versions.bump('book_publications')
 
 def load_book_chapters():
-    try:
-        with open('book_chapters.json', 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
-
-def save_book_chapters():
-    with open('book_chapters.json', 'w') as f:
-        json.dump(app.config['BOOK_CHAPTERS'], f)
-
-# load at startup
-app.config['INSTITUTES'] = load_institutes()
-app.config['FACULTY_DETAILS'] = load_faculty_details()
-app.config['FACULTY_REPORTS'] = load_faculty_reports()
-app.config['GRADES'] = load_grades()
-app.config['CREDITS'] = load_credits_data()
-app.config['RESEARCH_PAPERS'] = load_research_papers()
-app.config['CONFERENCE_PAPERS'] = load_conference_papers()
-app.config['BOOK_PUBLICATIONS'] = load_book_publications()
-app.config['BOOK_CHAPTERS'] = load_book_chapters()
+    return store.load('book_chapters', [])
+
+def save_book_chapters(*changed):
+    store.save('book_chapters', app.config['BOOK_CHAPTERS'], changed)
+    versions.bump('book_chapters')
+
+def load_analytics():
+    return store.load('analytics', {})
+
+def save_analytics(*changed):
+    store.save('analytics', app.config['ANALYTICS'], changed)
+    versions.bump('analytics')
+
+def load_search_index():
+    return store.load('search_index', {})
+
+def save_search_index(*changed):
+    store.save('search_index', app.config['SEARCH_INDEX'], changed)
+    versions.bump('search_index')
+
+def load_question_bank():
+    return store.load('question_bank', {})
+
+def save_question_bank(*changed):
+    store.save('question_bank', app.config['QUESTION_BANK'], changed)
+    versions.bump('question_bank')
+
+# each collection is loaded the first time its key is read (see lazy.py)
+app.config = LazyConfig(app.config, store, {
+    'INSTITUTES': load_institutes,
+    'FACULTY_PROFILES': load_faculty_profiles,
+    'FACULTY_REPORTS': load_faculty_reports,
+    'GRADES': load_grades,
+    'GRADE_HISTORY': load_grade_history,
+    'CREDITS': load_credits_data,
+    'RESEARCH_PAPERS': load_research_papers,
+    'CONFERENCE_PAPERS': load_conference_papers,
+    'BOOK_PUBLICATIONS': load_book_publications,
+    'BOOK_CHAPTERS': load_book_chapters,
+    'ANALYTICS': load_analytics,
+    'SEARCH_INDEX': load_search_index,
+    'QUESTION_BANK': load_question_bank,
+})
 
 
 # Default credentials for roles (development only - replace with secure store)
@@ -151,6 +275,223 @@ REQUIRED_APPROVERS = [
     'hod'
 ]
 
+def load_approval_index():
+    # index the reports by id and by the approvers they are still waiting on
+    index = ApprovalIndex(REQUIRED_APPROVERS)
+    index.build(app.config['FACULTY_REPORTS'])
+    return index
+
+approval_index = Lazy(store, load_approval_index)
+
+def load_questions():
+    # the audit question bank, seeded with the default questionnaire
+    bank = questionbank.QuestionBank(app.config['QUESTION_BANK'])
+    with store.locked('question_bank'):
+        changed = bank.seed()
+        if changed:
+            save_question_bank(*changed)
+    return bank
+
+question_bank = Lazy(store, load_questions)
+
+def load_grade_timeline():
+    # the grade history, started from the current grades if it is missing any
+    history = gradehistory.GradeHistory(app.config['GRADE_HISTORY'])
+    with store.locked('grades', 'grade_history'):
+        changed = history.seed(app.config['GRADES'])
+        if changed:
+            save_grade_history(*changed)
+    return history
+
+grade_history = Lazy(store, load_grade_timeline)
+
+def assign_grade(institute, grade, source):
+    # add a grade to the institute's history and make it the current one;
+    # call inside store.locked('grades', 'grade_history')
+    grade_history.record(institute, grade, datetime.now().isoformat(timespec='seconds'), source)
+    save_grade_history(institute)
+    app.config['GRADES'][institute] = grade
+    save_grades(institute)
+
+# collections the dashboard counters are derived from
+COUNTED = ('faculty_reports',) + tuple(PUBLICATION_KINDS)
+
+def counted_collections():
+    return {name: app.config[name.upper()] for name in COUNTED}
+
+def load_counters():
+    # Counters are kept up to date by the handlers; they are only derived
+    # from scratch when missing or computed by an older version.
+    stats = counters.Analytics(app.config['ANALYTICS'])
+    if not stats.current():
+        with store.locked('analytics', *COUNTED):
+            if not stats.current():
+                stats.rebuild(counted_collections())
+                save_analytics()
+    return stats
+
+analytics = Lazy(store, load_counters)
+
+def counting(*names):
+    # store.locked(*names, 'analytics') with the counters loaded first: a
+    # first-time rebuild inside the block would already count the entries
+    # the block is adding
+    analytics.get()
+    return store.locked('analytics', *names)
+
+def count_entry(name, entry, before=()):
+    # Update the counters for an entry just added (before=()) or changed
+    # (before=its keys beforehand); call inside counting(name).
+    changed = analytics.move(before, counters.keys(name, entry))
+    if changed:
+        save_analytics(*changed)
+
+def report_body(report):
+    # a report's text fields, read from its blob (reports saved before
+    # bodies were moved out still carry them inline)
+    key = report.get('body')
+    body = bodies.get(key) if key else report
+    return {field: body.get(field) or '' for field in blobs.FIELDS}
+
+def with_body(report):
+    return dict(report, **report_body(report))
+
+def set_report_body(report, **fields):
+    # store the report's text, with fields changed, as a blob; call inside
+    # store.locked('faculty_reports') and save the report after
+    body = dict(report_body(report), **fields)
+    report['body'] = bodies.put(body)
+    for field in blobs.FIELDS:
+        report.pop(field, None)
+
+def searchable(name, entry):
+    return with_body(entry) if name == 'faculty_reports' else entry
+
+def build_search_index():
+    # Postings come from the stored token lists; only entries the stored
+    # index has not seen yet are tokenized. Only search_index is locked:
+    # this may run inside a handler already holding other locks.
+    with store.locked('search_index'):
+        index = fulltext.SearchIndex(app.config['SEARCH_INDEX'], resolve=searchable)
+        changed = index.catch_up({name: app.config[name.upper()] for name in fulltext.FIELDS})
+        if changed is None:
+            save_search_index()
+        elif changed:
+            save_search_index(*changed)
+    return index
+
+search_index = Lazy(store, build_search_index)
+
+def index_entry(name, position, entry):
+    # (re)index an entry just stored; call inside store.locked(name, 'search_index')
+    save_search_index(*search_index.index(name, position, entry))
+
+def publication_collections():
+    return {name: app.config[name.upper()] for name in PUBLICATION_KINDS}
+
+def build_duplicates():
+    # exact-duplicate keys of every stored publication (see dedup.py)
+    index = dedup.DuplicateIndex()
+    index.build(publication_collections())
+    return index
+
+duplicates = Lazy(store, build_duplicates)
+
+def duplicate_message(original):
+    kind, position = original
+    title = index_fields(kind, app.config[kind.upper()][position]).get('title')
+    return (f'duplicates "{title}" in {dict(PUBLICATION_LABELS)[kind].lower()} '
+            '(same ISSN/ISBN and title, or same DOI/link)')
+
+def current_faculty():
+    # the profile this session last saved (the faculty login is
+    # shared, so the email is the only thing telling faculty apart)
+    return app.config['FACULTY_PROFILES'].get(session.get('faculty_email')) or {}
+
+def collection_changed(name, changed):
+    # keep the page versions and the report, search and duplicate indexes
+    # in step with writes from other workers; an index not built yet will
+    # start from fresh data
+    versions.bump(name)
+    if name == 'search_index':
+        if search_index.loaded():
+            search_index.sync(changed)
+        return
+    if name in PUBLICATION_KINDS:
+        if not duplicates.loaded():
+            return
+        entries = app.config[name.upper()]
+        if changed is None:
+            duplicates.build(publication_collections())
+            return
+        for position in changed:
+            if position < len(entries):
+                duplicates.add(name, position, entries[position])
+        return
+    if name != 'faculty_reports':
+        return
+    reports = app.config['FACULTY_REPORTS']
+    if changed is None and isinstance(reports, list):
+        # reloaded from disk: reports never saved since have no id there
+        legacy_report_ids(reports)
+    if not approval_index.loaded():
+        return
+    if changed is None:
+        approval_index.build(reports)
+        return
+    for position in changed:
+        if position < len(reports) and reports[position].get('id'):
+            approval_index.add(reports[position], position)
+
+store.subscribe(collection_changed)
+
+@app.before_request
+def start_request():
+    # registered first, so the time includes the other hooks
+    g.started = time.perf_counter()
+    requests_in_flight.inc()
+    if slow_requests:
+        slow_requests.start()
+
+@app.after_request
+def count_request(response):
+    endpoint = request.endpoint or 'unmatched'
+    request_latency.observe(time.perf_counter() - g.started, endpoint, request.method)
+    request_count.inc(endpoint, request.method, str(response.status_code))
+    return response
+
+@app.teardown_request
+def finish_request(exc):
+    # runs even when a handler raised (and for contexts pushed without a
+    # request, e.g. by the test client's session_transaction)
+    started = g.pop('started', None)
+    if started is None:
+        return
+    requests_in_flight.dec()
+    if slow_requests:
+        slow_requests.finish(f'{request.method} {request.full_path}', time.perf_counter() - started)
+
+def render_started(sender, template, context, **extra):
+    g.render_started = time.perf_counter()
+
+def render_finished(sender, template, context, **extra):
+    render_latency.observe(time.perf_counter() - g.pop('render_started'), template.name)
+
+before_render_template.connect(render_started, app)
+template_rendered.connect(render_finished, app)
+
+@app.before_request
+def refresh_collections():
+    if store.shared:
+        store.refresh_all()
+
+def find_report(report_id):
+    # (position, report) for a stable report id, or (None, None)
+    position = approval_index.position(report_id)
+    if position is None:
+        return None, None
+    return position, app.config['FACULTY_REPORTS'][position]
+
 @app.context_processor
 def inject_now():
     return {
@@ -162,6 +503,40 @@ def inject_now():
         'ROLE_DISPLAY': ROLE_DISPLAY
     }
 
+def cached_page(*names):
+    # Serve GET responses of a view from page_cache, keyed on the query, the
+    # session values templates show and the versions of the collections
+    # named (institutes are in every page's header); a conditional GET whose
+    # ETag/Last-Modified still holds gets a 304 without rendering anything.
+    names = names + ('institutes',)
+    def decorate(view):
+        @wraps(view)
+        def cached_view(*args, **kwargs):
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+            key = (request.endpoint, tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))),
+                   session.get('role'), bool(session.get('is_admin')), session.get('selected_institute'),
+                   datetime.now().year, versions.key(names))
+            response = Response(mimetype='text/html')
+            response.set_etag(page_cache.etag(key))
+            response.last_modified = versions.last_modified(names)
+            # private: the page depends on the session cookie
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            if response.make_conditional(request).status_code == 304:
+                return response
+            page = page_cache.get(key)
+            if page is None:
+                rendered = make_response(view(*args, **kwargs))
+                if rendered.status_code != 200:
+                    return rendered
+                page = rendered.get_data()
+                page_cache.put(key, page)
+            response.set_data(page)
+            return response
+        return cached_view
+    return decorate
+
 @app.route("/")
 def index():
     return render_template("index.html")
@@ -217,9 +592,10 @@ def admin():
         name = request.form.get('institute_name', '').strip()
         if name:
             # avoid duplicates
-            if name not in app.config['INSTITUTES']:
-                app.config['INSTITUTES'].append(name)
-                save_institutes()
+            with store.locked('institutes'):
+                if name not in app.config['INSTITUTES']:
+                    app.config['INSTITUTES'].append(name)
+                    save_institutes()
     return render_template('admin.html', institutes=app.config['INSTITUTES'])
 
 
@@ -228,45 +604,167 @@ def dashboard():
     # Allow access to any logged-in role or admin
     if not (session.get('is_admin') or session.get('role')):
         return redirect(url_for('login'))
-    return render_template('dashboard.html', role=session.get('role'), institutes=app.config['INSTITUTES'])
+    role = session.get('role')
+    return render_template('dashboard.html', role=role, institutes=app.config['INSTITUTES'],
+                           pending_approvals=approval_index.pending_count(role) if role in REQUIRED_APPROVERS else None,
+                           exports=EXPORTS if can_export() else None, academic_years=recent_academic_years(),
+                           stats=analytics.summary(), stat_labels=STAT_LABELS, grade_trend=grade_trend())
+
+# dashboard headings for the analytics dimensions
+STAT_LABELS = {
+    'kind': 'Publications by type',
+    'institute': 'Publications by institute',
+    'department': 'Publications by department',
+    'year': 'Publications by year',
+    'indexing': 'Publications by indexing',
+    'impact': 'Research papers by impact factor',
+    'reports': 'Faculty reports by status',
+}
+
+@app.route('/analytics.json')
+def analytics_json():
+    # the dashboard counters, read as-is (nothing is recounted)
+    if not (session.get('is_admin') or session.get('role')):
+        return jsonify(error='login required'), 401
+    return jsonify(analytics.summary())
+
+# roles that see every faculty profile (admins do too)
+PROFILE_VIEWERS = ['iqac_coordinators', 'director', 'university_iqac_coordination', 'registrar']
 
 @app.route('/faculty_details', methods=['GET', 'POST'])
 def faculty_details():
-    allowed_roles = ['faculty', 'iqac_coordinators', 'director', 'university_iqac_coordination', 'registrar']
+    allowed_roles = ['faculty'] + PROFILE_VIEWERS
     if session.get('role') not in allowed_roles and not session.get('is_admin'):
         return redirect(url_for('login'))
-    if request.method == 'POST':
-        if session.get('role') == 'faculty':
-            name = request.form.get('name', '').strip()
-            email = request.form.get('email', '').strip()
-            phone = request.form.get('phone', '').strip()
-            department = request.form.get('department', '').strip()
-            entry = {
-                'name': name,
-                'email': email,
-                'phone': phone,
-                'department': department,
-                'created_at': datetime.now().isoformat()
-            }
-            # append new faculty entry
-            if not isinstance(app.config.get('FACULTY_DETAILS'), list):
-                app.config['FACULTY_DETAILS'] = []
-            app.config['FACULTY_DETAILS'].append(entry)
-            save_faculty_details()
-            # redirect to avoid form resubmission and show saved values
-            return redirect(url_for('faculty_details'))
-    # choose the most recent entry to prefill the form for the faculty user
-    details = {}
-    if isinstance(app.config.get('FACULTY_DETAILS'), list) and app.config['FACULTY_DETAILS']:
-        details = app.config['FACULTY_DETAILS'][-1]
-    return render_template('faculty_details.html', details=details, all_details=app.config.get('FACULTY_DETAILS', []))
+    if request.method == 'POST' and session.get('role') == 'faculty':
+        details = {field: request.form.get(field, '').strip() for field in profiles.FIELDS}
+        if not profiles.profile_key(details['email']):
+            return render_template('faculty_details.html', details=details, versions=[], all_profiles=[],
+                                   message='Enter your email address; your details are saved under it.')
+        # upsert by email; an unchanged resubmission writes nothing
+        with store.locked('faculty_profiles'):
+            key = profiles.upsert(app.config['FACULTY_PROFILES'], details, datetime.now().isoformat())
+            if key:
+                save_faculty_profiles(key)
+        session['faculty_email'] = profiles.profile_key(details['email'])
+        # redirect to avoid form resubmission and show saved values
+        return redirect(url_for('faculty_details'))
+    # ?email= opens one profile by key, otherwise the session's own
+    key = profiles.profile_key(request.args.get('email'))
+    details = app.config['FACULTY_PROFILES'].get(key, {}) if key else current_faculty()
+    all_profiles = []
+    if session.get('is_admin') or session.get('role') in PROFILE_VIEWERS:
+        all_profiles = sorted(app.config['FACULTY_PROFILES'].values(), key=lambda p: p['name'].lower())
+    return render_template('faculty_details.html', details=details, all_profiles=all_profiles,
+                           versions=list(profiles.versions(details)) if details else [])
+
+REPORTS_PER_PAGE = 20
+REPORT_FILTERS = ('q', 'status', 'institute', 'date_from', 'date_to', 'awaiting')
+
+def report_filters(values):
+    # (REPORT_FILTERS values, store.page criteria) from request args or form
+    filters = {key: values.get(key, '').strip() for key in REPORT_FILTERS}
+    criteria = dict(title_like=filters['q'], status=filters['status'], institute=filters['institute'],
+                    date_from=filters['date_from'], date_to=filters['date_to'])
+    return filters, criteria
+
+def report_page():
+    # Filter and slice the reports before rendering so a page only ever
+    # carries REPORTS_PER_PAGE entries; newest reports come first.
+    filters, criteria = report_filters(request.args)
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    offset = (page - 1) * REPORTS_PER_PAGE
+    reports = app.config['FACULTY_REPORTS']
+    role = session.get('role')
+    if filters['awaiting'] and role in REQUIRED_APPROVERS:
+        # only this approver's open items, straight from the queue index
+        pending = approval_index.pending_for(role)
+        # a report another thread is still saving is indexed before this
+        # thread can read it (sqlite commits when the handler's block ends)
+        visible = len(reports)
+        pending = [i for i in pending if approval_index.position(i) < visible]
+        if any(criteria.values()):
+            queue = [reports[approval_index.position(i)] for i in pending]
+            total, window = store.page('faculty_reports', queue, REPORTS_PER_PAGE, offset, **criteria)
+            page_reports = [report for _, report in window]
+        else:
+            total = len(pending)
+            page_reports = [reports[approval_index.position(i)]
+                            for i in pending[offset:offset + REPORTS_PER_PAGE]]
+    else:
+        total, window = store.page('faculty_reports', reports, REPORTS_PER_PAGE, offset,
+                                   newest_first=True, **criteria)
+        page_reports = [report for _, report in window]
+    pagination = {
+        'page': page,
+        'pages': max((total + REPORTS_PER_PAGE - 1) // REPORTS_PER_PAGE, 1),
+        'total': total,
+        # only the filters in use, so page links carry them along
+        'filters': {k: v for k, v in filters.items() if v},
+    }
+    return page_reports, pagination
+
+def bulk_targets(role):
+    # The report ids a bulk decision form names: the ticked ones, or every
+    # report awaiting role that matches the filters it carries.
+    if request.form.get('scope') != 'matching':
+        return request.form.getlist('report_ids')
+    reports = app.config['FACULTY_REPORTS']
+    visible = len(reports)
+    pending = [i for i in approval_index.pending_for(role) if approval_index.position(i) < visible]
+    _, criteria = report_filters(request.form)
+    if not any(criteria.values()):
+        return pending
+    queue = [reports[approval_index.position(i)] for i in pending]
+    _, matches = store.page('faculty_reports', queue, **criteria)
+    return [report['id'] for _, report in matches]
+
+def decide_reports(role, report_ids, decision, notes):
+    # Apply one role's decision to many reports at once: one lock, one
+    # status update per report and one save per collection. Reports no
+    # longer awaiting the role are skipped. Returns [(report id, title,
+    # outcome)], outcome being the new status or why it was skipped.
+    auditor = role == 'auditor'
+    names = ('faculty_reports',) + (('search_index',) if auditor and notes else ())
+    # changed: position -> the live report, kept referenced until it is saved
+    results, changed, counts, indexed = [], {}, set(), []
+    with counting(*names):
+        for report_id in dict.fromkeys(report_ids):
+            position, report = find_report(report_id)
+            if report is None:
+                results.append((report_id, None, 'not found'))
+                continue
+            if not awaiting(report, role):
+                decided = role in (report.get('approvals') or {})
+                results.append((report_id, report['title'], 'already decided' if decided else 'no longer pending'))
+                continue
+            before = counters.keys('faculty_reports', report)
+            approval_index.decide(report, role, decision, notes)
+            if auditor and notes:
+                set_report_body(report, auditor_notes=notes)
+                indexed += search_index.index('faculty_reports', position, report)
+            counts.update(analytics.move(before, counters.keys('faculty_reports', report)))
+            changed[position] = report
+            results.append((report_id, report['title'], report['status']))
+        if changed:
+            save_faculty_reports(*changed)
+        if counts:
+            save_analytics(*counts)
+        if indexed:
+            save_search_index(*indexed)
+    return results
 
 @app.route('/faculty_reports', methods=['GET', 'POST'])
+@cached_page('faculty_reports')
 def faculty_reports():
     # Allow creation by faculty and approvals by approver roles
     allowed_roles = ['faculty'] + REQUIRED_APPROVERS
     if session.get('role') not in allowed_roles and not session.get('is_admin'):
         return redirect(url_for('login'))
+    bulk_results = None
     if request.method == 'POST':
         role = session.get('role')
         # Faculty can create reports
@@ -275,150 +773,242 @@ def faculty_reports():
             report_content = request.form.get('report_content', '').strip()
             if report_title and report_content:
                 report = {
+                    'id': new_report_id(),
                     'title': report_title,
-                    'content': report_content,
                     'date': datetime.now().isoformat(),
                     'status': 'pending',
-                    'auditor_notes': '',
-                    'approvals': {}  # track approvals per role
+                    'approvals': {},  # track approvals per role
+                    'institute': session.get('selected_institute'),
+                    # the profile (email) the faculty last saved
+                    'submitted_by': session.get('faculty_email'),
                 }
-                app.config['FACULTY_REPORTS'].append(report)
-                save_faculty_reports()
-        # Approver roles can approve/reject
+                with counting('faculty_reports', 'search_index'):
+                    set_report_body(report, content=report_content, auditor_notes='')
+                    app.config['FACULTY_REPORTS'].append(report)
+                    position = len(app.config['FACULTY_REPORTS']) - 1
+                    approval_index.add(report, position)
+                    save_faculty_reports()
+                    count_entry('faculty_reports', report)
+                    index_entry('faculty_reports', position, report)
+        # Approver roles can approve/reject, one report or many at once
+        elif role in REQUIRED_APPROVERS and request.form.get('bulk_action') in ('approve', 'reject'):
+            decision = 'approved' if request.form['bulk_action'] == 'approve' else 'rejected'
+            bulk_results = decide_reports(role, bulk_targets(role), decision,
+                                          request.form.get('bulk_notes', '').strip())
         elif role in REQUIRED_APPROVERS:
-            try:
-                report_index = int(request.form.get('report_index', '-1'))
-            except ValueError:
-                report_index = -1
             action = request.form.get('action')
             approver_notes = request.form.get('approver_notes', '').strip()
-            if 0 <= report_index < len(app.config['FACULTY_REPORTS']):
-                report = app.config['FACULTY_REPORTS'][report_index]
-                if 'approvals' not in report:
-                    report['approvals'] = {}
-                if action == 'approve':
-                    report['approvals'][role] = {'decision': 'approved', 'notes': approver_notes, 'time': datetime.now().isoformat()}
-                elif action == 'reject':
-                    report['approvals'][role] = {'decision': 'rejected', 'notes': approver_notes, 'time': datetime.now().isoformat()}
-                # recompute overall status
-                decisions = [v['decision'] for v in report.get('approvals', {}).values()]
-                if 'rejected' in decisions:
-                    report['status'] = 'rejected'
-                else:
-                    # check if all required approvers have approved
-                    if all(r in report.get('approvals', {}) and report['approvals'][r]['decision'] == 'approved' for r in REQUIRED_APPROVERS):
-                        report['status'] = 'approved'
-                    else:
-                        report['status'] = 'pending'
-                save_faculty_reports()
-    return render_template('faculty_reports.html', reports=app.config['FACULTY_REPORTS'], required_approvers=REQUIRED_APPROVERS)
+            with counting('faculty_reports'):
+                position, report = find_report(request.form.get('report_id', ''))
+                if report is not None and action in ('approve', 'reject'):
+                    # status follows incrementally from the index's counters
+                    decision = 'approved' if action == 'approve' else 'rejected'
+                    before = counters.keys('faculty_reports', report)
+                    approval_index.decide(report, role, decision, approver_notes)
+                    save_faculty_reports(position)
+                    count_entry('faculty_reports', report, before)
+    reports, pagination = report_page()
+    return render_template('faculty_reports.html', reports=reports, pagination=pagination,
+                           required_approvers=REQUIRED_APPROVERS, bulk_results=bulk_results)
 
 @app.route('/audit_reports', methods=['GET', 'POST'])
+@cached_page('faculty_reports')
 def audit_reports():
     if session.get('role') != 'auditor':
         return redirect(url_for('login'))
-    if request.method == 'POST':
-        report_index = int(request.form.get('report_index'))
+    bulk_results = None
+    if request.method == 'POST' and request.form.get('bulk_action') in ('approve', 'reject'):
+        decision = 'approved' if request.form['bulk_action'] == 'approve' else 'rejected'
+        bulk_results = decide_reports('auditor', bulk_targets('auditor'), decision,
+                                      request.form.get('bulk_notes', '').strip())
+    elif request.method == 'POST':
         status = request.form.get('status')
         notes = request.form.get('auditor_notes', '').strip()
-        if 0 <= report_index < len(app.config['FACULTY_REPORTS']):
-            report = app.config['FACULTY_REPORTS'][report_index]
-            report['auditor_notes'] = notes
-            # Record auditor's approval/rejection as part of approvals
-            if 'approvals' not in report:
-                report['approvals'] = {}
-            if status == 'approved':
-                report['approvals']['auditor'] = {'decision': 'approved', 'notes': notes, 'time': datetime.now().isoformat()}
-            elif status == 'rejected':
-                report['approvals']['auditor'] = {'decision': 'rejected', 'notes': notes, 'time': datetime.now().isoformat()}
-
-            # recompute overall status similar to faculty_reports
-            decisions = [v['decision'] for v in report.get('approvals', {}).values()]
-            if 'rejected' in decisions:
-                report['status'] = 'rejected'
-            else:
-                if all(r in report.get('approvals', {}) and report['approvals'][r]['decision'] == 'approved' for r in REQUIRED_APPROVERS):
-                    report['status'] = 'approved'
-                else:
-                    report['status'] = 'pending'
-
-            save_faculty_reports()
-    return render_template('audit_reports.html', reports=app.config['FACULTY_REPORTS'], required_approvers=REQUIRED_APPROVERS)
+        with counting('faculty_reports', 'search_index'):
+            position, report = find_report(request.form.get('report_id', ''))
+            if report is not None:
+                set_report_body(report, auditor_notes=notes)
+                before = counters.keys('faculty_reports', report)
+                # Record auditor's approval/rejection as part of approvals
+                if status in ('approved', 'rejected'):
+                    approval_index.decide(report, 'auditor', status, notes)
+                save_faculty_reports(position)
+                count_entry('faculty_reports', report, before)
+                index_entry('faculty_reports', position, report)
+    reports, pagination = report_page()
+    return render_template('audit_reports.html', reports=reports, pagination=pagination,
+                           required_approvers=REQUIRED_APPROVERS, bulk_results=bulk_results)
+
+@app.route('/faculty_reports/<report_id>')
+def report_detail(report_id):
+    # one report with its text, which the list pages leave out
+    allowed_roles = ['faculty'] + REQUIRED_APPROVERS
+    if session.get('role') not in allowed_roles and not session.get('is_admin'):
+        return redirect(url_for('login'))
+    _, report = find_report(report_id)
+    if report is None:
+        abort(404)
+    return render_template('report.html', report=with_body(report), required_approvers=REQUIRED_APPROVERS)
 
+# questions an auditor can add to one audit
+MAX_CUSTOM_QUESTIONS = 50
 
-@app.route('/audit_questionnaire/<int:report_index>', methods=['GET', 'POST'])
-def audit_questionnaire(report_index):
+@app.route('/audit_questionnaire/<report_id>', methods=['GET', 'POST'])
+def audit_questionnaire(report_id):
     # Only auditors may perform detailed audits
     if session.get('role') != 'auditor':
         return redirect(url_for('login'))
 
-    # basic bounds check
-    if report_index < 0 or report_index >= len(app.config['FACULTY_REPORTS']):
+    position, report = find_report(report_id)
+    if report is None:
         return redirect(url_for('audit_reports'))
 
-    # base questionnaire - extend or move to a config/file if needed
-    questions = [
-        "Are teaching-learning processes satisfactory?",
-        "Is documentation complete and up-to-date?",
-        "Are learning outcomes assessed regularly?",
-        "Is faculty development activity documented?",
-        "Is student feedback handled appropriately?"
-    ]
-
-    report = app.config['FACULTY_REPORTS'][report_index]
-
-    # If previous answers contained custom questions, include them in the questions list
-    if report.get('audit_answers'):
-        for qkey in report['audit_answers'].keys():
-            if qkey not in questions:
-                questions.append(qkey)
+    # the set the report was audited with, or the current one; answers
+    # saved before the question bank existed are keyed by question text
+    audit = report.get('audit')
+    if audit:
+        version = audit['version']
+        previous = {text: value for _, text, value in question_bank.answers(audit)}
+    else:
+        version = question_bank.current
+        previous = report.get('audit_answers') or {}
+    questions = [text for _, text in question_bank.questions(version)]
+    asked = len(questions)
+    questions += [text for text in previous if text not in questions]
 
     if request.method == 'POST':
-        # Support dynamic number of questions. Client will send total_questions and optional custom_qtext_{i}
-        total = int(request.form.get('total_questions', len(questions)))
-        # Append any newly created custom questions
-        for i in range(len(questions), total):
-            qtext = request.form.get(f'custom_qtext_{i}', '').strip()
-            if qtext:
-                questions.append(qtext)
-
-        answers = {}
-        for i, q in enumerate(questions):
-            val = request.form.get(f'q_{i}', '').upper()
-            if val not in ['Y', 'N']:
-                val = 'N'
-            answers[q] = val
+        # Support dynamic number of questions. Client will send total_questions and custom_qtext_{i}
+        # for every question past the set's own (earlier custom ones included)
+        try:
+            total = int(request.form.get('total_questions', len(questions)))
+        except ValueError:
+            total = len(questions)
+        total = max(0, min(total, len(questions) + MAX_CUSTOM_QUESTIONS))
+        values = ['Y' if request.form.get(f'q_{i}', '').upper() == 'Y' else 'N' for i in range(total)]
+        custom = [(request.form.get(f'custom_qtext_{i}', '').strip(), values[i]) for i in range(asked, total)]
+        custom = [(text, value) for text, value in custom if text]
 
         notes = request.form.get('auditor_notes', '').strip()
         grade = request.form.get('grade', '').strip()
         institute = request.form.get('institute', '').strip()
 
-        report['audit_answers'] = answers
-        report['auditor_notes'] = notes
-        report['audit_grade'] = grade
-        report['audited_institute'] = institute
-        save_faculty_reports()
+        with store.locked('faculty_reports', 'grades', 'grade_history', 'search_index', 'question_bank'):
+            changed = set()
+            if custom:
+                version = question_bank.extend(version, [text for text, _ in custom], changed)
+            answers = dict(zip([i for i, _ in question_bank.questions(version)], values[:asked]))
+            answers.update((question_bank.question_id(text, changed), value) for text, value in custom)
+            if changed:
+                save_question_bank(*changed)
+            position, report = find_report(report_id)
+            report['audit'] = {
+                'version': version,
+                'yes': questionbank.encode([answers.get(i, 'N') for i, _ in question_bank.questions(version)]),
+                'at': datetime.now().date().isoformat(),
+            }
+            report.pop('audit_answers', None)
+            set_report_body(report, auditor_notes=notes)
+            report['audit_grade'] = grade
+            report['audited_institute'] = institute
+            save_faculty_reports(position)
+            index_entry('faculty_reports', position, report)
 
-        # if auditor selected an institute and grade, update grades
-        if institute and grade:
-            app.config['GRADES'][institute] = grade
-            save_grades()
+            # if auditor selected an institute and grade, update grades
+            if institute and grade:
+                assign_grade(institute, grade, 'audit')
 
         return redirect(url_for('audit_reports'))
 
-    return render_template('audit_questionnaire.html', report=report, report_index=report_index, questions=questions, institutes=app.config['INSTITUTES'], grades=app.config['GRADES'])
+    return render_template('audit_questionnaire.html', report=with_body(report), questions=questions, asked=asked,
+                           previous=previous, institutes=app.config['INSTITUTES'], grades=app.config['GRADES'])
+
+def audited_reports(institute='', year=''):
+    # (institute, academic year, report) of every audited report, optionally
+    # only those of one institute or year
+    for _, report in store.scan('faculty_reports', app.config['FACULTY_REPORTS']):
+        audit = report.get('audit')
+        if not audit and not report.get('audit_answers'):
+            continue
+        audited_by = report.get('audited_institute') or report.get('institute') or 'unknown'
+        period = exporter.academic_year((audit or {}).get('at') or report.get('date')) or 'unknown'
+        if (institute and audited_by != institute) or (year and period != year):
+            continue
+        yield audited_by, period, report
+
+def audit_bitmaps(audited):
+    # [(institute, period, version, yes bitmap)] of audited_reports() items
+    audits, legacy = [], []
+    for audited_by, period, report in audited:
+        audit = report.get('audit')
+        if audit:
+            audits.append((audited_by, period, audit['version'], audit['yes']))
+        else:
+            legacy.append((audited_by, period, report['audit_answers']))
+    if legacy:
+        # answers saved before the question bank: their questions get ids
+        with store.locked('question_bank'):
+            changed = set()
+            audits += [(i, p) + question_bank.legacy(answers, changed) for i, p, answers in legacy]
+            if changed:
+                save_question_bank(*changed)
+    return audits
+
+@app.route('/audit_analytics')
+@cached_page('faculty_reports', 'question_bank')
+def audit_analytics():
+    # pass rate of every audit question per institute (or per academic year
+    # with ?by=year), optionally for one ?institute= or ?year=
+    if not can_export():
+        return redirect(url_for('login'))
+    by = 'year' if request.args.get('by') == 'year' else 'institute'
+    institute = request.args.get('institute', '')
+    year = request.args.get('year', '')
+    audits = audit_bitmaps(audited_reports(institute, year))
+    totals = questionbank.pass_rates(question_bank.data['sets'], audits)
+    columns, rows = questionbank.table(totals, 1 if by == 'year' else 0)
+    texts = question_bank.data['questions']
+    return render_template('audit_analytics.html', columns=columns, by=by, audits=len(audits),
+                           rows=[(texts[question], overall, cells) for question, overall, cells in rows],
+                           institute=institute, year=year, institutes=app.config['INSTITUTES'],
+                           academic_years=recent_academic_years())
 
 @app.route('/assign_grades', methods=['GET', 'POST'])
+@cached_page('grades', 'grade_history')
 def assign_grades():
+    # ?as_of=YYYY-MM-DD shows the grades in force on that date
     if session.get('role') != 'auditor':
         return redirect(url_for('login'))
     if request.method == 'POST':
         institute = request.form.get('institute')
         grade = request.form.get('grade')
         if institute and grade:
-            app.config['GRADES'][institute] = grade
-            save_grades()
-    return render_template('assign_grades.html', institutes=app.config['INSTITUTES'], grades=app.config['GRADES'])
+            with store.locked('grades', 'grade_history'):
+                assign_grade(institute, grade, 'assigned')
+    as_of = request.args.get('as_of', '').strip()
+    grades = app.config['GRADES']
+    if as_of:
+        grades = {institute: grade_history.as_of(institute, as_of) for institute in sorted(grade_history.data)}
+        grades = {institute: grade for institute, grade in grades.items() if grade}
+    return render_template('assign_grades.html', institutes=app.config['INSTITUTES'], grades=grades,
+                           as_of=as_of, history={institute: grade_history.entries(institute) for institute in grades})
+
+def academic_year_end(start):
+    # last day of the academic year starting in July of start
+    return (date(start + 1, exporter.ACADEMIC_YEAR_START, 1) - timedelta(days=1)).isoformat()
+
+def grade_trend(count=5):
+    # (column labels, {institute: [grade at the end of each of the last count
+    # academic years, then today's]}) for the dashboard
+    now = datetime.now()
+    # the academic year under way started this calendar year or the last
+    current = now.year if now.month >= exporter.ACADEMIC_YEAR_START else now.year - 1
+    starts = range(current - count, current)
+    years = [exporter.academic_year(str(year)) for year in starts]
+    ends = [academic_year_end(year) for year in starts]
+    series = grade_history.trend(ends)
+    for institute, grades in series.items():
+        grades.append(app.config['GRADES'].get(institute))
+    return years + ['Now'], series
 
 @app.route('/select_institute', methods=['POST'])
 def select_institute():
@@ -438,11 +1028,12 @@ def remove_institute():
         return redirect(url_for('login'))
     inst = request.form.get('institute')
     if inst and inst in app.config['INSTITUTES']:
-        try:
-            app.config['INSTITUTES'].remove(inst)
-            save_institutes()
-        except ValueError:
-            pass
+        with store.locked('institutes'):
+            try:
+                app.config['INSTITUTES'].remove(inst)
+                save_institutes()
+            except ValueError:
+                pass
         if session.get('selected_institute') == inst:
             session['selected_institute'] = None
     return redirect(request.referrer or url_for('admin'))
@@ -453,9 +1044,28 @@ def logout():
     return redirect(url_for('index'))
 
 @app.route('/credits')
+@cached_page('credits')
 def credits():
     return render_template('credits.html', credits=app.config['CREDITS'])
 
+def submit_publication(name, entry):
+    # store a submitted publication unless it duplicates a stored one
+    key = name.upper()
+    with counting(name, 'search_index'):
+        if not is_collection(app.config.get(key)):
+            app.config[key] = []
+        entries = app.config[key]
+        original = duplicates.claim(name, len(entries), entry)
+        if original:
+            flash(f'Not saved: this publication {duplicate_message(original)}.')
+            return redirect(url_for('dashboard'))
+        entries.append(entry)
+        store.save(name, entries, ())
+        versions.bump(name)
+        count_entry(name, entry)
+        index_entry(name, len(entries) - 1, entry)
+    return redirect(url_for('dashboard'))
+
 @app.route('/submit_research_paper', methods=['POST'])
 def submit_research_paper():
     if session.get('role') != 'faculty':
@@ -489,13 +1099,11 @@ def submit_research_paper():
         'indexing': indexing,
         'reviewed': reviewed,
         'link': link,
+        'institute': session.get('selected_institute'),
+        'department': current_faculty().get('department'),
         'submitted_at': datetime.now().isoformat()
     }
-    if not isinstance(app.config.get('RESEARCH_PAPERS'), list):
-        app.config['RESEARCH_PAPERS'] = []
-    app.config['RESEARCH_PAPERS'].append(entry)
-    save_research_papers()
-    return redirect(url_for('dashboard'))
+    return submit_publication('research_papers', entry)
 
 @app.route('/submit_conference_paper', methods=['POST'])
 def submit_conference_paper():
@@ -522,13 +1130,11 @@ def submit_conference_paper():
         'publication_details': publication_details,
         'indexing': indexing,
         'link': link,
+        'institute': session.get('selected_institute'),
+        'department': current_faculty().get('department'),
         'submitted_at': datetime.now().isoformat()
     }
-    if not isinstance(app.config.get('CONFERENCE_PAPERS'), list):
-        app.config['CONFERENCE_PAPERS'] = []
-    app.config['CONFERENCE_PAPERS'].append(entry)
-    save_conference_papers()
-    return redirect(url_for('dashboard'))
+    return submit_publication('conference_papers', entry)
 
 @app.route('/submit_book_publication', methods=['POST'])
 def submit_book_publication():
@@ -551,13 +1157,11 @@ def submit_book_publication():
         'isbn': isbn,
         'publication_date': publication_date,
         'link': link,
+        'institute': session.get('selected_institute'),
+        'department': current_faculty().get('department'),
         'submitted_at': datetime.now().isoformat()
     }
-    if not isinstance(app.config.get('BOOK_PUBLICATIONS'), list):
-        app.config['BOOK_PUBLICATIONS'] = []
-    app.config['BOOK_PUBLICATIONS'].append(entry)
-    save_book_publications()
-    return redirect(url_for('dashboard'))
+    return submit_publication('book_publications', entry)
 
 @app.route('/submit_book_chapter', methods=['POST'])
 def submit_book_chapter():
@@ -582,13 +1186,537 @@ def submit_book_chapter():
         'isbn': isbn,
         'publication_date': publication_date,
         'link': link,
+        'institute': session.get('selected_institute'),
+        'department': current_faculty().get('department'),
         'submitted_at': datetime.now().isoformat()
     }
-    if not isinstance(app.config.get('BOOK_CHAPTERS'), list):
-        app.config['BOOK_CHAPTERS'] = []
-    app.config['BOOK_CHAPTERS'].append(entry)
-    save_book_chapters()
-    return redirect(url_for('dashboard'))
+    return submit_publication('book_chapters', entry)
+
+PUBLICATION_LABELS = [
+    ('research_papers', 'Research papers'),
+    ('conference_papers', 'Conference papers'),
+    ('book_publications', 'Book publications'),
+    ('book_chapters', 'Book chapters'),
+]
+# rejected rows listed on the import page
+IMPORT_ERRORS_SHOWN = 200
+
+def import_publications_from(lines, fmt, kind=None, institute=None, department=None):
+    # Parse and validate the whole file first, then append every accepted
+    # entry that is not a duplicate (of a stored entry or an earlier row)
+    # and save each collection once. Returns ({collection: count},
+    # [(line, problem)]).
+    accepted, errors = importer.collect(lines, fmt, kind, institute, department)
+    imported, starts = {}, {}
+    with counting('search_index', *accepted):
+        changed, indexed = set(), set()
+        for name, rows in accepted.items():
+            key = name.upper()
+            if not is_collection(app.config.get(key)):
+                app.config[key] = []
+            start = starts[name] = len(app.config[key])
+            entries = []
+            for line, entry in rows:
+                original = duplicates.claim(name, start + len(entries), entry)
+                if original is None:
+                    entries.append(entry)
+                elif original[1] >= starts.get(original[0], original[1] + 1):
+                    errors.append((line, 'duplicates an earlier row of this file'))
+                else:
+                    errors.append((line, duplicate_message(original)))
+            imported[name] = len(entries)
+            if not entries:
+                # an empty delta would make the store rewrite the collection
+                continue
+            app.config[key].extend(entries)
+            store.save(name, app.config[key], ())
+            versions.bump(name)
+            for position, entry in enumerate(entries, start):
+                changed.update(analytics.move((), counters.keys(name, entry)))
+                indexed.update(search_index.index(name, position, entry))
+        if changed:
+            save_analytics(*changed)
+        if indexed:
+            save_search_index(*indexed)
+    errors.sort(key=lambda error: error[0])
+    return imported, errors
+
+@app.route('/import_publications', methods=['GET', 'POST'])
+def import_publications():
+    if session.get('role') != 'faculty':
+        return redirect(url_for('login'))
+    fmt = request.form.get('format', '')
+    kind = request.form.get('kind', 'research_papers')
+    imported, errors = None, []
+    upload = request.files.get('file')
+    if request.method == 'POST' and upload:
+        fmt = fmt or importer.guess_format(upload.filename)
+        # read the upload as text line by line instead of all at once
+        lines = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', errors='replace', newline='')
+        try:
+            imported, errors = import_publications_from(lines, fmt, kind, session.get('selected_institute'),
+                                                        current_faculty().get('department'))
+        except importer.ImportFormatError as exc:
+            imported, errors = {}, [(0, str(exc))]
+    return render_template('import_publications.html', kinds=PUBLICATION_LABELS, fmt=fmt, kind=kind,
+                           imported=imported, errors=errors[:IMPORT_ERRORS_SHOWN],
+                           error_count=len(errors))
+
+EXPORTS = PUBLICATION_LABELS + [('faculty_reports', 'Faculty reports')]
+
+def can_export():
+    return session.get('is_admin') or session.get('role') in REQUIRED_APPROVERS
+
+def recent_academic_years(count=6):
+    year = datetime.now().year
+    return [exporter.academic_year(f'{y}-{exporter.ACADEMIC_YEAR_START:02d}') for y in range(year, year - count, -1)]
+
+@app.route('/export/<name>.<fmt>')
+def export(name, fmt):
+    # ?institute=<name>&year=2023-24 (academic year); both optional
+    if not can_export():
+        return redirect(url_for('login'))
+    if name not in dict(EXPORTS) or fmt not in exporter.FORMATS:
+        abort(404)
+    institute = request.args.get('institute', '')
+    year = request.args.get('year', '')
+    if year and exporter.academic_year(year) != year:
+        abort(400)
+    entries = store.scan(name, app.config[name.upper()], institute=institute)
+    if name == 'faculty_reports':
+        entries = ((position, with_body(report)) for position, report in entries)
+    write, mimetype = exporter.FORMATS[fmt]
+    filename = secure_filename('_'.join(filter(None, [name, institute, year]))) + '.' + fmt
+    return Response(stream_with_context(write(name, exporter.rows(name, entries, year))),
+                    mimetype=mimetype, headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+# AQAR documents are written under DATA_DIR/aqar/<academic year or "all">/
+# (see aqar.py); one run at a time per process
+AQAR_DIR = os.path.join(DATA_DIR, 'aqar')
+aqar_lock = threading.Lock()
+
+def aqar_directory(year):
+    return os.path.join(AQAR_DIR, year or 'all')
+
+def aqar_documents(year=''):
+    # {institute: what its AQAR document shows} for every listed institute,
+    # for one academic year or all of them, in one pass over each collection
+    end = academic_year_end(int(year[:4])) if year else None
+    documents = {}
+    for institute in app.config['INSTITUTES']:
+        grades = grade_history.entries(institute)
+        if end:
+            grades = [entry for entry in grades if entry[0] <= gradehistory.upto(end)]
+        documents[institute] = {
+            'institute': institute, 'year': year, 'grades': grades, 'audits': [], 'questions': [],
+            'publications': [],
+            'grade': grade_history.as_of(institute, end) if end else app.config['GRADES'].get(institute),
+        }
+
+    audited = [(i, p, report) for i, p, report in audited_reports(year=year) if i in documents]
+    for institute, _, report in audited:
+        audit = report.get('audit')
+        body = report_body(report)
+        documents[institute]['audits'].append({
+            'title': report.get('title'), 'date': report.get('date'), 'status': report.get('status'),
+            'at': (audit or {}).get('at'), 'grade': report.get('audit_grade'),
+            'content': body['content'], 'notes': body['auditor_notes'],
+            'answers': ([(text, value) for _, text, value in question_bank.answers(audit)] if audit
+                        else list(report['audit_answers'].items())),
+        })
+    totals = questionbank.pass_rates(question_bank.data['sets'], audit_bitmaps(audited))
+    texts = question_bank.data['questions']
+    for question, _, cells in questionbank.table(totals, 0)[1]:
+        for institute, (passes, count) in cells.items():
+            documents[institute]['questions'].append((texts[question], passes, count))
+
+    for name, label in PUBLICATION_LABELS:
+        columns = aqar.COLUMNS[name]
+        found = {institute: [] for institute in documents}
+        for _, entry in store.scan(name, app.config[name.upper()]):
+            rows = found.get(index_fields(name, entry).get('institute'))
+            if rows is not None and (not year or exporter.academic_year(entry.get(exporter.DATES[name])) == year):
+                rows.append([entry.get(column) or '' for column in columns])
+        for institute, rows in found.items():
+            documents[institute]['publications'].append((name, label, rows))
+    return documents
+
+def run_aqar(documents, year, force):
+    # The background half of a run started on /aqar. It renders in this
+    # thread: spawned workers would import app.py again when it is run as a
+    # script, each opening the store.
+    try:
+        for _ in aqar.generate(documents, aqar_directory(year), workers=1, force=force):
+            pass
+    except Exception:
+        # recorded in the run's manifest entry too
+        app.logger.exception('AQAR run for %s failed', year or 'all years')
+    finally:
+        aqar_lock.release()
+
+@app.route('/aqar', methods=['GET', 'POST'])
+def aqar_reports():
+    # admins: generate every institute's AQAR document for ?year= (an
+    # academic year; all years when empty), follow the run and download them
+    if not session.get('is_admin'):
+        return redirect(url_for('login'))
+    year = request.values.get('year', '')
+    if year and exporter.academic_year(year) != year:
+        abort(400)
+    if request.method == 'POST':
+        if aqar_lock.acquire(blocking=False):
+            try:
+                documents = aqar_documents(year)
+            except BaseException:
+                aqar_lock.release()
+                raise
+            threading.Thread(target=run_aqar, args=(documents, year, bool(request.form.get('force'))),
+                             daemon=True).start()
+            flash(f'Generating AQAR documents for {len(documents)} institutes.')
+        else:
+            flash('AQAR documents are already being generated.')
+        return redirect(url_for('aqar_reports', year=year))
+    manifest = aqar.read_manifest(aqar_directory(year))
+    return render_template('aqar.html', year=year, academic_years=recent_academic_years(), run=manifest['run'],
+                           documents=sorted(manifest['documents'].items()))
+
+@app.route('/aqar/<year>/<name>')
+def aqar_document(year, name):
+    if not session.get('is_admin'):
+        return redirect(url_for('login'))
+    if year != 'all' and exporter.academic_year(year) != year:
+        abort(404)
+    return send_from_directory(AQAR_DIR, f'{year}/{name}')
+
+SEARCH_LABELS = dict(EXPORTS)
+
+def bearer(variable):
+    # whether the request carries "Authorization: Bearer <token>" with the
+    # token set in the environment variable (never, when it is unset)
+    token = os.environ.get(variable)
+    offered = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    return bool(token) and secrets.compare_digest(offered.encode(), token.encode())
+
+@app.route('/metrics')
+def metrics_page():
+    # admins, or a scraper holding IQAC_METRICS_TOKEN
+    if not (session.get('is_admin') or bearer('IQAC_METRICS_TOKEN')):
+        abort(403)
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/search')
+def search():
+    if not (session.get('is_admin') or session.get('role')):
+        return redirect(url_for('login'))
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('kind', '')
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    total, hits = search_index.search(query, REPORTS_PER_PAGE, (page - 1) * REPORTS_PER_PAGE,
+                                      names=[kind] if kind in SEARCH_LABELS else None)
+    results = []
+    for name, position, score in hits:
+        collection = app.config[name.upper()]
+        if position >= len(collection):
+            continue
+        entry = collection[position]
+        fields = index_fields(name, entry)
+        results.append({
+            'kind': SEARCH_LABELS[name],
+            'title': fields.get('title') or '(untitled)',
+            'by': fields.get('submitted_by') or entry.get('journal_name') or entry.get('conference_name'),
+            'institute': fields.get('institute'),
+            'year': fields.get('year'),
+            'status': entry.get('status') if name == 'faculty_reports' else None,
+            'link': (url_for('report_detail', report_id=entry['id']) if entry.get('id')
+                     else url_for('faculty_reports', q=fields.get('title'))) if name == 'faculty_reports' else None,
+        })
+    pagination = {
+        'page': page,
+        'pages': max((total + REPORTS_PER_PAGE - 1) // REPORTS_PER_PAGE, 1),
+        'total': total,
+        'filters': {k: v for k, v in (('q', query), ('kind', kind)) if v},
+    }
+    return render_template('search.html', query=query, kind=kind, kinds=EXPORTS,
+                           results=results, pagination=pagination)
+
+# Read-only JSON API for integrations (see api.py): approvers and admins
+# with a session, or a client sending "Authorization: Bearer <token>" with
+# IQAC_API_TOKEN. Lists take ?limit=, ?cursor= (the last page's "next"),
+# ?fields=a,b and the filters below (?q= matches titles; a report's
+# submitted_by is the submitting faculty's email).
+API_FILTERS = dict(
+    {name: ('institute', 'year', 'indexing') for name in PUBLICATION_KINDS},
+    faculty_reports=('status', 'institute', 'year', 'submitted_by', 'date_from', 'date_to', 'awaiting'),
+)
+
+def api_view(view):
+    # JSON errors: 401 without a session or token, 400 for a bad parameter
+    @wraps(view)
+    def checked(*args, **kwargs):
+        if not (can_export() or bearer('IQAC_API_TOKEN')):
+            return jsonify(error='login or API token required'), 401
+        try:
+            return view(*args, **kwargs)
+        except ValueError as exc:
+            return jsonify(error=str(exc)), 400
+    return checked
+
+def api_response(texts):
+    # stream texts, gzip-compressed for clients that accept it
+    chunks = api.chunks(texts)
+    headers = {'Vary': 'Accept-Encoding'}
+    if request.accept_encodings['gzip']:
+        chunks = api.gzipped(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(chunks), mimetype='application/json', headers=headers)
+
+def api_limit():
+    limit = request.args.get('limit', str(api.DEFAULT_LIMIT))
+    if not limit.isdigit() or not 1 <= int(limit) <= api.MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {api.MAX_LIMIT}')
+    return int(limit)
+
+def api_start():
+    # the position ?cursor= names
+    cursor = request.args.get('cursor', '0')
+    if not cursor.isdigit():
+        raise ValueError('cursor must be the "next" value of a previous page')
+    return int(cursor)
+
+def api_criteria(name):
+    criteria = {key: request.args.get(key, '').strip() for key in API_FILTERS[name]}
+    criteria['title_like'] = request.args.get('q', '').strip()
+    if criteria.get('submitted_by'):
+        criteria['submitted_by'] = profiles.profile_key(criteria['submitted_by'])
+    if criteria['year']:
+        if not criteria['year'].isdigit():
+            raise ValueError('year must be a number')
+        criteria['year'] = int(criteria['year'])
+    return criteria
+
+def api_report(report, fields):
+    # the report's text is only read from its blob when asked for
+    if fields is None or not set(fields).isdisjoint(blobs.FIELDS):
+        report = with_body(report)
+    return json.dumps(api.project(report, fields))
+
+def api_list(name):
+    fields = api.parse_fields(request.args.get('fields'))
+    start, limit = api_start(), api_limit()
+    criteria = api_criteria(name)
+    data = app.config[name.upper()]
+    if name == 'faculty_reports':
+        encode = lambda report: api_report(report, fields)
+    elif fields is None:
+        # stored entries as they are (sqlite rows without decoding them)
+        items = ((i + 1, text) for i, text in store.scan_text(name, data, start, **criteria))
+        return api_response(api.page(items, limit, str))
+    else:
+        encode = lambda entry: json.dumps(api.project(entry, fields))
+    items = ((i + 1, entry) for i, entry in store.scan(name, data, start, **criteria))
+    return api_response(api.page(items, limit, encode))
+
+@app.route('/api/v1/reports')
+@api_view
+def api_reports():
+    return api_list('faculty_reports')
+
+@app.route('/api/v1/reports/<report_id>')
+@api_view
+def api_report_detail(report_id):
+    _, report = find_report(report_id)
+    if report is None:
+        return jsonify(error='no such report'), 404
+    return api_response(['{"data":', api_report(report, api.parse_fields(request.args.get('fields'))), '}'])
+
+@app.route('/api/v1/publications/<kind>')
+@api_view
+def api_publications(kind):
+    if kind not in PUBLICATION_KINDS:
+        return jsonify(error=f'kind must be one of {", ".join(PUBLICATION_KINDS)}'), 404
+    return api_list(kind)
+
+@app.route('/api/v1/institutes')
+@api_view
+def api_institutes():
+    fields = api.parse_fields(request.args.get('fields'))
+    items = ((None, {'name': name}) for name in app.config['INSTITUTES'])
+    return api_response(api.page(items, None, lambda entry: json.dumps(api.project(entry, fields))))
+
+@app.route('/api/v1/grades')
+@api_view
+def api_grades():
+    # every institute's current grade, or with ?as_of=YYYY-MM-DD the one in
+    # force then
+    fields = api.parse_fields(request.args.get('fields'))
+    as_of = request.args.get('as_of', '').strip()
+    if as_of:
+        grades = {institute: grade_history.as_of(institute, as_of) for institute in sorted(grade_history.data)}
+    else:
+        grades = app.config['GRADES']
+    items = ((None, {'institute': institute, 'grade': grade}) for institute, grade in grades.items() if grade)
+    return api_response(api.page(items, None, lambda entry: json.dumps(api.project(entry, fields))))
+
+@app.route('/api/v1/faculty')
+@api_view
+def api_faculty():
+    # profiles in email order, paged by email; ?department= filters
+    if not (session.get('is_admin') or session.get('role') in PROFILE_VIEWERS or bearer('IQAC_API_TOKEN')):
+        return jsonify(error='faculty profiles are not shown to this role'), 403
+    fields = api.parse_fields(request.args.get('fields'))
+    department = request.args.get('department', '').strip()
+    limit = api_limit()
+    profiles_by_email = app.config['FACULTY_PROFILES']
+    keys = sorted(profiles_by_email)
+    keys = keys[bisect_right(keys, request.args.get('cursor', '')):]
+    items = ((key, profiles_by_email[key]) for key in keys
+             if key in profiles_by_email and (not department or profiles_by_email[key].get('department') == department))
+    return api_response(api.page(items, limit, lambda entry: json.dumps(api.project(entry, fields))))
+
+@app.cli.command('import-publications')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'bibtex']), help='Default: from the file extension.')
+@click.option('--kind', type=click.Choice(list(importer.FIELDS)), default='research_papers',
+              show_default=True, help='Collection a CSV file is imported into.')
+@click.option('--institute', help='Institute recorded on every imported entry.')
+@click.option('--department', help='Department recorded on every imported entry.')
+def import_publications_command(path, fmt, kind, institute, department):
+    """Bulk-import publications from a CSV or BibTeX file."""
+    with open(path, encoding='utf-8-sig', errors='replace', newline='') as lines:
+        try:
+            imported, errors = import_publications_from(lines, fmt or importer.guess_format(path), kind,
+                                                        institute, department)
+        except importer.ImportFormatError as exc:
+            raise click.ClickException(str(exc))
+    for line, problem in errors:
+        click.echo(f'{path}:{line}: {problem}', err=True)
+    for name, count in imported.items():
+        click.echo(f'{name}: {count}')
+    click.echo(f'{sum(imported.values())} imported, {len(errors)} rejected')
+
+@app.cli.command('rebuild-analytics')
+def rebuild_analytics_command():
+    """Recount the dashboard counters from every report and publication."""
+    with store.locked('analytics', *COUNTED):
+        analytics.rebuild(counted_collections())
+        save_analytics()
+    click.echo(f'{len(app.config["ANALYTICS"]) - 1} counters rebuilt')
+
+@app.cli.command('check-analytics')
+def check_analytics_command():
+    """Compare the dashboard counters with a full recount; exits 1 on drift."""
+    with store.locked('analytics', *COUNTED):
+        drift = analytics.check(counted_collections())
+    for key, stored, recounted in drift:
+        click.echo(f'{key}: stored {stored}, recounted {recounted}')
+    if drift:
+        raise click.ClickException(f'{len(drift)} counters differ; run "flask rebuild-analytics"')
+    click.echo('analytics consistent')
+
+@app.cli.command('compact-audit-answers')
+def compact_audit_answers_command():
+    """Store the answers of audits made before the question bank as bitmaps."""
+    with store.locked('faculty_reports', 'question_bank'):
+        reports = app.config['FACULTY_REPORTS']
+        changed, compacted = set(), {}
+        for position, report in store.scan('faculty_reports', reports):
+            if report.get('audit_answers') and not report.get('audit'):
+                # the live entry, kept referenced until it is saved
+                report = compacted[position] = reports[position]
+                version, yes = question_bank.legacy(report.pop('audit_answers'), changed)
+                report['audit'] = {'version': version, 'yes': yes, 'at': report.get('date', '')[:10]}
+        if changed:
+            save_question_bank(*changed)
+        if compacted:
+            save_faculty_reports(*compacted)
+    click.echo(f'{len(compacted)} audits compacted')
+
+def move_report_bodies():
+    # moves report text still stored inline into the blob pack; returns how many
+    with store.locked('faculty_reports'):
+        reports = app.config['FACULTY_REPORTS']
+        moved = {}
+        for position, report in store.scan('faculty_reports', reports):
+            if 'body' not in report:
+                # the live entry, kept referenced until it is saved
+                report = moved[position] = reports[position]
+                set_report_body(report)
+        if moved:
+            save_faculty_reports(*moved)
+    return len(moved)
+
+@app.cli.command('move-report-bodies')
+def move_report_bodies_command():
+    """Move report text still stored inline in faculty_reports into the blob pack."""
+    click.echo(f'{move_report_bodies()} report bodies moved')
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Re-tokenize every report and publication into the search index."""
+    with store.locked('search_index', *fulltext.FIELDS):
+        app.config['SEARCH_INDEX'].pop('#version', None)
+        search_index.catch_up({name: app.config[name.upper()] for name in fulltext.FIELDS})
+        save_search_index()
+    click.echo(f'{len(search_index.docs)} documents indexed')
+
+@app.cli.command('generate-aqar')
+@click.option('--year', default='', help='Academic year, e.g. 2023-24. Default: all years.')
+@click.option('--workers', type=click.IntRange(1), help='Processes rendering documents. Default: one per CPU.')
+@click.option('--force', is_flag=True, help='Render every document, even those whose inputs are unchanged.')
+def generate_aqar_command(year, workers, force):
+    """Write one AQAR document per institute under <data dir>/aqar/<year>/."""
+    if year and exporter.academic_year(year) != year:
+        raise click.BadParameter('expected an academic year such as 2023-24', param_hint='--year')
+    start = time.perf_counter()
+    documents = aqar_documents(year)
+    outcomes = aqar.generate(documents, aqar_directory(year), workers, force)
+    for done, (institute, outcome) in enumerate(outcomes, 1):
+        click.echo(f'[{done}/{len(documents)}] {institute}: {outcome}')
+    click.echo(f'{len(documents)} institutes in {time.perf_counter() - start:.1f}s; '
+               f'documents in {aqar_directory(year)}')
+
+@app.cli.command('build-assets')
+@click.option('--clean', is_flag=True, help='Also remove built files of earlier builds.')
+def build_assets_command(clean):
+    """Write content-hashed, precompressed copies of the static files to static/dist/."""
+    manifest = assets.build(app.static_folder)
+    for name, built in sorted(manifest['files'].items()):
+        click.echo(f'{name} -> {assets.DIST}/{built}')
+    if clean:
+        click.echo(f'{assets.clean(app.static_folder, manifest)} old files removed')
+    if assets.Image is None:
+        click.echo('Pillow is not installed: JPEG images were copied without re-encoding them as progressive')
+
+@app.cli.command('find-duplicates')
+@click.option('--threshold', type=click.FloatRange(0, 1), default=dedup.THRESHOLD, show_default=True,
+              help='Title similarity (shingle Jaccard) at which titles count as near-duplicates.')
+def find_duplicates_command(threshold):
+    """List groups of duplicate publications for review; nothing is removed."""
+    with store.locked(*PUBLICATION_KINDS):
+        collections = publication_collections()
+        groups = dedup.clusters(collections, threshold)
+        for number, (members, reasons) in enumerate(groups, 1):
+            click.echo(f'#{number} ({", ".join(sorted(reasons))})')
+            for name, position in members:
+                entry = collections[name][position]
+                click.echo(f'  {name}[{position}] {index_fields(name, entry).get("title")!r} '
+                           f'{entry.get("submitted_at") or ""}')
+    click.echo(f'{len(groups)} duplicate groups, {sum(len(members) for members, _ in groups)} entries')
+
+@app.cli.command('migrate-json')
+@click.option('--replace', is_flag=True, help='Delete an existing (or malformed) database first.')
+def migrate_json_command(replace):
+    """Import the JSON collections into the SQLite database (IQAC_STORAGE=sqlite)."""
+    from sqlite_store import migrate_json
+    # the app's own connection would keep the old file open (and, on
+    # Windows, undeletable)
+    store.close()
+    counts = migrate_json(DATA_DIR, replace=replace)
+    for name, count in counts.items():
+        click.echo(f'{name}: {count}')
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,98 @@
+"""In-memory indexes over the faculty reports.
+
+``ApprovalIndex`` maps stable report ids to their position in the collection
+and keeps, per approver role, the set of reports still awaiting that role's
+decision.  Each report's overall status is derived from two counters (required
+approvals received, rejections received) that are adjusted as decisions come
+in, so neither a decision nor an approver's queue view walks all reports.
+"""
+from datetime import datetime
+import hashlib
+import json
+import uuid
+
+
+def new_report_id():
+    return uuid.uuid4().hex[:12]
+
+
+def legacy_report_ids(reports):
+    # Give reports saved before ids existed one derived from their position
+    # and contents, so every worker (and every restart) derives the same id
+    # and the id is stored with the report whenever it is next saved;
+    # reading the reports never writes them.
+    for position, report in enumerate(reports):
+        if not report.get('id'):
+            text = json.dumps([position, report], sort_keys=True)
+            report['id'] = hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+class ApprovalIndex:
+    def __init__(self, required_approvers):
+        self.required = list(required_approvers)
+        self.positions = {}
+        # report id -> [required approvals, rejections]
+        self.tally = {}
+        # role -> {report id: None}, insertion ordered (oldest first)
+        self.queues = {role: {} for role in self.required}
+
+    def build(self, reports):
+        self.positions.clear()
+        self.tally.clear()
+        for queue in self.queues.values():
+            queue.clear()
+        for position, report in enumerate(reports):
+            self.add(report, position)
+
+    def add(self, report, position):
+        report_id = report['id']
+        self.positions[report_id] = position
+        approvals = report.get('approvals') or {}
+        self.tally[report_id] = [
+            sum(1 for r in self.required if approvals.get(r, {}).get('decision') == 'approved'),
+            sum(1 for a in approvals.values() if a.get('decision') == 'rejected'),
+        ]
+        self.requeue(report)
+
+    def position(self, report_id):
+        return self.positions.get(report_id)
+
+    def pending_for(self, role):
+        # ids awaiting this role, newest first
+        return list(reversed(self.queues.get(role, {})))
+
+    def pending_count(self, role):
+        return len(self.queues.get(role, ()))
+
+    def status(self, report_id):
+        approved, rejected = self.tally[report_id]
+        if rejected:
+            return 'rejected'
+        if approved == len(self.required):
+            return 'approved'
+        return 'pending'
+
+    def decide(self, report, role, decision, notes=''):
+        # Record role's approve/reject decision on report and update its
+        # status from the counters.
+        approvals = report.setdefault('approvals', {})
+        tally = self.tally[report['id']]
+        previous = approvals.get(role, {}).get('decision')
+        for value, sign in ((previous, -1), (decision, 1)):
+            if value == 'rejected':
+                tally[1] += sign
+            elif value == 'approved' and role in self.required:
+                tally[0] += sign
+        approvals[role] = {'decision': decision, 'notes': notes, 'time': datetime.now().isoformat()}
+        report['status'] = self.status(report['id'])
+        self.requeue(report)
+
+    def requeue(self, report):
+        report_id = report['id']
+        waiting = report.get('status', 'pending') == 'pending'
+        approvals = report.get('approvals') or {}
+        for role, queue in self.queues.items():
+            if waiting and role not in approvals:
+                queue[report_id] = None
+            else:
+                queue.pop(report_id, None)
@@ -0,0 +1,178 @@
+"""Consolidated AQAR documents, one standalone HTML file per institute.
+
+The app gathers what each institute's document shows (its grade, audited
+reports with their questionnaire answers, question pass rates and
+publications) in one pass over each collection; ``generate`` renders the
+documents from ``templates/aqar_report.html``, one task per institute, and
+writes them to a directory with a ``manifest.json``.  Several workers render
+in a pool of spawned processes, which only import this module; one worker
+renders in the calling thread.
+
+Each document's manifest entry holds a digest of its inputs and of the
+template, so a later run skips institutes whose documents would come out
+the same.  The manifest is rewritten as each document is written, together
+with the run's progress, so an interrupted run keeps the documents it
+finished and any worker can show how far a run has got.
+
+Documents embed their styles and carry a print stylesheet: a browser's
+"Save as PDF" turns one into a PDF without a PDF library on the server.
+"""
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing
+import os
+from datetime import datetime
+
+import jinja2
+from werkzeug.utils import secure_filename
+
+from storage import atomic_write
+
+TEMPLATES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+TEMPLATE = 'aqar_report.html'
+MANIFEST = 'manifest.json'
+
+# publication fields listed in the document, per collection
+COLUMNS = {
+    'research_papers': ('title', 'authors', 'journal_name', 'year', 'isbn_issn', 'indexing', 'impact_factor'),
+    'conference_papers': ('title', 'authors', 'conference_name', 'conference_date', 'venue', 'indexing'),
+    'book_publications': ('book_title', 'faculty_members', 'publisher_details', 'isbn', 'publication_date'),
+    'book_chapters': ('chapter_title', 'book_title', 'faculty_members', 'publisher_details', 'isbn',
+                      'publication_date'),
+}
+
+# a worker's template environment, made on its first task
+environment = None
+
+
+def filename(institute):
+    # a file name per institute; the digest keeps names that only differ in
+    # characters secure_filename drops apart
+    digest = hashlib.blake2b(institute.encode(), digest_size=3).hexdigest()
+    return f'{secure_filename(institute) or "institute"}-{digest}.html'
+
+
+def fingerprint(inputs, template):
+    text = json.dumps(inputs, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(f'{template}\n{text}'.encode(), digest_size=16).hexdigest()
+
+
+def template_digest():
+    with open(os.path.join(TEMPLATES, TEMPLATE), 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def read_manifest(directory):
+    # {'documents': {institute: {'file', 'hash', 'generated'}}, 'run': {...}}
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'documents': {}, 'run': None}
+
+
+def render(directory, name, inputs, generated):
+    # runs in a pool worker: render one document and write it to directory/name
+    global environment
+    if environment is None:
+        environment = jinja2.Environment(loader=jinja2.FileSystemLoader(TEMPLATES), autoescape=True)
+    html = environment.get_template(TEMPLATE).render(columns=COLUMNS, generated=generated, **inputs)
+    atomic_write(os.path.join(directory, name), html)
+    return name
+
+
+def pool(workers):
+    # Spawned, never forked: forking a process with other threads running
+    # (a server, the store's writer) can copy a held lock into the child.
+    # Tasks name render() in this module, so that is all a worker imports.
+    context = multiprocessing.get_context('spawn')
+    return concurrent.futures.ProcessPoolExecutor(workers, mp_context=context)
+
+
+def generate(documents, directory, workers=None, force=False):
+    """Write the documents that changed since the last run.
+
+    documents maps each institute to the inputs its template renders.
+    Yields ``(institute, outcome)`` as each is settled, outcome being
+    'written', 'unchanged' or 'failed: <error>'; failed ones are retried on
+    the next run.  Documents of institutes no longer listed are removed.
+    A run that stops on an error records it as the run's ``error``.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = read_manifest(directory)
+    run = manifest['run'] = {'started': datetime.now().isoformat(timespec='seconds'), 'finished': None,
+                             'total': len(documents), 'done': 0, 'written': 0, 'failed': 0, 'error': None}
+    try:
+        yield from run_documents(documents, directory, workers, force, manifest)
+    except BaseException as exc:
+        if isinstance(exc, GeneratorExit) and run['finished']:
+            raise
+        # finished, so the admin page stops waiting for it
+        run['finished'] = datetime.now().isoformat(timespec='seconds')
+        run['error'] = str(exc) or type(exc).__name__
+        atomic_write(os.path.join(directory, MANIFEST), json.dumps(manifest))
+        raise
+
+
+def run_documents(documents, directory, workers, force, manifest):
+    done = manifest['documents']
+    run = manifest['run']
+    template = template_digest()
+
+    def settled(institute, outcome):
+        run['done'] += 1
+        if outcome == 'written':
+            run['written'] += 1
+        elif outcome != 'unchanged':
+            run['failed'] += 1
+        if run['done'] == run['total']:
+            run['finished'] = datetime.now().isoformat(timespec='seconds')
+        if outcome != 'unchanged' or run['finished']:
+            atomic_write(os.path.join(directory, MANIFEST), json.dumps(manifest))
+        return institute, outcome
+
+    for institute in set(done) - set(documents):
+        try:
+            os.remove(os.path.join(directory, done.pop(institute)['file']))
+        except FileNotFoundError:
+            pass
+    todo = []
+    for institute, inputs in documents.items():
+        digest = fingerprint(inputs, template)
+        entry = done.get(institute)
+        if (not force and entry and entry['hash'] == digest
+                and os.path.exists(os.path.join(directory, entry['file']))):
+            yield settled(institute, 'unchanged')
+        else:
+            todo.append((institute, inputs, digest))
+    if not todo:
+        if not documents:
+            run['finished'] = run['started']
+            atomic_write(os.path.join(directory, MANIFEST), json.dumps(manifest))
+        return
+
+    generated = datetime.now().isoformat(sep=' ', timespec='minutes')
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    if workers == 1:
+        # not worth starting a pool for
+        for institute, inputs, digest in todo:
+            result = lambda: render(directory, filename(institute), inputs, generated)
+            yield settled(*finish(done, institute, digest, result))
+        return
+    with pool(workers) as executor:
+        futures = {executor.submit(render, directory, filename(institute), inputs, generated): (institute, digest)
+                   for institute, inputs, digest in todo}
+        for future in concurrent.futures.as_completed(futures):
+            yield settled(*finish(done, *futures[future], future.result))
+
+
+def finish(done, institute, digest, result):
+    # record a rendered document in the manifest; result returns its file
+    # name or raises what the render raised
+    try:
+        name = result()
+    except Exception as exc:
+        return institute, f'failed: {exc}'
+    done[institute] = {'file': name, 'hash': digest, 'generated': datetime.now().isoformat(timespec='seconds')}
+    return institute, 'written'
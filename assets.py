@@ -0,0 +1,229 @@
+"""Content-hashed, precompressed copies of the static files.
+
+``build`` copies every file under ``static/`` to ``static/dist/`` with a
+digest of its content in the name (``style.css`` -> ``style.<hash>.css``)
+and records the names in ``static/dist/manifest.json``.  A file's URL
+changes whenever its content does, so the app serves the copies with a
+far-future, immutable ``Cache-Control`` and browsers never ask for them
+again.  Stylesheets are built last, with their ``url(...)`` references
+rewritten to the built names, so a changed image changes the stylesheet's
+name too.  Text formats also get a ``.gz`` copy, compressed once at build
+time.  JPEG images are re-encoded as progressive JPEGs at the same quality,
+so the background appears at once and sharpens as it loads, and narrower
+copies are made at ``VARIANT_WIDTHS`` (``Background.jpeg`` ->
+``Background.480w.<hash>.jpeg``).  A stylesheet rule with a JPEG background
+gets ``@media`` rules appended that swap in the narrowest copy still wide
+enough for the screen, so phones never download the full image.
+
+``Manifest`` maps a static filename to its built copy.  An entry whose
+source has changed since the build is left out (the plain file is served
+until the next build), so a forgotten build never serves stale content.
+"""
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import posixpath
+import re
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+
+# widths (px) of the narrower JPEG copies; only those below an image's own
+# width are made
+VARIANT_WIDTHS = (480, 800)
+VARIANT_QUALITY = 80
+
+# formats worth compressing; images other than SVG are compressed already
+COMPRESSED = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.xml'}
+
+URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+log = logging.getLogger(__name__)
+
+
+def digest(data, size=16):
+    return hashlib.blake2b(data, digest_size=size).hexdigest()
+
+
+def hashed_name(name, data):
+    stem, ext = posixpath.splitext(name)
+    return f'{stem}.{digest(data, 5)}{ext}'
+
+
+def sources(static_dir):
+    # static files to build, as '/'-separated paths under static_dir
+    for root, dirs, files in os.walk(static_dir):
+        rel = os.path.relpath(root, static_dir)
+        if rel == DIST:
+            dirs[:] = []
+            continue
+        dirs.sort()
+        for filename in sorted(files):
+            yield posixpath.normpath(posixpath.join(rel.replace(os.sep, '/'), filename))
+
+
+def progressive(data):
+    # a JPEG re-encoded as progressive with its own quantization tables;
+    # Pillow is imported here so the app itself never loads it
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as image:
+        out = io.BytesIO()
+        image.save(out, 'JPEG', quality='keep', progressive=True, optimize=True)
+    return out.getvalue()
+
+
+def variants(name, data):
+    # {width: (variant name, progressive JPEG)} of the narrower copies
+    from PIL import Image
+    stem, ext = posixpath.splitext(name)
+    result = {}
+    with Image.open(io.BytesIO(data)) as image:
+        for width in VARIANT_WIDTHS:
+            if width >= image.width:
+                continue
+            height = max(round(image.height * width / image.width), 1)
+            out = io.BytesIO()
+            image.convert('RGB').resize((width, height), Image.LANCZOS).save(
+                out, 'JPEG', quality=VARIANT_QUALITY, progressive=True, optimize=True)
+            result[width] = (f'{stem}.{width}w{ext}', out.getvalue())
+    return result
+
+
+def target(ref, name):
+    # the static file a url(...) in stylesheet name refers to, or None for
+    # absolute URLs and fragments
+    if re.match(r'[a-z][a-z0-9+.-]*:|//|#', ref, re.I):
+        return None
+    path = ref.partition('?')[0]
+    if path.startswith('/static/'):
+        return path[len('/static/'):]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(name), path))
+
+
+RULE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+BACKGROUND = re.compile(r'background(?:-image)?\s*:[^;]*?url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def responsive_backgrounds(css, name, widths):
+    # @media rules, narrowest last so it wins, pointing every rule with a
+    # JPEG background at the copies in widths ({source: {width: variant}});
+    # their urls name the variants and are rewritten with the rest
+    rules = []
+    for match in RULE.finditer(css):
+        selector = re.sub(r'/\*.*?\*/', '', match.group(1), flags=re.S).strip()
+        background = BACKGROUND.search(match.group(2))
+        if selector.startswith('@') or not background:
+            continue
+        source = target(background.group(2).strip(), name)
+        for width, variant in sorted(widths.get(source, {}).items(), reverse=True):
+            ref = posixpath.relpath(variant, posixpath.dirname(name) or '.')
+            # a high-density screen needs twice the pixels
+            rules.append(f'@media (max-width: {width}px) and (max-resolution: 1dppx), '
+                         f'(max-width: {width // 2}px) {{\n'
+                         f"    {selector} {{ background-image: url('{ref}'); }}\n}}\n")
+    return css + ''.join('\n' + rule for rule in rules)
+
+
+def rewrite_urls(css, name, files):
+    # point url(...) references of the stylesheet name at the built files
+    def replace(match):
+        built = files.get(target(match.group(2).strip(), name))
+        if built is None:
+            return match.group(0)
+        # built files keep their source's directory, so the path from the
+        # stylesheet's directory is the same in dist/
+        relative = posixpath.relpath(built, posixpath.dirname(name) or '.')
+        return f'url({match.group(1)}{relative}{match.group(1)})'
+    return URL.sub(replace, css)
+
+
+def build(static_dir):
+    """Write the built copies and the manifest; returns the manifest."""
+    out_dir = os.path.join(static_dir, DIST)
+    names = list(sources(static_dir))
+    # stylesheets last, once the files they refer to have their names
+    names.sort(key=lambda name: name.endswith('.css'))
+    files, source_digests = {}, {}
+    # source JPEG -> {width: variant name}
+    widths = {}
+    for name in names:
+        with open(os.path.join(static_dir, name), 'rb') as f:
+            data = f.read()
+        source_digests[name] = digest(data)
+        ext = posixpath.splitext(name)[1].lower()
+        if ext in ('.jpg', '.jpeg'):
+            for width, (variant, variant_data) in variants(name, data).items():
+                widths.setdefault(name, {})[width] = variant
+                files[variant] = hashed_name(variant, variant_data)
+                path = os.path.join(out_dir, files[variant])
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                write(path, variant_data)
+            data = progressive(data)
+        elif ext == '.css':
+            css = responsive_backgrounds(data.decode('utf-8'), name, widths)
+            data = rewrite_urls(css, name, files).encode('utf-8')
+        built = hashed_name(name, data)
+        files[name] = built
+        path = os.path.join(out_dir, built)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write(path, data)
+        if ext in COMPRESSED:
+            compressed = gzip.compress(data, 9, mtime=0)
+            if len(compressed) < len(data) * 0.9:
+                write(path + '.gz', compressed)
+    manifest = {'files': files, 'sources': source_digests}
+    write(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=1, sort_keys=True).encode())
+    return manifest
+
+
+def write(path, data):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def clean(static_dir, manifest):
+    # remove built files the manifest no longer names; returns how many
+    out_dir = os.path.join(static_dir, DIST)
+    keep = {MANIFEST} | set(manifest['files'].values())
+    keep |= {f'{name}.gz' for name in keep}
+    removed = 0
+    for root, _, filenames in os.walk(out_dir):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            if os.path.relpath(path, out_dir).replace(os.sep, '/') not in keep:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+class Manifest:
+    """Built names of static files, read from the manifest once."""
+
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        self.files = {}
+        try:
+            with open(os.path.join(static_dir, DIST, MANIFEST)) as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        for name, built in manifest['files'].items():
+            try:
+                with open(os.path.join(static_dir, name), 'rb') as f:
+                    current = digest(f.read())
+            except FileNotFoundError:
+                continue
+            if current == manifest['sources'].get(name):
+                self.files[name] = built
+            else:
+                log.warning('static/%s changed since the assets were built; run "flask build-assets"', name)
+
+    def url(self, filename):
+        # the filename to ask the static route for
+        built = self.files.get(filename)
+        return f'{DIST}/{built}' if built else filename
@@ -0,0 +1 @@
+"""Load, stress and timing scripts for the IQAC portal (run with python -m)."""
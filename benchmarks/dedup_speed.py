@@ -0,0 +1,93 @@
+"""Speed and recall of publication duplicate detection.
+
+Generates research papers with random titles, a share of which are
+resubmissions with small edits (case, punctuation, a dropped or added word,
+a typo), then times building the exact-duplicate index, checking
+submissions against it, and the near-duplicate clustering pass, and reports
+how many of the planted duplicates the pass found.
+
+    python -m benchmarks.dedup_speed --docs 200000
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = ('quality assurance higher education learning outcomes machine deep neural network '
+         'curriculum assessment accreditation student performance analysis mining teaching '
+         'pedagogy evaluation framework model optimisation thermal energy solar wind renewable '
+         'structural concrete bridge seismic polymer composite nanoparticle synthesis catalysis '
+         'protein genome sequencing clinical diabetes cardiac imaging segmentation transformer '
+         'language translation speech recognition robotics control drone agriculture crop yield '
+         'soil water irrigation supply chain logistics marketing finance banking blockchain').split()
+
+
+def variant(rng, title):
+    words = title.split()
+    edit = rng.randrange(4)
+    if edit == 0:
+        return title.upper() + '.'
+    if edit == 1:
+        del words[rng.randrange(1, len(words))]
+    elif edit == 2:
+        words.insert(rng.randrange(len(words)), rng.choice(('a', 'the', 'novel', 'improved')))
+    else:
+        i = rng.randrange(len(words))
+        word = words[i]
+        j = rng.randrange(len(word) - 1) if len(word) > 1 else 0
+        words[i] = word[:j] + word[j + 1:j + 2] + word[j:j + 1] + word[j + 2:]
+    return ' '.join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=200000)
+    parser.add_argument('--duplicates', type=float, default=0.05, help='Share of resubmitted papers.')
+    args = parser.parse_args()
+    sys.path.insert(0, ROOT)
+    import dedup
+
+    rng = random.Random(1)
+    papers, planted = [], []
+    for i in range(args.docs):
+        if papers and rng.random() < args.duplicates:
+            original = rng.randrange(len(papers))
+            papers.append(dict(papers[original], title=variant(rng, papers[original]['title'])))
+            planted.append((original, i))
+        else:
+            papers.append({
+                'title': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 12))),
+                'isbn_issn': f'{rng.randrange(10000):04d}-{rng.randrange(10000):04d}',
+                'link': f'https://example.org/papers/{i}' if rng.random() < 0.5 else '',
+            })
+    collections = {'research_papers': papers}
+
+    start = time.perf_counter()
+    index = dedup.DuplicateIndex()
+    index.build(collections)
+    print(f'exact index over {args.docs} entries: {time.perf_counter() - start:6.2f}s')
+
+    start = time.perf_counter()
+    for paper in papers[:10000]:
+        index.find('research_papers', paper)
+    print(f'submission check:              {(time.perf_counter() - start) / 10000 * 1e6:6.1f} us each')
+
+    start = time.perf_counter()
+    groups = dedup.clusters(collections)
+    elapsed = time.perf_counter() - start
+    grouped = {}
+    for number, (members, _) in enumerate(groups):
+        for _, position in members:
+            grouped[position] = number
+    found = sum(1 for a, b in planted if a in grouped and grouped.get(a) == grouped.get(b))
+    print(f'clustering pass:               {elapsed:6.2f}s  {len(groups)} groups, '
+          f'{found}/{len(planted)} planted duplicates found')
+    print(f'peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Peak memory of the streaming exports as the collection grows.
+
+For each size a fresh process loads a data directory holding that many
+research papers, then downloads /export/research_papers.<fmt> through the
+Flask test client while tracemalloc records the peak allocated during the
+download (the loaded collection itself is not counted).  With streaming the
+peak stays flat from 1k to 100k rows.
+
+    python -m benchmarks.export_memory --sizes 1000 10000 100000 --storage journal
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def paper(i):
+    return {
+        'title': f'Synthetic paper {i} on quality assurance in higher education',
+        'authors': 'A. Author, B. Author', 'author_position': '1',
+        'journal_name': 'Journal of Benchmarks', 'year': str(2015 + i % 10),
+        'volume': str(i % 50), 'pages': f'{i % 300}-{i % 300 + 12}',
+        'isbn_issn': '1234-5678', 'ugc_approved': 'yes', 'journal_type': 'national',
+        'impact_factor': '1.5', 'indexing': 'Scopus', 'reviewed': 'yes',
+        'link': f'https://example.org/papers/{i}', 'institute': 'JNEC',
+        'submitted_at': '2024-01-01T00:00:00',
+    }
+
+
+def measure(size, fmt, storage):
+    # runs inside a fresh interpreter whose IQAC_DATA_DIR is empty
+    sys.path.insert(0, ROOT)
+    data_dir = os.environ['IQAC_DATA_DIR']
+    if storage != 'sqlite':
+        with open(os.path.join(data_dir, 'research_papers.json'), 'w') as f:
+            json.dump([paper(i) for i in range(size)], f)
+    import app as portal
+    if storage == 'sqlite':
+        portal.app.config['RESEARCH_PAPERS'].extend(paper(i) for i in range(size))
+
+    client = portal.app.test_client()
+    with client.session_transaction() as s:
+        s['role'] = 'hod'
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(f'/export/research_papers.{fmt}', buffered=False)
+    written = sum(len(chunk) for chunk in response.response)
+    response.close()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f'{size:>8} rows  {fmt:<4}  {written / 1e6:8.1f} MB out  '
+          f'peak {peak / 1e6:6.2f} MB  {elapsed:6.2f}s', flush=True)
+    portal.store.close()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--formats', nargs='+', default=['csv', 'xlsx'], choices=['csv', 'xlsx'])
+    parser.add_argument('--storage', default='journal', choices=['json', 'journal', 'sqlite'])
+    parser.add_argument('--measure', nargs=2, metavar=('SIZE', 'FORMAT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(int(args.measure[0]), args.measure[1], args.storage)
+        return
+
+    for fmt in args.formats:
+        for size in args.sizes:
+            data_dir = tempfile.mkdtemp(prefix='iqac-export-')
+            try:
+                env = dict(os.environ, IQAC_DATA_DIR=data_dir, IQAC_STORAGE=args.storage)
+                env.pop('IQAC_SHARED', None)
+                subprocess.run([sys.executable, '-m', 'benchmarks.export_memory', '--storage', args.storage,
+                                '--measure', str(size), fmt], cwd=ROOT, env=env, check=True)
+            finally:
+                shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
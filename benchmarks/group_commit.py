@@ -0,0 +1,106 @@
+"""Submission burst against each durability mode.
+
+Several threads of one process post research papers through the Flask test
+client at the same time, the way a deadline rush hits a threaded server.
+Reports throughput and per-request latency for sync, group and async saves,
+then reopens the data directory and checks every paper reached the disk.
+
+    python -m benchmarks.group_commit --threads 8 --requests 50 --storage journal
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def burst(threads, requests):
+    # runs inside a fresh interpreter configured through the environment
+    sys.path.insert(0, ROOT)
+    import app as portal
+
+    latencies = []
+    lock = threading.Lock()
+
+    def submit(thread_id):
+        client = portal.app.test_client()
+        with client.session_transaction() as s:
+            s['role'] = 'faculty'
+        for i in range(requests):
+            start = time.perf_counter()
+            client.post('/submit_research_paper', data={'title': f'burst {thread_id} {i}', 'year': '2025'})
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    pool = [threading.Thread(target=submit, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    portal.store.flush()
+    elapsed = time.perf_counter() - start
+    portal.store.close()
+    latencies.sort()
+    print(f'{len(latencies) / elapsed:8.0f} req/s  '
+          f'p50 {statistics.median(latencies) * 1000:6.2f} ms  '
+          f'p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:6.2f} ms')
+
+
+def count_papers(data_dir, storage):
+    sys.path.insert(0, ROOT)
+    from storage import open_store
+    store = open_store(storage, data_dir)
+    titles = [p.get('title', '') for p in store.load('research_papers', [])]
+    store.close()
+    return sum(1 for t in titles if t.startswith('burst '))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50, help='per thread')
+    parser.add_argument('--storage', default='journal', choices=['json', 'journal', 'sqlite'])
+    parser.add_argument('--burst', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.burst:
+        burst(args.threads, args.requests)
+        return
+
+    failed = False
+    for mode in ('sync', 'group', 'async'):
+        data_dir = tempfile.mkdtemp(prefix='iqac-group-')
+        try:
+            for name in os.listdir(ROOT):
+                if name.endswith('.json'):
+                    shutil.copy(os.path.join(ROOT, name), data_dir)
+            if args.storage == 'sqlite':
+                sys.path.insert(0, ROOT)
+                from sqlite_store import migrate_json
+                migrate_json(data_dir)
+            env = dict(os.environ, IQAC_DATA_DIR=data_dir, IQAC_STORAGE=args.storage,
+                       IQAC_DURABILITY=mode)
+            env.pop('IQAC_SHARED', None)
+            print(f'{mode:>5}: ', end='', flush=True)
+            subprocess.run([sys.executable, '-m', 'benchmarks.group_commit', '--burst',
+                            '--threads', str(args.threads), '--requests', str(args.requests)],
+                           cwd=ROOT, env=env, check=True)
+            stored = count_papers(data_dir, args.storage)
+            expected = args.threads * args.requests
+            if stored != expected:
+                print(f'LOST: {expected - stored} of {expected} papers ({mode})')
+                failed = True
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    print('FAILED' if failed else 'OK: every paper persisted')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+"""Load benchmark: concurrent virtual users on synthetic data.
+
+``data`` generates reports and publications at a given scale (1k, 100k, 1m
+or any number), ``users`` drives the routes as faculty, approvers, the
+auditor and an admin would, and ``results`` summarises latency, throughput
+and memory and compares a run with a saved baseline.
+
+    python -m benchmarks.load --scale 1k --users 8 --iterations 10 --out results.json
+    python -m benchmarks.load --scale 1k --baseline results.json
+"""
@@ -0,0 +1,155 @@
+"""Run the load benchmark (see benchmarks/load/__init__.py).
+
+The data is generated in a separate process, and each run is another
+process working on a fresh copy of it, so peak memory is the app's own and
+every run starts from identical collections.  Exits 1 when a request failed
+or, with --baseline, when the runs regressed against the baseline.
+"""
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from . import __doc__ as DESCRIPTION
+from . import data, results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# written into a populated data directory so a later run can reuse it
+MARKER = 'load-benchmark.json'
+
+
+def rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def prepare(data_dir, storage, size, seed):
+    wanted = {'storage': storage, 'size': size, 'seed': seed}
+    marker = os.path.join(data_dir, MARKER)
+    if os.path.exists(marker) and results.load(marker) == wanted:
+        return
+    shutil.rmtree(data_dir, ignore_errors=True)
+    os.makedirs(data_dir)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'benchmarks.load', '--populate', data_dir, '--storage', storage,
+                    '--scale', str(size), '--seed', str(seed)], cwd=ROOT, check=True)
+    print(f'generated {size} reports and {size} publications ({storage}) in '
+          f'{time.perf_counter() - start:.1f}s', flush=True)
+    results.save(marker, wanted)
+
+
+def run(data_dir, args, size):
+    # inside a fresh interpreter (see main)
+    os.environ.update(IQAC_DATA_DIR=data_dir, IQAC_STORAGE=args.storage)
+    os.environ.pop('IQAC_SHARED', None)
+    sys.path.insert(0, ROOT)
+    from .users import ROLE_MIX, VirtualUser
+
+    base = rss()
+    import app as portal
+    users = [VirtualUser(portal, ROLE_MIX[n % len(ROLE_MIX)], n, args.seed) for n in range(args.users)]
+    # one warm-up pass: the first requests load collections and build indexes
+    for user in users[:len(ROLE_MIX)]:
+        user.run(1)
+    for user in users:
+        user.samples.clear()
+    # service times: every role's flow with nobody else around
+    alone = [VirtualUser(portal, role, args.users + n, args.seed) for n, role in enumerate(dict.fromkeys(ROLE_MIX))]
+    for user in alone:
+        user.run(args.iterations)
+
+    start_line = threading.Barrier(len(users) + 1)
+    failures = []
+
+    def drive(user):
+        start_line.wait()
+        try:
+            user.run(args.iterations)
+        except Exception as exc:  # recorded, and fails the run
+            failures.append(f'{user.role} #{user.number}: {exc!r}')
+
+    threads = [threading.Thread(target=drive, args=(user,)) for user in users]
+    for thread in threads:
+        thread.start()
+    start_line.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    portal.store.close()
+
+    settings = {'scale': size, 'storage': args.storage, 'users': args.users,
+                'iterations': args.iterations, 'seed': args.seed}
+    memory = {'before_import': round(base, 1), 'peak': round(rss(), 1)}
+    summary = results.summarize([s for user in users for s in user.samples],
+                                [s for user in alone for s in user.samples], elapsed, settings, memory)
+    summary['failures'] = failures
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=DESCRIPTION.splitlines()[0])
+    parser.add_argument('--scale', default='1k', help='reports (and publications): 1k, 100k, 1m or a number')
+    parser.add_argument('--storage', default='journal', choices=['json', 'journal', 'sqlite'])
+    parser.add_argument('--users', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--iterations', type=int, default=20, help='flows each user runs')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--data', help='keep the generated data here and reuse it on later runs')
+    parser.add_argument('--out', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='results file of an earlier run to compare with')
+    parser.add_argument('--repeat', type=int, default=3, help='runs to take the median of')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown (0.25 = 25%%) before a route counts as regressed')
+    parser.add_argument('--populate', help=argparse.SUPPRESS)
+    parser.add_argument('--run', nargs=2, metavar=('DATA', 'RESULT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    size = data.parse_scale(args.scale)
+    if args.populate:
+        sys.path.insert(0, ROOT)
+        data.populate(args.populate, args.storage, size, args.seed)
+        return 0
+    if args.run:
+        results.save(args.run[1], run(args.run[0], args, size))
+        return 0
+
+    data_dir = args.data or tempfile.mkdtemp(prefix='iqac-load-data-')
+    runs = []
+    try:
+        prepare(data_dir, args.storage, size, args.seed)
+        for _ in range(args.repeat):
+            scratch = tempfile.mkdtemp(prefix='iqac-load-run-')
+            try:
+                shutil.copytree(data_dir, scratch, dirs_exist_ok=True)
+                result = os.path.join(scratch, MARKER)
+                subprocess.run([sys.executable, '-m', 'benchmarks.load', '--run', scratch, result] + sys.argv[1:],
+                               cwd=ROOT, check=True)
+                runs.append(results.load(result))
+            finally:
+                shutil.rmtree(scratch, ignore_errors=True)
+    finally:
+        if not args.data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    summary = results.merge(runs)
+
+    print(results.table(summary))
+    if args.out:
+        results.save(args.out, summary)
+    problems = [f'exception in {failure}' for failure in summary['failures']]
+    if args.baseline:
+        problems += results.compare(summary, results.load(args.baseline), args.tolerance)
+    elif summary['errors']:
+        problems.append(f"{summary['errors']} requests failed")
+    for problem in problems:
+        print('REGRESSION:', problem)
+    if problems:
+        print(f'FAILED: {len(problems)} problems')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
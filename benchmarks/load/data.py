@@ -0,0 +1,155 @@
+"""Synthetic collections in the shapes the app stores.
+
+Reports look like those saved by /faculty_reports (some already part-way
+through approval), publications like those saved by the submit_* routes,
+spread over a few institutes, departments and years.  Everything is
+generated from a seed, so a given scale always produces the same data.
+"""
+import json
+import os
+import random
+
+INSTITUTES = ['JNEC', 'MGM College of Engineering', 'MGM Institute of Management',
+              'MGM School of Biomedical Sciences', 'MGM Dental College']
+DEPARTMENTS = ['Computer Science', 'Mechanical', 'Civil', 'Electronics', 'Management', 'Biotechnology']
+WORDS = ('quality assurance higher education learning outcomes machine deep neural network '
+         'curriculum assessment accreditation student performance analysis mining teaching '
+         'pedagogy evaluation framework model optimisation thermal energy solar wind renewable '
+         'structural concrete bridge seismic polymer composite nanoparticle synthesis catalysis '
+         'protein genome sequencing clinical diabetes cardiac imaging segmentation transformer').split()
+INDEXING = ['Scopus', 'UGC', 'Web of Science', 'Scopus, Web of Science', '']
+
+# how the publications of a scale are split between the four kinds
+PUBLICATION_SHARES = {
+    'research_papers': 0.6,
+    'conference_papers': 0.25,
+    'book_publications': 0.05,
+    'book_chapters': 0.1,
+}
+
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000, '1m': 1000000}
+
+
+def parse_scale(value):
+    # '1k', '100k', '1m' or a plain number of reports (and of publications)
+    value = value.lower()
+    return SCALES[value] if value in SCALES else int(value)
+
+
+def title(rng, words=8):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(words - 3, words + 3))).capitalize()
+
+
+def when(rng):
+    # a timestamp in the last five academic years
+    return f'{rng.randint(2020, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00'
+
+
+def report(rng, i, required_approvers):
+    approvals = {}
+    status = 'pending'
+    decided = rng.choice((0, 0, 1, 3, len(required_approvers)))
+    for role in required_approvers[:decided]:
+        decision = 'rejected' if rng.random() < 0.05 else 'approved'
+        approvals[role] = {'decision': decision, 'notes': '', 'time': when(rng)}
+    if any(a['decision'] == 'rejected' for a in approvals.values()):
+        status = 'rejected'
+    elif len(approvals) == len(required_approvers):
+        status = 'approved'
+    return {
+        'id': f's{i:011d}',
+        'title': f'{title(rng, 5)} report {i}',
+        'content': ' '.join(rng.choice(WORDS) for _ in range(60)),
+        'date': when(rng),
+        'status': status,
+        'auditor_notes': '',
+        'approvals': approvals,
+        'institute': rng.choice(INSTITUTES),
+        'submitted_by': f'faculty{i % 500}@example.edu',
+    }
+
+
+def publication(rng, name, i):
+    common = {
+        'author_position': str(rng.randint(1, 4)),
+        'link': f'https://doi.org/10.5555/{name}.{i}' if rng.random() < 0.7 else '',
+        'institute': rng.choice(INSTITUTES),
+        'department': rng.choice(DEPARTMENTS),
+        'submitted_at': when(rng),
+    }
+    if name == 'research_papers':
+        return dict(common, title=f'{title(rng)} {i}', authors='A. Author, B. Author',
+                    journal_name=f'Journal of {rng.choice(WORDS).capitalize()} Studies',
+                    year=str(rng.randint(2015, 2025)), volume=str(rng.randint(1, 60)),
+                    pages=f'{rng.randint(1, 200)}-{rng.randint(201, 400)}',
+                    isbn_issn=f'{rng.randrange(10000):04d}-{rng.randrange(10000):04d}',
+                    ugc_approved=rng.choice(('Yes', 'No')), journal_type=rng.choice(('National', 'International')),
+                    impact_factor=f'{rng.random() * 8:.2f}', indexing=rng.choice(INDEXING),
+                    reviewed=rng.choice(('Yes', 'No')))
+    if name == 'conference_papers':
+        return dict(common, title=f'{title(rng)} {i}', authors='A. Author, C. Author',
+                    conference_name=f'International Conference on {rng.choice(WORDS).capitalize()}',
+                    conference_date=when(rng)[:10], venue=rng.choice(('Pune', 'Mumbai', 'Online')),
+                    proceedings_title='Proceedings', publication_details='Springer',
+                    indexing=rng.choice(INDEXING))
+    book = dict(common, faculty_members='A. Author', book_title=f'{title(rng, 5)} {i}',
+                publisher_details=rng.choice(('Springer', 'Elsevier', 'Wiley', 'Pearson')),
+                publication_type=rng.choice(('National', 'International')),
+                isbn=f'978{rng.randrange(10 ** 10):010d}', publication_date=when(rng)[:10])
+    if name == 'book_chapters':
+        book['chapter_title'] = f'{title(rng, 6)} {i}'
+    return book
+
+
+def collections(size, required_approvers, seed=1):
+    """{name: generator of entries} for size reports and size publications."""
+    rng = random.Random(f'{seed}:faculty_reports')
+    result = {'faculty_reports': (report(rng, i, required_approvers) for i in range(size))}
+    for name, share in PUBLICATION_SHARES.items():
+        rng = random.Random(f'{seed}:{name}')
+        result[name] = (publication(rng, name, i) for i in range(int(size * share)))
+    return result
+
+
+def write_json(path, entries):
+    # one entry at a time, so a million entries never sit in memory at once
+    with open(path, 'w') as f:
+        f.write('[')
+        for i, entry in enumerate(entries):
+            f.write(',\n' if i else '\n')
+            f.write(json.dumps(entry))
+        f.write('\n]')
+
+
+def populate(data_dir, storage, size, seed=1):
+    """Fill data_dir with size reports and publications for the app to open.
+
+    Runs in its own process (it imports the app): the collections are
+    written, report bodies moved to the blob pack, then the dashboard
+    counters and search index are built and saved, as a long-running
+    deployment would have them.
+    """
+    os.environ.update(IQAC_DATA_DIR=data_dir, IQAC_STORAGE=storage)
+    os.environ.pop('IQAC_SHARED', None)
+    import app as portal
+
+    generated = collections(size, portal.REQUIRED_APPROVERS, seed)
+    for name, entries in generated.items():
+        if storage == 'sqlite':
+            # written straight through to the database, in one transaction
+            portal.app.config[name.upper()].extend(entries)
+        else:
+            # importing the app built the (empty) dashboard counters, which
+            # loaded the collection: drop it so it is read from the file
+            write_json(os.path.join(data_dir, f'{name}.json'), entries)
+            portal.app.config.pop(name.upper(), None)
+    with portal.store.locked('institutes'):
+        portal.app.config['INSTITUTES'][:] = INSTITUTES
+        portal.save_institutes()
+    # report text goes to the blob pack, as new reports' does
+    portal.move_report_bodies()
+    with portal.store.locked('analytics', *portal.COUNTED):
+        portal.analytics.rebuild(portal.counted_collections())
+        portal.save_analytics()
+    portal.search_index.get()
+    portal.store.close()
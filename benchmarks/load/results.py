@@ -0,0 +1,141 @@
+"""Summaries of a load run and comparison against a saved baseline.
+
+A results file is JSON: the run's settings, overall throughput and peak
+memory, and per route the request count, errors and p50/p95/p99 latency in
+milliseconds, twice: ``routes`` under concurrent load and ``service`` for
+the same flows run by one user at a time.  Repeated runs are merged into one
+such summary by taking medians.
+
+Only the service times are compared route by route.  Under concurrent load
+a request's latency is mostly time spent queueing for the store's lock (and
+the GIL) behind whichever writes happen to be in flight, which varies
+several-fold between identical runs; throughput over the whole run does not.
+"""
+import json
+
+# latency regressions smaller than this many ms are noise, whatever the ratio
+MIN_LATENCY_CHANGE = 1.0
+# p95 of fewer requests than this is little more than the slowest one
+MIN_TAIL_REQUESTS = 40
+PERCENTILES = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def percentile(ordered, q):
+    # nearest rank on an already sorted list
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+def per_route(samples):
+    timings = {}
+    for route, seconds, ok in samples:
+        timings.setdefault(route, ([], []))[0 if ok else 1].append(seconds)
+    summary = {}
+    for route, (good, bad) in sorted(timings.items()):
+        ordered = sorted(good + bad)
+        summary[route] = {'requests': len(ordered), 'errors': len(bad)}
+        for key in PERCENTILES:
+            summary[route][key] = round(percentile(ordered, int(key[1:3])) * 1000, 3)
+    return summary
+
+
+def summarize(samples, service, elapsed, settings, memory):
+    routes = per_route(samples)
+    return {
+        'settings': settings,
+        'requests': len(samples),
+        'errors': sum(route['errors'] for route in routes.values()),
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'memory_mb': memory,
+        'routes': routes,
+        'service': per_route(service),
+    }
+
+
+def median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def merge_routes(sections):
+    merged = {}
+    for route in sorted({route for section in sections for route in section}):
+        seen = [section[route] for section in sections if route in section]
+        merged[route] = {'requests': sum(r['requests'] for r in seen), 'errors': sum(r['errors'] for r in seen)}
+        for key in PERCENTILES:
+            merged[route][key] = median(r[key] for r in seen)
+    return merged
+
+
+def merge(runs):
+    """One summary from repeated runs: per route the median of each
+    percentile, overall the median throughput and the highest peak memory."""
+    merged = dict(runs[0], runs=len(runs))
+    merged['requests'] = sum(run['requests'] for run in runs)
+    merged['errors'] = sum(run['errors'] for run in runs)
+    merged['seconds'] = round(sum(run['seconds'] for run in runs), 3)
+    merged['throughput_rps'] = median(run['throughput_rps'] for run in runs)
+    merged['memory_mb'] = {key: max(run['memory_mb'][key] for run in runs) for key in runs[0]['memory_mb']}
+    merged['failures'] = [failure for run in runs for failure in run['failures']]
+    merged['routes'] = merge_routes([run['routes'] for run in runs])
+    merged['service'] = merge_routes([run['service'] for run in runs])
+    return merged
+
+
+def compare(current, baseline, tolerance):
+    """Regressions of current against baseline, as readable lines.
+
+    A route's service p50 (and p95, given enough requests) may grow, and
+    throughput or peak memory may worsen, by tolerance (0.25 = 25%) before
+    it counts; any failed request counts.
+    """
+    problems = []
+    if current['settings'] != baseline.get('settings'):
+        problems.append(f"settings differ from the baseline's {baseline.get('settings')}; "
+                        'the comparison is not like for like')
+    limit = 1 + tolerance
+    for section in ('routes', 'service'):
+        for route, now in current[section].items():
+            if now['errors']:
+                problems.append(f"{route}: {now['errors']} of {now['requests']} requests failed")
+    for route, now in current['service'].items():
+        before = baseline['service'].get(route)
+        if before is None:
+            continue
+        keys = PERCENTILES[:2] if min(now['requests'], before['requests']) >= MIN_TAIL_REQUESTS else PERCENTILES[:1]
+        for key in keys:
+            if now[key] > before[key] * limit and now[key] - before[key] >= MIN_LATENCY_CHANGE:
+                problems.append(f'{route}: {key} {before[key]:.2f} -> {now[key]:.2f}')
+    for route in baseline['routes'].keys() - current['routes'].keys():
+        problems.append(f'{route}: in the baseline but not exercised by this run')
+    if current['throughput_rps'] * limit < baseline['throughput_rps']:
+        problems.append(f"throughput {baseline['throughput_rps']:.1f} -> {current['throughput_rps']:.1f} req/s")
+    if current['memory_mb']['peak'] > baseline['memory_mb']['peak'] * limit:
+        problems.append(f"peak memory {baseline['memory_mb']['peak']:.0f} -> {current['memory_mb']['peak']:.0f} MB")
+    return problems
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
+
+
+def table(results):
+    lines = [f"{'route':<40} {'requests':>8} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+             f" | {'alone p50':>9}"]
+    for route, r in results['routes'].items():
+        alone = results['service'].get(route)
+        alone = f"{alone['p50_ms']:.2f}" if alone else '-'
+        lines.append(f"{route:<40} {r['requests']:>8} {r['errors']:>6} {r['p50_ms']:>8.2f} "
+                     f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} | {alone:>9}")
+    lines.append(f"{results['requests']} concurrent requests ({results.get('runs', 1)} runs): "
+                 f"{results['throughput_rps']:.1f} req/s, peak memory {results['memory_mb']['peak']:.0f} MB")
+    return '\n'.join(lines)
@@ -0,0 +1,143 @@
+"""Virtual users: one role each, walking the app the way that role does.
+
+A ``VirtualUser`` logs in through /login (captcha included), runs its
+role's flow once per iteration through its own Flask test client, and logs
+out.  Every request is timed and recorded as (route, seconds, ok), where ok
+means the app answered with the status that flow expects, e.g. a redirect
+after a submission rather than a redirect back to the login page.
+"""
+import random
+import time
+
+from .data import DEPARTMENTS, INSTITUTES, WORDS, publication
+
+# one virtual user in eight is a HOD, a director, ...; faculty dominate, as
+# they do in the portal's traffic
+ROLE_MIX = ['faculty', 'faculty', 'faculty', 'hod', 'director', 'iqac_coordinators', 'auditor', 'registrar']
+
+# where each kind of publication is submitted
+SUBMIT_ROUTES = {
+    'research_papers': '/submit_research_paper',
+    'conference_papers': '/submit_conference_paper',
+    'book_publications': '/submit_book_publication',
+    'book_chapters': '/submit_book_chapter',
+}
+
+# approvers pick among the newest reports in their queue, as they would
+# from the first pages of /faculty_reports?awaiting=1
+REVIEWED = 100
+
+
+class VirtualUser:
+    def __init__(self, portal, role, number, seed=1):
+        self.portal = portal
+        self.role = role
+        self.number = number
+        self.client = portal.app.test_client()
+        self.rng = random.Random(f'{seed}:user:{number}')
+        self.iteration = 0
+        # (route, seconds, ok) per request
+        self.samples = []
+
+    def request(self, route, path, method='GET', expect=200, **kwargs):
+        start = time.perf_counter()
+        response = self.client.open(path, method=method, **kwargs)
+        # exports stream their body; the time includes producing all of it
+        response.get_data()
+        self.samples.append((route, time.perf_counter() - start, response.status_code == expect))
+        return response
+
+    def run(self, iterations):
+        flow = getattr(self, self.role if self.role in ('faculty', 'auditor', 'registrar') else 'approver')
+        for self.iteration in range(iterations):
+            self.login()
+            flow()
+            self.request('GET /logout', '/logout', expect=302)
+
+    def login(self):
+        self.request('GET /login', '/login')
+        with self.client.session_transaction() as s:
+            captcha = s['captcha']
+        self.request('POST /login', '/login', 'POST', expect=302, data={
+            'login_by': self.role, 'password': self.portal.CREDENTIALS[self.role], 'captcha': captcha})
+
+    def unique(self):
+        # a suffix no other user or iteration produces (submissions must not
+        # be rejected as duplicates)
+        return f'{self.number}.{self.iteration}'
+
+    def faculty(self):
+        rng = self.rng
+        self.request('GET /dashboard', '/dashboard')
+        self.request('POST /select_institute', '/select_institute', 'POST', expect=302,
+                     data={'institute': rng.choice(INSTITUTES)})
+        self.request('POST /faculty_details', '/faculty_details', 'POST', expect=302, data={
+            'name': f'Faculty {self.number}', 'email': f'faculty{self.number}@example.edu',
+            'phone': f'98{self.number:08d}', 'department': DEPARTMENTS[self.iteration % len(DEPARTMENTS)]})
+        self.request('GET /faculty_details', '/faculty_details')
+        self.request('POST /faculty_reports', '/faculty_reports', 'POST', data={
+            'report_title': f'Load report {self.unique()}',
+            'report_content': ' '.join(rng.choice(WORDS) for _ in range(40))})
+        # every kind in turn, so each submit route is exercised
+        name = list(SUBMIT_ROUTES)[(self.number + self.iteration) % len(SUBMIT_ROUTES)]
+        entry = publication(rng, name, 0)
+        for field in ('title', 'book_title', 'chapter_title'):
+            if field in entry:
+                entry[field] = f'{entry[field]} load {self.unique()}'
+        entry['link'] = f'https://example.org/load/{name}/{self.unique()}'
+        self.request(f'POST {SUBMIT_ROUTES[name]}', SUBMIT_ROUTES[name], 'POST', expect=302, data=entry)
+        self.request('GET /faculty_reports', f'/faculty_reports?page={rng.randint(1, 5)}')
+        self.request('GET /search', '/search', query_string={'q': rng.choice(WORDS)})
+
+    def approver(self):
+        rng = self.rng
+        self.request('GET /dashboard', '/dashboard')
+        self.request('GET /faculty_reports', '/faculty_reports?awaiting=1')
+        pending = self.portal.approval_index.pending_for(self.role)[:REVIEWED]
+        if pending:
+            report_id = rng.choice(pending)
+            self.request('GET /faculty_reports/<report_id>', f'/faculty_reports/{report_id}')
+            self.request('POST /faculty_reports', '/faculty_reports', 'POST', data={
+                'report_id': report_id, 'action': 'reject' if rng.random() < 0.1 else 'approve',
+                'approver_notes': 'load test'})
+        self.request('GET /analytics.json', '/analytics.json')
+        self.request('GET /search', '/search', query_string={'q': f'{rng.choice(WORDS)} {rng.choice(WORDS)}'})
+        if self.iteration % 5 == 0:
+            self.request('GET /export/<name>.<fmt>', '/export/research_papers.csv', query_string={
+                'institute': rng.choice(INSTITUTES), 'year': self.portal.recent_academic_years()[1]})
+            self.request('GET /audit_analytics', '/audit_analytics', query_string={'by': rng.choice(('institute', 'year'))})
+
+    def auditor(self):
+        rng = self.rng
+        self.request('GET /audit_reports', '/audit_reports')
+        pending = self.portal.approval_index.pending_for('auditor')[:REVIEWED]
+        if pending:
+            report_id = rng.choice(pending)
+            self.request('GET /faculty_reports/<report_id>', f'/faculty_reports/{report_id}')
+            self.request('GET /audit_questionnaire/<report_id>', f'/audit_questionnaire/{report_id}')
+            answers = {f'q_{i}': rng.choice('YN') for i in range(5)}
+            self.request('POST /audit_questionnaire/<report_id>', f'/audit_questionnaire/{report_id}', 'POST',
+                         expect=302, data=dict(answers, auditor_notes='load test', total_questions='5'))
+            self.request('POST /audit_reports', '/audit_reports', 'POST', data={
+                'report_id': report_id, 'status': 'approved', 'auditor_notes': 'load test'})
+        self.request('GET /assign_grades', '/assign_grades')
+        self.request('POST /assign_grades', '/assign_grades', 'POST', data={
+            'institute': rng.choice(INSTITUTES), 'grade': rng.choice(('A++', 'A+', 'A', 'B++'))})
+        self.request('GET /credits', '/credits')
+
+    def registrar(self):
+        # an admin: lands on /admin, sees every profile, exports
+        rng = self.rng
+        self.request('GET /admin', '/admin')
+        self.request('GET /dashboard', '/dashboard')
+        self.request('GET /faculty_details', '/faculty_details')
+        self.request('GET /search', '/search', query_string={'q': rng.choice(WORDS), 'kind': 'faculty_reports'})
+        # an integration pulling a page of each kind through the API
+        self.request('GET /api/v1/reports', '/api/v1/reports', headers={'Accept-Encoding': 'gzip'},
+                     query_string={'fields': 'id,title,status,institute,date', 'limit': 500})
+        name = list(SUBMIT_ROUTES)[self.iteration % len(SUBMIT_ROUTES)]
+        self.request('GET /api/v1/publications/<kind>', f'/api/v1/publications/{name}',
+                     headers={'Accept-Encoding': 'gzip'}, query_string={'institute': rng.choice(INSTITUTES)})
+        if self.iteration % 5 == 0:
+            self.request('GET /export/<name>.<fmt>', '/export/faculty_reports.csv',
+                         query_string={'institute': rng.choice(INSTITUTES)})
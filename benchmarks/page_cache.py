@@ -0,0 +1,64 @@
+"""Cost of serving the reports page: rendered, from the page cache, and 304.
+
+Fills a temporary data directory with faculty reports, then times GET
+/faculty_reports when every request renders (a save between requests),
+when the page comes from the cache, and when the browser revalidates its
+copy with If-None-Match.
+
+    python -m benchmarks.page_cache --reports 20000 --requests 300
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def timed(client, requests, headers=None, before=None):
+    start = time.perf_counter()
+    for _ in range(requests):
+        if before:
+            before()
+        response = client.get('/faculty_reports', headers=headers)
+    return (time.perf_counter() - start) / requests * 1000, response.status_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='iqac-pages-')
+    try:
+        with open(os.path.join(data_dir, 'faculty_reports.json'), 'w') as f:
+            json.dump([{'id': f'r{i:011d}', 'title': f'Report {i}', 'content': 'Teaching summary',
+                        'status': 'pending', 'date': '2024-01-01', 'approvals': {}}
+                       for i in range(args.reports)], f)
+        os.environ.update(IQAC_DATA_DIR=data_dir, IQAC_STORAGE='json')
+        os.environ.pop('IQAC_SHARED', None)
+        sys.path.insert(0, ROOT)
+        import app as portal
+
+        client = portal.app.test_client()
+        with client.session_transaction() as s:
+            s['role'] = 'hod'
+        etag = client.get('/faculty_reports').headers['ETag']
+        # bumping the version is what a save does to the cache
+        rendered, _ = timed(client, args.requests, before=lambda: portal.versions.bump('faculty_reports'))
+        cached, _ = timed(client, args.requests)
+        etag = client.get('/faculty_reports').headers['ETag']
+        revalidated, status = timed(client, args.requests, headers={'If-None-Match': etag})
+        print(f'{args.reports} reports: rendered {rendered:6.2f} ms  cached {cached:6.2f} ms  '
+              f'revalidated ({status}) {revalidated:6.2f} ms per request')
+        portal.store.close()
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Build, load and query times of the full-text search index.
+
+Indexes a synthetic corpus of research papers, then reloads the index from
+its stored token lists (what startup does) and times a mix of whole-word,
+prefix and multi-term queries.
+
+    python -m benchmarks.search_speed --docs 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = ('quality assurance higher education learning outcomes machine deep neural network '
+         'curriculum assessment accreditation student performance analysis mining teaching '
+         'pedagogy evaluation framework model optimisation thermal energy solar wind renewable '
+         'structural concrete bridge seismic polymer composite nanoparticle synthesis catalysis '
+         'protein genome sequencing clinical diabetes cardiac imaging segmentation transformer '
+         'language translation speech recognition robotics control drone agriculture crop yield '
+         'soil water irrigation supply chain logistics marketing finance banking blockchain').split()
+NAMES = ('Sharma Patil Kulkarni Deshmukh Joshi Rao Iyer Gupta Singh Khan Verma Nair Reddy '
+         'Mehta Shah Das Bose Pillai Menon Chavan').split()
+QUERIES = ('machine learning', 'deep neur', 'kulkarni', 'solar energy', 'qual assur educ',
+           'crop', 'segmentation imaging', 'blockchain finance', 'transformer', 'pa')
+
+
+def paper(rng, i):
+    return {
+        'title': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 12))) + f' {i}',
+        'authors': ', '.join(f'{rng.choice("ABCDEFGHIJ")}. {rng.choice(NAMES)}' for _ in range(rng.randint(1, 4))),
+        'journal_name': 'Journal of ' + ' '.join(rng.choice(WORDS) for _ in range(2)).title(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=100000)
+    parser.add_argument('--rounds', type=int, default=20, help='Times each query is run.')
+    args = parser.parse_args()
+    sys.path.insert(0, ROOT)
+    import search
+
+    rng = random.Random(1)
+    papers = [paper(rng, i) for i in range(args.docs)]
+
+    stored = {}
+    start = time.perf_counter()
+    index = search.SearchIndex(stored)
+    index.catch_up({'research_papers': papers})
+    print(f'index {args.docs} docs:     {time.perf_counter() - start:7.2f}s  '
+          f'({len(index.postings)} distinct tokens)')
+
+    start = time.perf_counter()
+    index = search.SearchIndex(stored)
+    print(f'load from stored index: {time.perf_counter() - start:7.2f}s')
+
+    timings = []
+    for query in QUERIES:
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            total, _ = index.search(query, limit=20)
+            timings.append(time.perf_counter() - start)
+        print(f'  {query!r:<24} {total:>7} matches')
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f'query p50 {statistics.median(timings) * 1000:7.1f} ms   p99 {p99 * 1000:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
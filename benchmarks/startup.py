@@ -0,0 +1,115 @@
+"""Worker start time and memory as the archive grows.
+
+For each size a fresh process imports the app over a data directory holding
+that many research papers (and a tenth as many faculty reports), then serves
+a dashboard request and finally a search, the first request that needs the
+publications.  Collections load on first use, so the import and the
+dashboard stay flat while only the search pays for the data.
+
+    python -m benchmarks.startup --sizes 0 10000 100000 --storage journal
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def paper(i):
+    return {
+        'title': f'Synthetic paper {i} on quality assurance in higher education',
+        'authors': 'A. Author, B. Author', 'journal_name': 'Journal of Benchmarks',
+        'year': str(2015 + i % 10), 'isbn_issn': '1234-5678', 'indexing': 'Scopus',
+        'link': f'https://example.org/papers/{i}', 'institute': 'JNEC',
+        'submitted_at': '2024-01-01T00:00:00',
+    }
+
+
+def report(i):
+    return {'id': f'r{i:011d}', 'title': f'Report {i}', 'content': 'Teaching and research summary',
+            'status': 'pending', 'date': '2024-01-01', 'approvals': {}}
+
+
+def rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(size):
+    # runs inside a fresh interpreter whose data directory was prepared by
+    # populate; the data is already on disk (and indexed) before it starts
+    sys.path.insert(0, ROOT)
+    base = rss()
+    start = time.perf_counter()
+    import app as portal
+    imported = time.perf_counter() - start
+    client = portal.app.test_client()
+    with client.session_transaction() as s:
+        s['role'] = 'hod'
+    start = time.perf_counter()
+    client.get('/dashboard')
+    dashboard = time.perf_counter() - start
+    after_dashboard = rss()
+    start = time.perf_counter()
+    client.get('/search', query_string={'q': 'quality'})
+    search = time.perf_counter() - start
+    print(f'{size:>8} papers  import {imported:6.2f}s  {after_dashboard - base:6.1f} MB  '
+          f'dashboard {dashboard * 1000:6.1f} ms  | first search {search:6.2f}s  {rss() - base:6.1f} MB',
+          flush=True)
+    portal.store.close()
+
+
+def populate(size, storage):
+    # write the collections, then open the app once so the analytics and
+    # search index are built and persisted as they would be in production
+    sys.path.insert(0, ROOT)
+    data_dir = os.environ['IQAC_DATA_DIR']
+    if storage != 'sqlite':
+        with open(os.path.join(data_dir, 'research_papers.json'), 'w') as f:
+            json.dump([paper(i) for i in range(size)], f)
+        with open(os.path.join(data_dir, 'faculty_reports.json'), 'w') as f:
+            json.dump([report(i) for i in range(size // 10)], f)
+    import app as portal
+    if storage == 'sqlite':
+        portal.app.config['RESEARCH_PAPERS'].extend(paper(i) for i in range(size))
+        portal.app.config['FACULTY_REPORTS'].extend(report(i) for i in range(size // 10))
+    with portal.store.locked('analytics', *portal.COUNTED):
+        portal.analytics.rebuild(portal.counted_collections())
+        portal.save_analytics()
+    portal.search_index.get()
+    portal.store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[0, 10000, 100000])
+    parser.add_argument('--storage', default='journal', choices=['json', 'journal', 'sqlite'])
+    parser.add_argument('--measure', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--populate', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.populate is not None:
+        populate(args.populate, args.storage)
+        return
+    if args.measure is not None:
+        measure(args.measure)
+        return
+
+    for size in args.sizes:
+        data_dir = tempfile.mkdtemp(prefix='iqac-startup-')
+        try:
+            env = dict(os.environ, IQAC_DATA_DIR=data_dir, IQAC_STORAGE=args.storage)
+            env.pop('IQAC_SHARED', None)
+            for step in ('--populate', '--measure'):
+                subprocess.run([sys.executable, '-m', 'benchmarks.startup', '--storage', args.storage,
+                                step, str(size)], cwd=ROOT, env=env, check=True)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Several worker processes submitting and approving against one data dir.
+
+Each worker imports the app in shared mode (IQAC_SHARED=1) on a common data
+directory, the way a multi-process WSGI server would, and through the Flask
+test client submits reports and research papers while approving reports as
+its own approver role.  Afterwards the data is reloaded from disk and every
+submission and decision must be present exactly once, and the dashboard
+counters must match a recount.
+
+    python -m benchmarks.stress_workers --workers 4 --iterations 50 --storage journal
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def worker(worker_id, data_dir, storage, iterations, compact_threshold, results):
+    os.environ.update(IQAC_DATA_DIR=data_dir, IQAC_STORAGE=storage, IQAC_SHARED='1')
+    sys.path.insert(0, ROOT)
+    if compact_threshold:
+        from storage import JournalBackend
+        JournalBackend.COMPACT_THRESHOLD = compact_threshold
+    import app as portal
+
+    role = portal.REQUIRED_APPROVERS[worker_id % len(portal.REQUIRED_APPROVERS)]
+    client = portal.app.test_client()
+    rng = random.Random(worker_id)
+    titles, papers, decisions = [], [], []
+    for i in range(iterations):
+        with client.session_transaction() as s:
+            s['role'] = 'faculty'
+        title = f'worker {worker_id} report {i}'
+        client.post('/faculty_reports', data={'report_title': title, 'report_content': 'stress'})
+        titles.append(title)
+        paper = f'worker {worker_id} paper {i}'
+        client.post('/submit_research_paper', data={'title': paper, 'year': '2025'})
+        papers.append(paper)
+
+        with client.session_transaction() as s:
+            s['role'] = role
+        client.get('/dashboard')  # picks up the other workers' writes
+        pending = portal.approval_index.pending_for(role)
+        if pending:
+            report_id = rng.choice(pending)
+            if role == 'auditor':
+                client.post('/audit_reports', data={'report_id': report_id, 'status': 'approved'})
+            else:
+                client.post('/faculty_reports', data={'report_id': report_id, 'action': 'approve'})
+            decisions.append((report_id, role))
+    portal.store.close()
+    results.put((worker_id, titles, papers, decisions))
+
+
+def verify(data_dir, storage, results):
+    sys.path.insert(0, ROOT)
+    from storage import open_store
+
+    store = open_store(storage, data_dir)
+    reports = list(store.load('faculty_reports', []))
+    papers = [p['title'] for p in store.load('research_papers', [])]
+    by_id = {r['id']: r for r in reports}
+    titles = [r['title'] for r in reports]
+    problems = []
+    if len(by_id) != len(reports):
+        problems.append('duplicate report ids')
+    for worker_id, worker_titles, worker_papers, decisions in results:
+        for title in worker_titles:
+            if titles.count(title) != 1:
+                problems.append(f'report {title!r} stored {titles.count(title)} times')
+        for paper in worker_papers:
+            if papers.count(paper) != 1:
+                problems.append(f'paper {paper!r} stored {papers.count(paper)} times')
+        for report_id, role in decisions:
+            if role not in (by_id.get(report_id, {}).get('approvals') or {}):
+                problems.append(f'{role} decision on {report_id} lost')
+    # the dashboard counters were updated by every worker in turn
+    from analytics import Analytics
+    collections = {name: store.load(name, []) for name in ('faculty_reports', 'research_papers')}
+    for key, stored, recounted in Analytics(store.load('analytics', {})).check(collections):
+        problems.append(f'counter {key}: stored {stored}, recounted {recounted}')
+    return reports, papers, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--storage', default='journal', choices=['json', 'journal', 'sqlite'])
+    parser.add_argument('--compact-threshold', type=int, default=0,
+                        help='journal size in bytes that triggers compaction (exercises reloads)')
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='iqac-stress-')
+    try:
+        ctx = multiprocessing.get_context('spawn')
+        results = ctx.Queue()
+        procs = [ctx.Process(target=worker, args=(w, data_dir, args.storage, args.iterations,
+                                                      args.compact_threshold, results))
+                 for w in range(args.workers)]
+        start = time.perf_counter()
+        for p in procs:
+            p.start()
+        collected = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+        reports, papers, problems = verify(data_dir, args.storage, collected)
+        decisions = sum(len(c[3]) for c in collected)
+        print(f'{args.workers} workers x {args.iterations} iterations ({args.storage}) in {elapsed:.1f}s: '
+              f'{len(reports)} reports, {len(papers)} papers, {decisions} decisions')
+        for problem in problems[:20]:
+            print('LOST:', problem)
+        if problems or any(p.exitcode for p in procs):
+            print(f'FAILED: {len(problems)} problems')
+            return 1
+        print('OK: nothing lost')
+        return 0
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Report bodies in a content-addressed, compressed pack file.
+
+A faculty report's long text (``FIELDS``) is kept out of the
+faculty_reports collection, which list pages, filters and every save go
+through: the report holds ``body``, the key of a blob with those fields.
+The key is a digest of the blob's JSON, so a blob never changes once
+written and identical bodies are stored once.
+
+Blobs are appended to one pack file, each a header line ``<key> <size>``
+followed by ``size`` bytes of zlib-compressed JSON.  Their offsets are kept
+in memory, read from the headers on first use and again, from the last
+known end, whenever a key is missing (a blob another worker appended).
+Reads use ``os.pread``, or with ``mmap=True`` slice a read-only memory map
+of the pack, which serves bodies from the page cache without a system call.
+
+Appends must not interleave across processes, so ``put`` is called inside
+``store.locked('faculty_reports')``.  A blob cut short by a crash can only
+be at the end of the pack; the next ``put`` truncates it.
+"""
+import hashlib
+import json
+import mmap as mmap_module
+import os
+import threading
+import zlib
+
+FIELDS = ('content', 'auditor_notes')
+
+# longest header: a 32-digit key, a space, a size and the newline
+HEADER_SIZE = 64
+
+
+class BlobStore:
+    def __init__(self, path, mmap=False, sync=True):
+        self.path = path
+        self.use_mmap = mmap
+        # fsync every append (durability=sync)
+        self.sync = sync
+        self.lock = threading.Lock()
+        self.open_lock = threading.Lock()
+        # key -> (offset, size) of its compressed data
+        self.offsets = {}
+        # end of the last complete blob indexed
+        self.end = 0
+        self.fd = None
+        self.map = None
+        self.written = 0
+
+    def open(self):
+        if self.fd is None:
+            with self.open_lock:
+                if self.fd is None:
+                    self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        return self.fd
+
+    def read(self, offset, size):
+        # a positioned read; without os.pread (Windows) call with self.lock held
+        if hasattr(os, 'pread'):
+            return os.pread(self.open(), size, offset)
+        os.lseek(self.open(), offset, os.SEEK_SET)
+        return os.read(self.fd, size)
+
+    def scan(self):
+        # index blobs appended since self.end; returns the pack's size. Call
+        # with self.lock held.
+        size = os.fstat(self.open()).st_size
+        while self.end < size:
+            line, newline, _ = self.read(self.end, HEADER_SIZE).partition(b'\n')
+            key, _, length = line.decode('ascii', 'replace').partition(' ')
+            if not newline or not length.isdigit():
+                break
+            start = self.end + len(line) + 1
+            if start + int(length) > size:
+                break
+            self.offsets[key] = (start, int(length))
+            self.end = start + int(length)
+        return size
+
+    def locate(self, key):
+        where = self.offsets.get(key)
+        if where is None:
+            with self.lock:
+                self.scan()
+                where = self.offsets.get(key)
+        if where is None:
+            raise KeyError(key)
+        return where
+
+    def get(self, key):
+        # the body stored under key (KeyError if there is none)
+        offset, size = self.locate(key)
+        if not self.use_mmap:
+            if hasattr(os, 'pread'):
+                return decode(self.read(offset, size))
+            with self.lock:
+                return decode(self.read(offset, size))
+        mapped = self.map
+        if mapped is None or len(mapped) < offset + size:
+            with self.lock:
+                if self.map is None or len(self.map) < offset + size:
+                    # the old map is left to readers still holding it
+                    self.map = mmap_module.mmap(self.open(), self.end, access=mmap_module.ACCESS_READ)
+                mapped = self.map
+        return decode(mapped[offset:offset + size])
+
+    def put(self, body):
+        # store body (a dict of strings) and return its key; call inside
+        # store.locked('faculty_reports')
+        text = json.dumps(body, sort_keys=True, separators=(',', ':')).encode()
+        key = hashlib.blake2b(text, digest_size=16).hexdigest()
+        if key in self.offsets:
+            return key
+        data = zlib.compress(text)
+        header = f'{key} {len(data)}\n'.encode()
+        with self.lock:
+            size = self.scan()
+            if key in self.offsets:
+                return key
+            if size > self.end:
+                os.ftruncate(self.fd, self.end)
+            os.lseek(self.fd, self.end, os.SEEK_SET)
+            os.write(self.fd, header + data)
+            if self.sync:
+                os.fsync(self.fd)
+            self.offsets[key] = (self.end + len(header), len(data))
+            self.end += len(header) + len(data)
+            self.written += len(header) + len(data)
+        return key
+
+    def close(self):
+        with self.lock:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+            self.map = None
+
+
+def decode(data):
+    return json.loads(zlib.decompress(data))
@@ -0,0 +1,259 @@
+"""Duplicate detection for publications.
+
+Exact duplicates in the same collection share a key (see ``keys``): the
+ISSN/ISBN plus the normalised title, or the DOI (failing that, the
+normalised link, when it points below a site's home page).
+``DuplicateIndex`` maps every key to the entry that first used it, so a
+submission is checked with a few dict lookups and handlers can refuse one
+whose keys are taken.
+
+``clusters`` is the batch pass over whole collections.  Besides shared keys
+it finds near-duplicate titles with MinHash: each title's character
+shingles are hashed once into ``BINS`` bins (one-permutation hashing), the
+signatures are cut into ``BANDS`` bands, and only titles landing in the same
+bucket for some band are compared.  Memory is a flat array of signatures
+plus one bucket table at a time.  Nothing is dropped: the pass returns the
+groups for someone to review.
+"""
+from array import array
+import re
+import unicodedata
+from urllib.parse import urlsplit
+
+from storage import index_fields
+
+# the ISSN/ISBN field, per collection (conference papers have none)
+IDENTIFIER_FIELDS = {
+    'research_papers': 'isbn_issn',
+    'book_publications': 'isbn',
+    'book_chapters': 'isbn',
+}
+
+DOI = re.compile(r'10\.\d{4,9}/[^\s"<>]+', re.I)
+# a site's home page ("springer.com", "ieee.org/index.html") names no paper
+HOME_PAGE = re.compile(r'(/(index|default|home)(\.\w+)?)?', re.I)
+
+# near-duplicate titles: character shingle length, signature bins and LSH
+# bands (BINS // BANDS rows each); a pair of titles with Jaccard similarity
+# 0.8 shares a bucket with probability ~0.98, at 0.7 ~0.89, at 0.5 ~0.4
+# (and is then rejected by the THRESHOLD check)
+SHINGLE = 4
+BINS = 32
+BANDS = 8
+THRESHOLD = 0.7
+# candidates whose signatures agree on fewer bins than this are not
+# compared in full (the estimate is rough, hence the slack)
+ESTIMATE_SLACK = 0.15
+# titles shorter than this ("Editorial") are only matched when identical
+MIN_TITLE = 12
+EMPTY = 0xffffffff
+
+
+def normalize_title(title):
+    text = title or ''
+    if not text.isascii():
+        # drop accents: 'Résumé' and 'Resume' are the same title
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(re.sub(r'[\W_]+', ' ', text.lower()).split())
+
+
+# an ISSN (8), ISBN-10 or ISBN-13 once separators are dropped; only the
+# ISSN and ISBN-10 end in a check letter X
+IDENTIFIER = re.compile(r'[0-9]{7}[0-9x]|[0-9]{9}[0-9x]|[0-9]{13}')
+
+
+def normalize_identifier(value):
+    # ISSN/ISBN digits (and check letter X); ISBN-10s become ISBN-13s so
+    # both forms of the same book match. Anything else ("81-XXX-XXXX-X",
+    # "applied for") is no identifier.
+    digits = re.sub(r'[^0-9x]', '', (value or '').lower())
+    if not IDENTIFIER.fullmatch(digits):
+        return None
+    if len(digits) == 10:
+        core = '978' + digits[:9]
+        check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(core)) % 10) % 10
+        return core + str(check)
+    return digits
+
+
+def normalize_link(value):
+    value = (value or '').strip()
+    doi = DOI.search(value)
+    if doi:
+        return 'doi:' + doi.group(0).rstrip('.,;').lower()
+    if not re.match(r'(https?://|www\.)', value, re.I):
+        # "NA", "-", "in press" and the like
+        return None
+    parts = urlsplit(value if '://' in value else 'http://' + value)
+    host = parts.netloc.lower().removeprefix('www.')
+    path = parts.path.rstrip('/')
+    if HOME_PAGE.fullmatch(path):
+        return None
+    return f'url:{host}{path}' + (f'?{parts.query}' if parts.query else '')
+
+
+def keys(name, entry):
+    """The exact-duplicate keys of a publication entry in collection name."""
+    result = []
+    field = IDENTIFIER_FIELDS.get(name)
+    identifier = normalize_identifier(entry.get(field)) if field else None
+    title = normalize_title(index_fields(name, entry).get('title'))
+    if identifier and title:
+        result.append(f'id:{name}:{identifier}:{title}')
+    link = normalize_link(entry.get('link'))
+    if link:
+        result.append(f'link:{name}:{link}')
+    return result
+
+
+class DuplicateIndex:
+    def __init__(self):
+        # key -> (collection, position) of the first entry using it
+        self.owners = {}
+
+    def build(self, collections):
+        self.owners.clear()
+        for name, entries in collections.items():
+            for position, entry in enumerate(entries):
+                self.add(name, position, entry)
+
+    def add(self, name, position, entry):
+        for key in keys(name, entry):
+            self.owners.setdefault(key, (name, position))
+
+    def find(self, name, entry):
+        # (collection, position) of an entry this one duplicates, or None
+        for key in keys(name, entry):
+            owner = self.owners.get(key)
+            if owner is not None:
+                return owner
+        return None
+
+    def claim(self, name, position, entry):
+        # Record an entry about to be stored at position unless it is a
+        # duplicate; returns the original's (collection, position) if so.
+        owner = self.find(name, entry)
+        if owner is None:
+            self.add(name, position, entry)
+        return owner
+
+
+def shingles(title):
+    padded = f' {title} '
+    return {padded[i:i + SHINGLE] for i in range(max(len(padded) - SHINGLE + 1, 1))}
+
+
+def similarity(a, b):
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+def signature(title):
+    # one-permutation MinHash: hash every shingle once, keep the minimum
+    # per bin, then fill empty bins from the next filled one (rotation)
+    sig = [EMPTY] * BINS
+    for shingle in shingles(title):
+        h = hash(shingle) & 0xffffffffffff
+        b = h % BINS
+        value = (h // BINS) & 0x7fffffff
+        if value < sig[b]:
+            sig[b] = value
+    for b in range(BINS):
+        if sig[b] == EMPTY:
+            for step in range(1, BINS):
+                filled = sig[(b + step) % BINS]
+                if filled != EMPTY and filled < 0x80000000:
+                    sig[b] = 0x80000000 | (filled + step) & 0x7fffffff
+                    break
+    return sig
+
+
+class Clusters:
+    # union-find over document numbers, remembering why groups were joined
+    def __init__(self):
+        self.parent = []
+        self.reasons = {}
+
+    def new(self):
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, doc):
+        root = doc
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[doc] != root:
+            self.parent[doc], doc = root, self.parent[doc]
+        return root
+
+    def union(self, a, b, reason):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[b] = a
+            self.reasons.setdefault(a, set()).update(self.reasons.pop(b, ()))
+        self.reasons.setdefault(a, set()).add(reason)
+
+    def groups(self):
+        members = {}
+        for doc in range(len(self.parent)):
+            root = self.find(doc)
+            if root in self.reasons:
+                members.setdefault(root, []).append(doc)
+        return [(docs, self.reasons[root]) for root, docs in members.items() if len(docs) > 1]
+
+
+def clusters(collections, threshold=THRESHOLD):
+    """Group duplicate publications within each of the given {name: entries}.
+
+    Returns [([(collection, position), ...], {reasons}), ...], largest group
+    first; reasons are 'identifier', 'link', 'same title' and 'similar title'.
+    """
+    found = Clusters()
+    docs, titles = [], []
+    owners = {}
+    signatures = array('I')
+    for name, entries in collections.items():
+        for position, entry in enumerate(entries):
+            doc = found.new()
+            docs.append((name, position))
+            for key in keys(name, entry):
+                if key in owners:
+                    found.union(owners[key], doc, 'identifier' if key.startswith('id:') else 'link')
+                else:
+                    owners[key] = doc
+            title = normalize_title(index_fields(name, entry).get('title'))
+            if title:
+                key = (name, title)
+                if key in owners:
+                    found.union(owners[key], doc, 'same title')
+                else:
+                    owners[key] = doc
+            titles.append(title)
+            signatures.extend(signature(title) if len(title) >= MIN_TITLE else [EMPTY] * BINS)
+    owners.clear()
+
+    rows = BINS // BANDS
+    for band in range(BANDS):
+        # one bucket table at a time; each doc is checked against the first
+        # doc of its bucket (in the same collection)
+        buckets = {}
+        for doc in range(len(docs)):
+            start = doc * BINS + band * rows
+            values = tuple(signatures[start:start + rows])
+            if values[0] == EMPTY:
+                continue
+            bucket = hash((docs[doc][0], values))
+            first = buckets.setdefault(bucket, doc)
+            if first == doc or found.find(first) == found.find(doc):
+                continue
+            a, b = first * BINS, doc * BINS
+            agree = sum(x == y for x, y in zip(signatures[a:a + BINS], signatures[b:b + BINS]))
+            if agree >= (threshold - ESTIMATE_SLACK) * BINS \
+                    and similarity(titles[first], titles[doc]) >= threshold:
+                found.union(first, doc, 'similar title')
+
+    result = [([docs[d] for d in members], reasons) for members, reasons in found.groups()]
+    result.sort(key=lambda group: (-len(group[0]), group[0][0]))
+    return result
+
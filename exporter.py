@@ -0,0 +1,165 @@
+"""CSV and XLSX exports of the publication and report collections.
+
+Exports are generators: rows are pulled from ``store.scan`` one at a time
+and written out in chunks of about ``CHUNK_SIZE`` bytes, so a Flask
+response streaming them keeps memory flat however large the collection.
+XLSX files are produced without a spreadsheet library: the workbook is a
+zip written in streaming mode (no seeking) with a single sheet of inline
+strings.
+"""
+import csv
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from importer import DATE_FIELDS, FIELDS
+from storage import index_fields
+
+CHUNK_SIZE = 64 * 1024
+
+# academic years run July-June, as in the NAAC AQAR calendar
+ACADEMIC_YEAR_START = 7
+
+COLUMNS = dict(
+    {name: ('institute', 'department') + fields + ('submitted_at',) for name, fields in FIELDS.items()},
+    faculty_reports=('id', 'title', 'content', 'institute', 'date', 'status',
+                     'auditor_notes', 'approvals'),
+)
+
+# field dating each entry, for the academic year filter
+DATES = dict(DATE_FIELDS, faculty_reports='date')
+
+# characters XML 1.0 does not allow, even escaped
+INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def academic_year(value):
+    # '2023-24' for any date from July 2023 to June 2024; a bare year counts
+    # as the academic year starting in it
+    match = re.match(r'\s*(\d{4})(?:-(\d{1,2}))?', value or '')
+    if not match:
+        return None
+    year = int(match.group(1))
+    month = int(match.group(2) or ACADEMIC_YEAR_START)
+    start = year if month >= ACADEMIC_YEAR_START else year - 1
+    return f'{start}-{(start + 1) % 100:02d}'
+
+
+def cell(name, entry, column):
+    if column == 'institute':
+        value = index_fields(name, entry).get('institute')
+    elif column == 'approvals':
+        value = '; '.join(f'{role}: {a.get("decision")}'
+                          for role, a in (entry.get('approvals') or {}).items())
+    else:
+        value = entry.get(column)
+    return '' if value is None else str(value)
+
+
+def rows(name, entries, year=None):
+    """Yield the cells of every (index, entry) pair in the given academic
+    year (all years when year is empty)."""
+    columns = COLUMNS[name]
+    for _, entry in entries:
+        if year and academic_year(entry.get(DATES[name])) != year:
+            continue
+        yield [cell(name, entry, column) for column in columns]
+
+
+def csv_stream(name, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # the byte order mark makes Excel read the file as UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(COLUMNS[name])
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+class Sink:
+    # write-only file for zipfile; having no seek/tell makes it stream
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'),
+}
+
+
+def xlsx_row(cells):
+    return '<row>' + ''.join(
+        '<c t="inlineStr"><is><t xml:space="preserve">'
+        f'{escape(INVALID_XML.sub("", value))}</t></is></c>' for value in cells) + '</row>'
+
+
+def xlsx_stream(name, rows):
+    sink = Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as workbook:
+        for part, xml in XLSX_PARTS.items():
+            workbook.writestr(part, xml)
+        workbook.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'))
+        # size unknown up front: force zip64 so huge sheets are allowed
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                         '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                         '<sheetData>' + xlsx_row(COLUMNS[name])).encode('utf-8'))
+            for row in rows:
+                sheet.write(xlsx_row(row).encode('utf-8'))
+                if sink.size >= CHUNK_SIZE:
+                    yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+FORMATS = {
+    'csv': (csv_stream, 'text/csv; charset=utf-8'),
+    'xlsx': (xlsx_stream, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
@@ -0,0 +1,58 @@
+"""Every grade each institute has been given, in time order.
+
+The ``grade_history`` collection maps an institute to its ``[[time, grade,
+source], ...]`` entries sorted by time (ISO strings, so they sort as text);
+entries are only ever added.  ``as_of`` finds the grade in force at a given
+time by bisecting an institute's entries, and ``trend`` does so for every
+institute at several points in time.
+
+The ``grades`` collection stays as it was, holding each institute's latest
+grade, so pages showing today's grades read it directly instead of the
+history.  Grades given before the history was kept are recorded with an
+empty time, which sorts before any real one.
+"""
+from bisect import bisect_right, insort
+from operator import itemgetter
+
+TIME = itemgetter(0)
+
+
+def upto(at):
+    # a bare date ('2024-06-30') stands for the end of that day
+    return at if 'T' in at else f'{at}T~'
+
+
+class GradeHistory:
+    """Queries and additions on the grade_history dict, edited in place."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def seed(self, grades):
+        # institutes graded before the history was kept; returns the keys to save
+        missing = [institute for institute in grades if institute not in self.data]
+        for institute in missing:
+            self.data[institute] = [['', grades[institute], '']]
+        return missing
+
+    def record(self, institute, grade, at, source=''):
+        entries = self.data.setdefault(institute, [])
+        entry = [at, grade, source]
+        if not entries or TIME(entries[-1]) <= at:
+            entries.append(entry)
+        else:
+            insort(entries, entry, key=TIME)
+
+    def as_of(self, institute, at):
+        # the grade institute had at time at, or None if it had none yet
+        entries = self.data.get(institute) or ()
+        i = bisect_right(entries, upto(at), key=TIME)
+        return entries[i - 1][1] if i else None
+
+    def entries(self, institute):
+        # [(time, grade, source)], newest first
+        return [tuple(entry) for entry in reversed(self.data.get(institute) or ())]
+
+    def trend(self, times):
+        # {institute: [grade as of each time]} for every graded institute
+        return {institute: [self.as_of(institute, at) for at in times] for institute in sorted(self.data)}
@@ -0,0 +1,301 @@
+"""Bulk import of publications from CSV or BibTeX files.
+
+Both readers stream the file row by row, so a department-sized export is
+never held in memory as text.  Rows are mapped onto the same entry dicts the
+``submit_*`` forms create, validated in batches of ``BATCH_SIZE``, and every
+rejected row is reported with its line number; the caller persists all
+accepted entries in one write per collection.
+
+CSV files carry one kind of publication, with the form field names as
+column headers (``title, authors, journal_name, year, ...``; case and
+spaces don't matter), plus optional ``institute`` and ``department``
+columns that override the defaults passed in.  BibTeX entries pick their collection from the entry
+type: ``@article`` -> research papers, ``@inproceedings`` -> conference
+papers, ``@book`` -> book publications, ``@incollection``/``@inbook`` ->
+book chapters.
+"""
+import csv
+from datetime import datetime
+
+from storage import year_of
+
+BATCH_SIZE = 500
+
+# recorded on every entry; a CSV column of the same name wins over the default
+CONTEXT_FIELDS = ('institute', 'department')
+
+# entry fields per collection, as stored by the submit_* handlers
+FIELDS = {
+    'research_papers': (
+        'title', 'authors', 'author_position', 'journal_name', 'year', 'volume',
+        'pages', 'isbn_issn', 'ugc_approved', 'journal_type', 'impact_factor',
+        'indexing', 'reviewed', 'link'),
+    'conference_papers': (
+        'title', 'authors', 'author_position', 'conference_name', 'conference_date',
+        'venue', 'proceedings_title', 'publication_details', 'indexing', 'link'),
+    'book_publications': (
+        'faculty_members', 'author_position', 'book_title', 'publisher_details',
+        'publication_type', 'isbn', 'publication_date', 'link'),
+    'book_chapters': (
+        'faculty_members', 'author_position', 'book_title', 'chapter_title',
+        'publisher_details', 'publication_type', 'isbn', 'publication_date', 'link'),
+}
+
+# fields an entry cannot be stored without
+REQUIRED = {
+    'research_papers': ('title',),
+    'conference_papers': ('title',),
+    'book_publications': ('book_title',),
+    'book_chapters': ('chapter_title', 'book_title'),
+}
+
+# the field whose leading year is checked, per collection
+DATE_FIELDS = {
+    'research_papers': 'year',
+    'conference_papers': 'conference_date',
+    'book_publications': 'publication_date',
+    'book_chapters': 'publication_date',
+}
+
+BIBTEX_KINDS = {
+    'article': 'research_papers',
+    'inproceedings': 'conference_papers',
+    'conference': 'conference_papers',
+    'book': 'book_publications',
+    'incollection': 'book_chapters',
+    'inbook': 'book_chapters',
+}
+
+# BibTeX field -> entry field, per collection (first match wins)
+BIBTEX_FIELDS = {
+    'research_papers': {
+        'title': 'title', 'author': 'authors', 'journal': 'journal_name',
+        'year': 'year', 'volume': 'volume', 'pages': 'pages', 'issn': 'isbn_issn',
+        'isbn': 'isbn_issn', 'url': 'link', 'doi': 'link', 'keywords': 'indexing',
+    },
+    'conference_papers': {
+        'title': 'title', 'author': 'authors', 'booktitle': 'conference_name',
+        'address': 'venue', 'location': 'venue', 'series': 'proceedings_title',
+        'publisher': 'publication_details', 'url': 'link', 'doi': 'link',
+        'keywords': 'indexing',
+    },
+    'book_publications': {
+        'title': 'book_title', 'author': 'faculty_members', 'editor': 'faculty_members',
+        'publisher': 'publisher_details', 'isbn': 'isbn', 'url': 'link', 'doi': 'link',
+    },
+    'book_chapters': {
+        'title': 'chapter_title', 'booktitle': 'book_title', 'author': 'faculty_members',
+        'publisher': 'publisher_details', 'isbn': 'isbn', 'url': 'link', 'doi': 'link',
+    },
+}
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def guess_format(filename):
+    return 'bibtex' if (filename or '').lower().endswith(('.bib', '.bibtex')) else 'csv'
+
+
+def read_csv(lines, kind):
+    # Yield (line number, collection, entry) for each CSV row of one kind.
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        return
+    headers = [(h or '').strip().lower().replace(' ', '_') for h in reader.fieldnames]
+    unknown = [h for h in headers if h and h not in FIELDS[kind] and h not in CONTEXT_FIELDS]
+    if unknown:
+        raise ImportFormatError(f'unknown columns for {kind}: {", ".join(unknown)}')
+    reader.fieldnames = headers
+    for row in reader:
+        entry = {k: (v or '').strip() for k, v in row.items() if k}
+        yield reader.line_num, kind, entry
+
+
+def read_bibtex(lines):
+    # Yield (line number, collection or None, entry) for each @entry; a
+    # small state machine over characters, so entries may span any number
+    # of lines and braces may nest.
+    entry = None
+    line_no = 0
+    for line_no, line in enumerate(lines, 1):
+        pos = 0
+        while pos < len(line):
+            if entry is None:
+                at = line.find('@', pos)
+                if at < 0:
+                    break
+                brace = line.find('{', at)
+                if brace < 0:
+                    break
+                entry_type = line[at + 1:brace].strip().lower()
+                pos = brace + 1
+                if entry_type in ('comment', 'preamble', 'string'):
+                    entry = {'skip': True, 'depth': 1, 'line': line_no}
+                else:
+                    entry = {'type': entry_type, 'fields': {}, 'line': line_no,
+                             'name': '', 'value': '', 'depth': 0,
+                             'quoted': False, 'state': 'key'}
+                continue
+            if entry.get('skip'):
+                # @comment/@preamble/@string: skip to the matching brace
+                ch = line[pos]
+                pos += 1
+                entry['depth'] += {'{': 1, '}': -1}.get(ch, 0)
+                if entry['depth'] == 0:
+                    entry = None
+                continue
+            pos, done = bibtex_step(entry, line, pos)
+            if done:
+                yield entry_result(entry)
+                entry = None
+    if entry is not None and not entry.get('skip'):
+        yield entry['line'], None, {'error': f'unterminated @{entry["type"]} entry'}
+
+
+def bibtex_step(entry, line, pos):
+    # Consume characters of one entry; returns (position, entry complete).
+    while pos < len(line):
+        ch = line[pos]
+        pos += 1
+        state = entry['state']
+        if state == 'key':
+            # citation key up to the first comma
+            if ch == ',':
+                entry['state'] = 'name'
+            elif ch == '}':
+                return pos, True
+        elif state == 'name':
+            if ch == '=':
+                entry['state'] = 'value'
+                entry['value'] = ''
+            elif ch == '}':
+                return pos, True
+            elif ch != ',':
+                entry['name'] += ch
+        elif state == 'value':
+            depth = entry['depth']
+            if depth == 0 and not entry['quoted']:
+                if ch == '{':
+                    entry['depth'] = 1
+                elif ch == '"':
+                    entry['quoted'] = True
+                elif ch in ',}':
+                    end_field(entry)
+                    if ch == '}':
+                        return pos, True
+                elif not ch.isspace() and ch != '#':
+                    # bare number or macro name
+                    entry['value'] += ch
+            elif entry['quoted'] and depth == 0 and ch == '"':
+                entry['quoted'] = False
+            else:
+                if ch == '{':
+                    entry['depth'] += 1
+                elif ch == '}':
+                    entry['depth'] -= 1
+                    if entry['depth'] == 0:
+                        continue
+                entry['value'] += ch
+    return pos, False
+
+
+def end_field(entry):
+    name = entry['name'].strip().lower()
+    if name:
+        entry['fields'][name] = ' '.join(entry['value'].replace('{', '').replace('}', '').split())
+    entry['name'] = ''
+    entry['value'] = ''
+    entry['state'] = 'name'
+
+
+def entry_result(parsed):
+    kind = BIBTEX_KINDS.get(parsed['type'])
+    if kind is None:
+        return parsed['line'], None, {'error': f'unsupported entry type @{parsed["type"]}'}
+    fields = parsed['fields']
+    entry = {}
+    for source, target in BIBTEX_FIELDS[kind].items():
+        value = fields.get(source)
+        if value and not entry.get(target):
+            if source in ('author', 'editor'):
+                value = ', '.join(name.strip() for name in value.split(' and '))
+            if source == 'doi' and not value.startswith('http'):
+                value = f'https://doi.org/{value}'
+            entry[target] = value
+    if fields.get('year') and kind != 'research_papers':
+        # conference/book dates are ISO strings in the forms
+        month = month_number(fields.get('month', ''))
+        entry[DATE_FIELDS[kind]] = f'{fields["year"]}-{month}' if month else fields['year']
+    return parsed['line'], kind, entry
+
+
+def month_number(month):
+    names = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+    month = month.strip().lower()[:3]
+    if month.isdigit() and 1 <= int(month) <= 12:
+        return f'{int(month):02d}'
+    if month in names:
+        return f'{names.index(month) + 1:02d}'
+    return None
+
+
+def validate(kind, entry):
+    # Return the problem with an entry, or None when it can be stored.
+    missing = [f for f in REQUIRED[kind] if not entry.get(f)]
+    if missing:
+        return f'missing {", ".join(missing)}'
+    date = entry.get(DATE_FIELDS[kind])
+    if date:
+        year = year_of(date)
+        if year is None or not 1900 <= year <= datetime.now().year + 1:
+            return f'invalid {DATE_FIELDS[kind]} {date!r}'
+    return None
+
+
+def parse(lines, fmt, kind=None, institute=None, department=None):
+    """Yield (line number, collection, entry, error) for every row of the
+    file; exactly one of entry and error is set."""
+    if fmt == 'csv':
+        if kind not in FIELDS:
+            raise ImportFormatError('choose which kind of publication the CSV file holds')
+        rows = read_csv(lines, kind)
+    elif fmt == 'bibtex':
+        rows = read_bibtex(lines)
+    else:
+        raise ImportFormatError(f'unknown import format: {fmt!r}')
+    defaults = {'institute': institute, 'department': department}
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            yield from check(batch, defaults)
+            batch = []
+    yield from check(batch, defaults)
+
+
+def check(batch, defaults):
+    submitted_at = datetime.now().isoformat()
+    for line, kind, entry in batch:
+        error = entry.get('error') if kind is None else validate(kind, entry)
+        if error:
+            yield line, kind, None, error
+            continue
+        context = {field: entry.get(field) or defaults.get(field) for field in CONTEXT_FIELDS}
+        entry = {field: entry.get(field) for field in FIELDS[kind]}
+        entry.update((field, value) for field, value in context.items() if value)
+        entry['submitted_at'] = submitted_at
+        yield line, kind, entry, None
+
+
+def collect(lines, fmt, kind=None, institute=None, department=None):
+    """Parse a whole file; returns ({collection: [(line, entry)]},
+    [(line, error)])."""
+    accepted, errors = {}, []
+    for line, found, entry, error in parse(lines, fmt, kind, institute, department):
+        if error:
+            errors.append((line, error))
+        else:
+            accepted.setdefault(found, []).append((line, entry))
+    return accepted, errors
@@ -0,0 +1,66 @@
+"""Load collections and build indexes the first time they are used.
+
+``LazyConfig`` is the app's config: a collection key (``RESEARCH_PAPERS``,
+...) that has not been read yet is loaded from the store on first access,
+so starting a worker no longer parses every collection and a request that
+never touches the publications never loads them.  ``Lazy`` does the same
+for the in-memory indexes built from the collections: it stands in for the
+index and builds it when an attribute is first used.
+
+Both build under the store's lock, which locked() blocks already hold, so
+a first use inside a handler's ``store.locked`` block cannot deadlock
+against another thread and two threads never load the same collection
+twice (the store must keep handing out the one live object).
+"""
+from flask import Config
+
+
+class LazyConfig(Config):
+    def __init__(self, config, store, loaders):
+        super().__init__(config.root_path, config)
+        self.store = store
+        # config key -> function returning the loaded collection
+        self.loaders = loaders
+
+    def __missing__(self, key):
+        loader = self.loaders.get(key)
+        if loader is None:
+            raise KeyError(key)
+        with self.store.lock:
+            if not dict.__contains__(self, key):
+                dict.__setitem__(self, key, loader())
+            return dict.__getitem__(self, key)
+
+    def __contains__(self, key):
+        return key in self.loaders or dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def loaded(self, key):
+        return dict.__contains__(self, key)
+
+
+class Lazy:
+    def __init__(self, store, build):
+        self._store = store
+        self._build = build
+        self._value = None
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
+
+    def get(self):
+        if self._value is None:
+            # locked() with no names: the store's in-process lock, and saves
+            # made by build wait for their flush only after it is released
+            with self._store.locked():
+                if self._value is None:
+                    self._value = self._build()
+        return self._value
+
+    def loaded(self):
+        return self._value is not None
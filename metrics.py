@@ -0,0 +1,221 @@
+"""Request, storage and template metrics in the Prometheus text format.
+
+``Registry`` holds counters, gauges and histograms keyed by label values
+and renders them for ``/metrics``; collectors registered with ``collect``
+add values read at scrape time (bytes the store has written).  Metrics are
+per process: with several workers, each one reports its own.
+
+``TimedStore`` wraps the store so every load and save is timed per
+collection, and ``SlowRequests`` logs requests that take longer than a
+threshold together with the stacks a background thread sampled while they
+ran.
+"""
+from collections import Counter
+import logging
+import os
+import sys
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def label_text(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{n}="{escape(v)}"' for n, v in zip(names, values)) + '}'
+
+
+class Metric:
+    def __init__(self, kind, name, help, labels=()):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        # label values -> value (histograms: [bucket counts, sum, count])
+        self.values = {}
+
+    def header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+
+class CounterMetric(Metric):
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def lines(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f'{self.name}{label_text(self.labels, k)} {v}' for k, v in items]
+
+
+class Gauge(CounterMetric):
+    def dec(self, *labels):
+        self.inc(*labels, amount=-1)
+
+
+class Histogram(Metric):
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        super().__init__('histogram', name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, seconds, *labels):
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += seconds
+            state[2] += 1
+
+    def lines(self):
+        with self.lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self.values.items())
+        lines = []
+        names = self.labels + ('le',)
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{label_text(names, labels + (bound,))} {cumulative}')
+            lines.append(f'{self.name}_bucket{label_text(names, labels + ("+Inf",))} {count}')
+            lines.append(f'{self.name}_sum{label_text(self.labels, labels)} {total:.6f}')
+            lines.append(f'{self.name}_count{label_text(self.labels, labels)} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.add(CounterMetric('counter', name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self.add(Gauge('gauge', name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=BUCKETS):
+        return self.add(Histogram(name, help, labels, buckets))
+
+    def collect(self, collector):
+        # collector() returns [(kind, name, help, labels, {label values: value})]
+        self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines += metric.header() + metric.lines()
+        for collector in self.collectors:
+            for kind, name, help, labels, values in collector():
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+                lines += [f'{name}{label_text(labels, k)} {v}' for k, v in sorted(values.items())]
+        return '\n'.join(lines) + '\n'
+
+
+class TimedStore:
+    """The store, with load and save timed into a histogram per collection;
+    everything else is passed through."""
+
+    def __init__(self, store, histogram):
+        self.store = store
+        self.histogram = histogram
+
+    def __getattr__(self, attr):
+        return getattr(self.store, attr)
+
+    def load(self, name, default):
+        start = time.perf_counter()
+        try:
+            return self.store.load(name, default)
+        finally:
+            self.histogram.observe(time.perf_counter() - start, 'load', name)
+
+    def save(self, name, data, changed=None):
+        start = time.perf_counter()
+        try:
+            return self.store.save(name, data, changed)
+        finally:
+            self.histogram.observe(time.perf_counter() - start, 'save', name)
+
+
+class SlowRequests:
+    """Log requests slower than threshold seconds with a stack profile.
+
+    While any request runs, a daemon thread samples the stack of every
+    request thread each interval; a slow request's log line lists its most
+    frequent stacks (innermost frame last), so the log shows where the time
+    went without profiling every request.
+    """
+
+    # stacks listed per slow request, and innermost frames kept per stack
+    TOP = 5
+    DEPTH = 12
+
+    def __init__(self, threshold, interval=0.01):
+        self.threshold = threshold
+        self.interval = interval
+        self.lock = threading.Lock()
+        # thread id -> Counter of sampled stacks, for requests in progress
+        self.running = {}
+        self.wake = threading.Event()
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            self.running[threading.get_ident()] = Counter()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.sample, name='slow-request-sampler', daemon=True)
+                self.thread.start()
+        self.wake.set()
+
+    def finish(self, description, seconds):
+        with self.lock:
+            samples = self.running.pop(threading.get_ident(), None)
+        if samples is None or seconds < self.threshold:
+            return False
+        stacks = '\n'.join(f'  {count} x {stack}' for stack, count in samples.most_common(self.TOP))
+        log.warning('slow request: %s took %.0f ms; sampled stacks every %.0f ms:\n%s',
+                    description, seconds * 1000, self.interval * 1000, stacks or '  (none sampled)')
+        return True
+
+    def sample(self):
+        me = threading.get_ident()
+        while True:
+            self.wake.wait()
+            with self.lock:
+                threads = list(self.running)
+                if not threads:
+                    self.wake.clear()
+                    continue
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is None or ident == me:
+                    continue
+                calls = []
+                while frame is not None and len(calls) < self.DEPTH:
+                    code = frame.f_code
+                    calls.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                    frame = frame.f_back
+                stack = ' > '.join(reversed(calls))
+                with self.lock:
+                    if ident in self.running:
+                        self.running[ident][stack] += 1
+            time.sleep(self.interval)
@@ -0,0 +1,65 @@
+"""Rendered pages cached against collection versions.
+
+``Versions`` keeps a counter per collection that the app bumps whenever the
+collection is saved (or changed by another worker), plus when that last
+happened.  A cached page is keyed on everything its HTML depends on,
+including the versions of the collections it shows, so a save never has to
+find and evict pages: the next request simply computes a new key.
+
+``PageCache`` holds the most recently used ``size`` pages and derives the
+ETag for a key.  The ETag mixes in a token chosen at startup because the
+counters are per process: another worker (or this one after a restart) may
+reach the same numbers with different data, and must not validate a
+client's copy.
+"""
+from collections import OrderedDict
+import hashlib
+import secrets
+import threading
+import time
+
+
+class Versions:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.times = {}
+        self.started = time.time()
+
+    def bump(self, name):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+            self.times[name] = time.time()
+
+    def key(self, names):
+        return tuple(self.counts.get(name, 0) for name in names)
+
+    def last_modified(self, names):
+        # when the newest of these collections last changed (as far as
+        # this process knows: startup counts as a change)
+        return max(self.times.get(name, self.started) for name in names)
+
+
+class PageCache:
+    def __init__(self, size=256):
+        self.size = size
+        self.lock = threading.Lock()
+        self.pages = OrderedDict()
+        self.token = secrets.token_hex(8)
+
+    def etag(self, key):
+        return hashlib.blake2b(f'{self.token}{key!r}'.encode(), digest_size=16).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            page = self.pages.get(key)
+            if page is not None:
+                self.pages.move_to_end(key)
+            return page
+
+    def put(self, key, page):
+        with self.lock:
+            self.pages[key] = page
+            self.pages.move_to_end(key)
+            while len(self.pages) > self.size:
+                self.pages.popitem(last=False)
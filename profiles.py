@@ -0,0 +1,60 @@
+"""Faculty profiles keyed by email.
+
+The ``faculty_profiles`` collection is a dict of normalised email ->
+profile, so saving the details form is one keyed upsert instead of another
+append to a list that only grows.  A resubmission with nothing changed
+writes nothing; a changed one records the previous values of just the
+fields that differ in the profile's ``history`` (newest last), from which
+``versions`` rebuilds every earlier state.
+
+``fold`` turns the old append-only ``faculty_details`` list into profiles,
+replaying its entries in order.
+"""
+
+FIELDS = ('name', 'email', 'phone', 'department')
+
+
+def profile_key(email):
+    return (email or '').strip().lower()
+
+
+def upsert(profiles, details, at):
+    """Store details (a dict of FIELDS) under their email's key; returns
+    the key when something changed, None for an identical resubmission."""
+    key = profile_key(details.get('email'))
+    if not key:
+        raise ValueError('a faculty profile needs an email address')
+    values = {field: (details.get(field) or '').strip() for field in FIELDS}
+    values['email'] = key
+    profile = profiles.get(key)
+    if profile is None:
+        profiles[key] = dict(values, created_at=at, updated_at=at, history=[])
+        return key
+    was = {field: profile.get(field, '') for field in FIELDS if profile.get(field, '') != values[field]}
+    if not was:
+        return None
+    # a new dict so cached references to the old version stay as they were
+    profiles[key] = dict(profile, **values, updated_at=at,
+                         history=profile.get('history', []) + [{'at': profile.get('updated_at'), 'was': was}])
+    return key
+
+
+def versions(profile):
+    """Yield (saved at, {field: value}) for every version, newest first."""
+    current = {field: profile.get(field, '') for field in FIELDS}
+    at = profile.get('updated_at')
+    for change in reversed(profile.get('history', [])):
+        yield at, dict(current)
+        current.update(change['was'])
+        at = change['at']
+    yield at, current
+
+
+def fold(entries):
+    # {key: profile} from the legacy faculty_details list; entries without
+    # an email cannot be keyed and are skipped
+    profiles = {}
+    for entry in entries:
+        if profile_key(entry.get('email')):
+            upsert(profiles, entry, entry.get('created_at'))
+    return profiles
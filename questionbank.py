@@ -0,0 +1,140 @@
+"""The audit question bank and compactly stored audit answers.
+
+The ``question_bank`` collection is a dict of three keys: ``questions``,
+every question ever asked (a question's id is its position, so ids never
+change); ``sets``, the question sets (a set's version is its position), each
+a list of question ids in the order they are asked; and ``current``, the
+version a new audit starts from.  Sets are never edited: adding questions
+to an audit makes (or reuses) another set.
+
+A report's answers are ``{'version': set, 'yes': bitmap, 'at': date}``, bit
+i being Y for the set's i-th question and the others N, instead of a dict
+keyed by each question's full text repeated in every report.  Reports
+audited before the bank existed keep such a dict in ``audit_answers``;
+``legacy`` converts one.
+
+``pass_rates`` aggregates all audits without visiting single answers: the
+bitmaps of the audits sharing a set, institute and period are written out
+as one string of binary digits, and a question's passes in the group are
+the ones counted along a strided slice of it, both in C, so the Python
+work is one step per audit rather than one per answer.
+"""
+DEFAULT_QUESTIONS = [
+    "Are teaching-learning processes satisfactory?",
+    "Is documentation complete and up-to-date?",
+    "Are learning outcomes assessed regularly?",
+    "Is faculty development activity documented?",
+    "Is student feedback handled appropriately?",
+]
+
+
+class QuestionBank:
+    """Lookups and additions on the question_bank dict, edited in place.
+
+    Methods that may add questions or sets take a set and add the keys they
+    changed to it, for the caller to save."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def seed(self):
+        # the default questionnaire as set 0 of an empty bank; returns the keys to save
+        if self.data.get('questions'):
+            return []
+        self.data.update(questions=list(DEFAULT_QUESTIONS), sets=[list(range(len(DEFAULT_QUESTIONS)))], current=0)
+        return ['questions', 'sets', 'current']
+
+    @property
+    def current(self):
+        return self.data['current']
+
+    def questions(self, version):
+        # [(question id, text)] of a set, in the order asked
+        texts = self.data['questions']
+        return [(i, texts[i]) for i in self.data['sets'][version]]
+
+    def question_id(self, text, changed):
+        texts = self.data['questions']
+        text = ' '.join(text.split())
+        if text in texts:
+            return texts.index(text)
+        texts.append(text)
+        changed.add('questions')
+        return len(texts) - 1
+
+    def version(self, ids, changed):
+        # the set asking exactly ids, in order, added if new
+        sets = self.data['sets']
+        ids = list(ids)
+        if ids in sets:
+            return sets.index(ids)
+        sets.append(ids)
+        changed.add('sets')
+        return len(sets) - 1
+
+    def extend(self, version, texts, changed):
+        # version's questions followed by texts (those not already in it)
+        ids = list(self.data['sets'][version])
+        for text in texts:
+            question = self.question_id(text, changed)
+            if question not in ids:
+                ids.append(question)
+        return self.version(ids, changed)
+
+    def legacy(self, answers, changed):
+        # {question text: 'Y'/'N'} -> (version, yes bitmap)
+        ids = list(dict.fromkeys(self.question_id(text, changed) for text in answers))
+        values = {self.question_id(text, changed): value for text, value in answers.items()}
+        return self.version(ids, changed), encode([values[i] for i in ids])
+
+    def answers(self, audit):
+        # [(question id, text, 'Y'/'N')] of a stored audit
+        yes = audit['yes']
+        return [(i, text, 'Y' if yes >> n & 1 else 'N') for n, (i, text) in enumerate(self.questions(audit['version']))]
+
+
+def encode(values):
+    # ['Y', 'N', ...] -> bitmap with bit n set for every Y
+    return sum(1 << n for n, value in enumerate(values) if value == 'Y')
+
+
+def pass_rates(sets, audits):
+    """Count passes per question, institute and period.
+
+    sets is the bank's ``sets`` list; audits yields (institute, period,
+    version, yes bitmap).  Returns {(question id, institute, period):
+    [passes, audits]}.
+    """
+    groups = {}
+    for institute, period, version, yes in audits:
+        groups.setdefault((version, institute, period), []).append(yes)
+    totals = {}
+    for (version, *group), values in groups.items():
+        ids = sets[version]
+        width = len(ids)
+        mask = (1 << width) - 1
+        if max(values) > mask:
+            values = [yes & mask for yes in values]
+        # the group's bitmaps as one string of width digits each: striding
+        # through it from a question's digit reads that question's answers
+        bits = ''.join(map(f'{{:0{width}b}}'.format, values))
+        for n, question in enumerate(ids):
+            count = totals.setdefault((question, *group), [0, 0])
+            count[0] += bits[width - 1 - n::width].count('1')
+            count[1] += len(values)
+    return totals
+
+
+def table(totals, by):
+    """Rows for the pass-rate view: ``(columns, rows)``, columns being the
+    institutes (by=0) or periods (by=1) seen and each row ``(question id,
+    [passes, audits] overall, {column: [passes, audits]})``."""
+    columns = sorted({key[1 + by] for key in totals})
+    rows = {}
+    for key, (passes, count) in totals.items():
+        overall, cells = rows.setdefault(key[0], ([0, 0], {}))
+        cell = cells.setdefault(key[1 + by], [0, 0])
+        for target in (overall, cell):
+            target[0] += passes
+            target[1] += count
+    return columns, [(question, *rows[question]) for question in sorted(rows)]
@@ -1,5 +1,7 @@
 @echo off
 echo "Installing dependencies..."
 "C:\Users\hp\AppData\Local\Programs\Python\Python314\python.exe" -m pip install -r requirements.txt
+echo "Building static files..."
+"C:\Users\hp\AppData\Local\Programs\Python\Python314\python.exe" -m flask --app app build-assets
 echo "Running the application..."
 "C:\Users\hp\AppData\Local\Programs\Python\Python314\python.exe" app.py
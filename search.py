@@ -0,0 +1,220 @@
+"""Full-text search over faculty reports and publications.
+
+``SearchIndex`` keeps an inverted index (token -> {document: weight}) in
+memory plus a sorted vocabulary for prefix matching.  Its source of truth is
+the ``search_index`` collection, a dict of ``"<collection>:<position>"`` ->
+``"token:weight token:weight ..."``: handlers index an entry when they store
+it and save the keys ``index`` returns, so the tokenized form is persisted
+(journaled) with the data and startup only rebuilds postings from it instead
+of re-tokenizing every document.  ``#<collection>`` keys record how many
+entries of each collection are indexed, so entries added behind the index's
+back (e.g. by a migration) are picked up by ``catch_up``.
+
+Queries match every term, each as a prefix of an indexed token (exact
+matches score higher), and rank documents by a tf-idf style score.
+"""
+import bisect
+import heapq
+import math
+import re
+
+# bump when tokenizing or FIELDS change so stored indexes are rebuilt
+VERSION = 1
+
+TOKEN = re.compile(r'\w+')
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has in is it its of on or that the this to was were with'.split())
+# shorter query terms only match whole tokens
+MIN_PREFIX = 2
+# tokens a single prefix may expand to
+MAX_EXPANSIONS = 200
+# score factor for a prefix (not whole-token) match
+PREFIX_FACTOR = 0.6
+
+# searched fields and their weights, per collection
+FIELDS = {
+    'faculty_reports': (('title', 3), ('content', 1), ('auditor_notes', 1)),
+    'research_papers': (('title', 3), ('authors', 2), ('journal_name', 2)),
+    'conference_papers': (('title', 3), ('authors', 2), ('conference_name', 2), ('proceedings_title', 1)),
+    'book_publications': (('book_title', 3), ('faculty_members', 2), ('publisher_details', 1)),
+    'book_chapters': (('chapter_title', 3), ('book_title', 2), ('faculty_members', 2)),
+}
+
+
+def tokenize(text):
+    return [t for t in TOKEN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def terms(name, entry):
+    # {token: weight} for one entry: field weight times occurrences
+    weights = {}
+    for field, weight in FIELDS[name]:
+        for token in tokenize(str(entry.get(field) or '')):
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def pack(weights):
+    return ' '.join(f'{token}:{weight}' for token, weight in weights.items())
+
+
+def unpack(packed):
+    weights = {}
+    for item in packed.split():
+        token, _, weight = item.rpartition(':')
+        weights[token] = int(weight)
+    return weights
+
+
+def doc_key(name, position):
+    return f'{name}:{position}'
+
+
+def parse_key(doc):
+    name, _, position = doc.rpartition(':')
+    return name, int(position)
+
+
+class SearchIndex:
+    def __init__(self, stored, resolve=None):
+        # the live search_index collection, shared with the store
+        self.stored = stored
+        # resolve(name, entry) -> the entry with every FIELDS value filled in
+        # (report bodies are stored apart from the reports)
+        self.resolve = resolve
+        self.postings = {}
+        self.docs = {}
+        self.vocabulary = []
+        self.load()
+
+    def load(self):
+        # rebuild the in-memory postings from the stored token lists
+        self.postings.clear()
+        self.docs.clear()
+        for doc, packed in self.stored.items():
+            if not doc.startswith('#'):
+                self.post(doc, unpack(packed), insort=False)
+        self.vocabulary = sorted(self.postings)
+
+    def current(self):
+        return self.stored.get('#version') == VERSION
+
+    def post(self, doc, weights, insort=True):
+        self.unpost(doc)
+        for token, weight in weights.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = {}
+                if insort:
+                    bisect.insort(self.vocabulary, token)
+            postings[doc] = weight
+        self.docs[doc] = tuple(weights)
+
+    def unpost(self, doc):
+        for token in self.docs.pop(doc, ()):
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(doc, None)
+                if not postings:
+                    del self.postings[token]
+                    i = bisect.bisect_left(self.vocabulary, token)
+                    if i < len(self.vocabulary) and self.vocabulary[i] == token:
+                        del self.vocabulary[i]
+
+    def index(self, name, position, entry):
+        # (Re)index one entry; returns the stored keys to save.
+        doc = doc_key(name, position)
+        weights = terms(name, self.resolve(name, entry) if self.resolve else entry)
+        self.post(doc, weights)
+        self.stored[doc] = pack(weights)
+        changed = [doc]
+        count_key = f'#{name}'
+        if self.stored.get(count_key, 0) <= position:
+            self.stored[count_key] = position + 1
+            changed.append(count_key)
+        return changed
+
+    def catch_up(self, collections):
+        # Index entries appended since the index was last saved (all of
+        # them after a version change); returns the keys to save, or None
+        # when everything was rebuilt.
+        if not self.current():
+            self.stored.clear()
+            self.stored['#version'] = VERSION
+            self.load()
+            for name, entries in collections.items():
+                for position, entry in enumerate(entries):
+                    self.index(name, position, entry)
+            return None
+        changed = []
+        for name, entries in collections.items():
+            for position in range(self.stored.get(f'#{name}', 0), len(entries)):
+                changed.extend(self.index(name, position, entries[position]))
+        return changed
+
+    def sync(self, changed):
+        # re-read stored keys another process wrote (None = everything)
+        if changed is None:
+            self.load()
+            return
+        for doc in changed:
+            if doc.startswith('#'):
+                continue
+            if doc in self.stored:
+                self.post(doc, unpack(self.stored[doc]))
+            else:
+                self.unpost(doc)
+
+    def expand(self, term):
+        # [(token, factor)] an indexed token a query term matches
+        matches = [(term, 1.0)] if term in self.postings else []
+        if len(term) < MIN_PREFIX:
+            return matches
+        start = bisect.bisect_left(self.vocabulary, term)
+        for token in self.vocabulary[start:start + MAX_EXPANSIONS + 1]:
+            if not token.startswith(term):
+                break
+            if token != term:
+                matches.append((token, PREFIX_FACTOR))
+        return matches
+
+    def search(self, query, limit=20, offset=0, names=None):
+        """Return (total matches, [(name, position, score), ...]) for the
+        best documents matching every term of query, optionally only from
+        the given collections."""
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms:
+            return 0, []
+        total_docs = max(len(self.docs), 1)
+        per_term = []
+        for term in query_terms:
+            scores = {}
+            for token, factor in self.expand(term):
+                # handlers index entries while other threads search: a token
+                # may have just lost its last document, and the postings are
+                # copied (one C-level step) before the loop below
+                postings = self.postings.get(token, {}).copy()
+                if not postings:
+                    continue
+                idf = math.log(1 + total_docs / len(postings))
+                for doc, weight in postings.items():
+                    score = factor * idf * weight / (weight + 1.2)
+                    if score > scores.get(doc, 0):
+                        scores[doc] = score
+            if not scores:
+                return 0, []
+            per_term.append(scores)
+        # intersect starting from the rarest term
+        per_term.sort(key=len)
+        totals = per_term[0]
+        if names:
+            prefixes = tuple(f'{name}:' for name in names)
+            totals = {doc: s for doc, s in totals.items() if doc.startswith(prefixes)}
+        for scores in per_term[1:]:
+            totals = {doc: s + scores[doc] for doc, s in totals.items() if doc in scores}
+        best = heapq.nlargest(offset + limit, totals.items(), key=lambda item: (item[1], item[0]))
+        hits = []
+        for doc, score in best[offset:]:
+            name, position = parse_key(doc)
+            hits.append((name, position, score))
+        return len(totals), hits
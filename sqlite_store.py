@@ -0,0 +1,633 @@
+"""SQLite storage backend.
+
+Every collection lives in ``iqac.db`` in the data directory.  Each row keeps
+the full entry as JSON in ``data`` plus the columns from
+``storage.index_fields`` so that status/institute/year/faculty/approver
+lookups are index scans rather than walks over the whole collection.
+
+Reports and publications are not loaded into memory: ``load`` hands back a
+``SqliteList`` that reads rows on demand, so memory use no longer grows with
+the number of entries ever submitted.  Institutes, grades, the analytics
+counters, the search index's token lists and the faculty profiles are
+loaded as a plain list/dict.
+
+Existing JSON files are imported with ``migrate_json`` (``flask migrate-json``,
+or ``python -m sqlite_store``, which works without importing the app and so
+also when the database cannot be opened).
+"""
+import argparse
+from contextlib import contextmanager
+import json
+import os
+import sqlite3
+import threading
+import weakref
+
+from approvals import legacy_report_ids
+from storage import (MutableSequence, JsonFileBackend, JournalBackend,
+                     PUBLICATION_KINDS, index_fields, page_of, replace_contents)
+
+DB_NAME = 'iqac.db'
+SCHEMA_VERSION = 8
+# rows of the changes log kept for workers that are lagging behind
+CHANGES_KEPT = 10000
+# durability mode -> PRAGMA synchronous: in WAL mode NORMAL only syncs at
+# checkpoints (one fsync covering many commits), OFF leaves it to the OS
+SYNCHRONOUS = {'sync': 'FULL', 'group': 'NORMAL', 'async': 'OFF'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    status TEXT,
+    institute TEXT,
+    year INTEGER,
+    date TEXT,
+    submitted_by TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_status ON reports (status);
+CREATE INDEX IF NOT EXISTS reports_date ON reports (date);
+CREATE INDEX IF NOT EXISTS reports_institute ON reports (institute);
+CREATE INDEX IF NOT EXISTS reports_year ON reports (year);
+CREATE INDEX IF NOT EXISTS reports_submitted_by ON reports (submitted_by);
+
+CREATE TABLE IF NOT EXISTS approvals (
+    report_id INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    decision TEXT NOT NULL,
+    notes TEXT,
+    time TEXT,
+    PRIMARY KEY (report_id, role)
+);
+CREATE INDEX IF NOT EXISTS approvals_role ON approvals (role, decision);
+
+CREATE TABLE IF NOT EXISTS publications (
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    title TEXT,
+    institute TEXT,
+    year INTEGER,
+    submitted_by TEXT,
+    indexing TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, id)
+);
+CREATE INDEX IF NOT EXISTS publications_institute ON publications (kind, institute);
+CREATE INDEX IF NOT EXISTS publications_year ON publications (kind, year);
+CREATE INDEX IF NOT EXISTS publications_submitted_by ON publications (kind, submitted_by);
+
+CREATE TABLE IF NOT EXISTS faculty (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    department TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS faculty_email ON faculty (email);
+
+CREATE TABLE IF NOT EXISTS grades (
+    institute TEXT PRIMARY KEY,
+    grade TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS counters (
+    key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+
+-- search.py token lists; untyped value so the '#' counts stay integers
+CREATE TABLE IF NOT EXISTS search_terms (
+    doc TEXT PRIMARY KEY,
+    terms
+);
+
+-- faculty profiles (profiles.py) as JSON, keyed by normalised email
+CREATE TABLE IF NOT EXISTS profiles (
+    email TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+-- the audit question bank (questionbank.py), each value JSON
+CREATE TABLE IF NOT EXISTS question_bank (
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+-- gradehistory.py: an institute's grades over time, as JSON
+CREATE TABLE IF NOT EXISTS grade_history (
+    institute TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS institutes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS documents (
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, id)
+);
+
+-- one row per write, so other processes can tell what changed since the
+-- last seq they saw; key is the entry position / grade key, NULL = all
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection TEXT NOT NULL,
+    key
+);
+"""
+
+# collection -> (table, kind or None, indexed columns)
+TABLES = {
+    'faculty_reports': ('reports', None, ('title', 'status', 'institute', 'year', 'date', 'submitted_by')),
+    'faculty_details': ('faculty', None, ('name', 'email', 'department')),
+    'credits': ('documents', 'credits', ()),
+}
+for _name, _kind in PUBLICATION_KINDS.items():
+    TABLES[_name] = ('publications', _kind, ('title', 'institute', 'year', 'submitted_by', 'indexing'))
+
+# dict collections -> (table, key column, value column)
+KEYED = {
+    'grades': ('grades', 'institute', 'grade'),
+    'analytics': ('counters', 'key', 'count'),
+    'search_index': ('search_terms', 'doc', 'terms'),
+    'faculty_profiles': ('profiles', 'email', 'data'),
+    'question_bank': ('question_bank', 'key', 'data'),
+    'grade_history': ('grade_history', 'institute', 'data'),
+}
+# keyed collections whose values are not plain strings or numbers, stored as JSON text
+ENCODED = {'faculty_profiles', 'question_bank', 'grade_history'}
+
+
+class Record(dict):
+    # plain dict subclass so loaded rows can be tracked with weak references
+    pass
+
+
+class SqliteList(MutableSequence):
+    """A collection whose entries stay in the database until indexed.
+
+    Entries handed out are remembered (weakly) by position, so a handler can
+    mutate ``data[i]`` in place and then call ``save(name, data, [i])``; it
+    must hold on to the entry until then, or the save fails.
+    """
+
+    def __init__(self, backend, name):
+        self.backend = backend
+        self.name = name
+        self.table, self.kind, self.columns = TABLES[name]
+        self.loaded = weakref.WeakValueDictionary()
+
+    def scope(self):
+        if self.kind is None:
+            return '1 = 1', ()
+        return 'kind = ?', (self.kind,)
+
+    def __len__(self):
+        where, params = self.scope()
+        row = self.backend.conn().execute(
+            f'SELECT COUNT(*) FROM {self.table} WHERE {where}', params).fetchone()
+        return row[0]
+
+    def record(self, index, data):
+        entry = self.loaded.get(index)
+        if entry is None:
+            entry = Record(json.loads(data))
+            self.loaded[index] = entry
+        return entry
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        entry = self.loaded.get(index)
+        if entry is not None:
+            return entry
+        where, params = self.scope()
+        row = self.backend.conn().execute(
+            f'SELECT data FROM {self.table} WHERE {where} AND id = ?',
+            params + (index,)).fetchone()
+        if row is None:
+            raise IndexError('collection index out of range')
+        return self.record(index, row[0])
+
+    def __iter__(self):
+        where, params = self.scope()
+        cursor = self.backend.conn().execute(
+            f'SELECT id, data FROM {self.table} WHERE {where} ORDER BY id', params)
+        while True:
+            rows = cursor.fetchmany(500)
+            if not rows:
+                return
+            for index, data in rows:
+                yield self.record(index, data)
+
+    def __setitem__(self, index, entry):
+        if index < 0:
+            index += len(self)
+        with self.backend.transaction() as db:
+            self.backend.write_row(db, self.name, index, entry)
+        self.loaded[index] = entry if isinstance(entry, Record) else Record(entry)
+
+    def __delitem__(self, index):
+        if index < 0:
+            index += len(self)
+        with self.backend.transaction() as db:
+            where, params = self.scope()
+            db.execute(f'DELETE FROM {self.table} WHERE {where} AND id = ?', params + (index,))
+            if self.table == 'reports':
+                db.execute('DELETE FROM approvals WHERE report_id = ?', (index,))
+            self.backend.shift(db, self.name, index + 1, -1)
+        self.loaded = weakref.WeakValueDictionary()
+
+    def insert(self, index, entry):
+        with self.backend.transaction() as db:
+            size = len(self)
+            index = min(max(index + size if index < 0 else index, 0), size)
+            if index < size:
+                self.backend.shift(db, self.name, index, 1)
+                self.loaded = weakref.WeakValueDictionary()
+            self.backend.write_row(db, self.name, index, entry)
+
+    def append(self, entry):
+        # new entries are written straight through
+        self.insert(len(self), entry)
+
+    def extend(self, entries):
+        # one transaction and one length lookup for the whole batch
+        with self.backend.transaction() as db:
+            size = len(self)
+            for offset, entry in enumerate(entries):
+                self.backend.write_row(db, self.name, size + offset, entry)
+
+    def cached(self, index):
+        return self.loaded.get(index)
+
+
+class SqliteBackend:
+    def __init__(self, data_dir='.', db_path=None, shared=False, durability='sync'):
+        self.data_dir = data_dir
+        self.db_path = db_path or os.path.join(data_dir, DB_NAME)
+        self.synchronous = SYNCHRONOUS[durability]
+        # writes are always serialized by the database; shared only decides
+        # whether the app refreshes collections before each request
+        self.shared = shared
+        self.lock = threading.RLock()
+        self.local = threading.local()
+        self.live = {}
+        self.listeners = []
+        # bytes of entry data written, per collection (exported as a metric)
+        self.written = {}
+        try:
+            db = self.conn()
+            init_db(db)
+        except sqlite3.DatabaseError as exc:
+            raise sqlite3.DatabaseError(
+                f'{self.db_path}: {exc}; rebuild it with "python -m sqlite_store --replace"') from exc
+        # last entry of the changes log already applied
+        self.seq = db.execute('SELECT COALESCE(MAX(seq), 0) FROM changes').fetchone()[0]
+
+    def wrote(self, name, value):
+        self.written[name] = self.written.get(name, 0) + len(str(value))
+
+    def conn(self):
+        # one connection per thread; WAL lets readers proceed during writes
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = connect(self.db_path, self.synchronous)
+            self.local.db = db
+        return db
+
+    @contextmanager
+    def transaction(self):
+        # reentrant: nested blocks join the outermost transaction
+        with self.lock:
+            db = self.conn()
+            depth = getattr(self.local, 'depth', 0)
+            if depth == 0:
+                db.execute('BEGIN IMMEDIATE')
+            self.local.depth = depth + 1
+            try:
+                yield db
+            except BaseException:
+                self.local.depth = depth
+                if depth == 0:
+                    db.execute('ROLLBACK')
+                raise
+            self.local.depth = depth
+            if depth == 0:
+                db.execute('COMMIT')
+
+    @contextmanager
+    def locked(self, *names):
+        # BEGIN IMMEDIATE takes the database write lock, which serializes
+        # read-modify-writes across threads and processes alike
+        with self.transaction():
+            self.refresh_all()
+            yield
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def refresh(self, name):
+        self.refresh_all()
+
+    def refresh_all(self):
+        # Apply the changes log written since we last looked: reload the small
+        # in-memory collections, forget cached entries, tell listeners.
+        with self.lock:
+            db = self.conn()
+            rows = db.execute('SELECT seq, collection, key FROM changes WHERE seq > ? ORDER BY seq',
+                              (self.seq,)).fetchall()
+            if not rows:
+                return
+            everything = rows[0][0] > self.seq + 1  # fell behind the pruned log
+            touched = {}
+            for _, name, key in rows:
+                keys = touched.setdefault(name, set())
+                if keys is not None:
+                    touched[name] = None if key is None else keys | {key}
+            self.seq = rows[-1][0]
+            for name, data in self.live.items():
+                if not everything and name not in touched:
+                    continue
+                changed = None if everything else touched[name]
+                if isinstance(data, SqliteList):
+                    if changed is None:
+                        data.loaded = weakref.WeakValueDictionary()
+                    else:
+                        for key in changed:
+                            data.loaded.pop(key, None)
+                else:
+                    replace_contents(data, self.load(name, type(data)()))
+                changed = None if changed is None else sorted(changed, key=str)
+                for listener in self.listeners:
+                    listener(name, changed)
+
+    def log_change(self, db, name, key=None):
+        seq = db.execute('INSERT INTO changes (collection, key) VALUES (?, ?)', (name, key)).lastrowid
+        if seq % 1000 == 0:
+            db.execute('DELETE FROM changes WHERE seq <= ?', (seq - CHANGES_KEPT,))
+
+    def write_row(self, db, name, index, entry):
+        table, kind, columns = TABLES[name]
+        fields = index_fields(name, entry)
+        names = ['id'] + (['kind'] if kind else []) + list(columns) + ['data']
+        values = [index] + ([kind] if kind else []) + [fields.get(c) for c in columns]
+        values.append(json.dumps(entry))
+        self.wrote(name, values[-1])
+        db.execute(f'INSERT OR REPLACE INTO {table} ({", ".join(names)}) '
+                   f'VALUES ({", ".join("?" * len(names))})', values)
+        self.log_change(db, name, index)
+        if table == 'reports':
+            db.execute('DELETE FROM approvals WHERE report_id = ?', (index,))
+            db.executemany(
+                'INSERT INTO approvals (report_id, role, decision, notes, time) VALUES (?, ?, ?, ?, ?)',
+                [(index, role, a.get('decision'), a.get('notes'), a.get('time'))
+                 for role, a in (entry.get('approvals') or {}).items()])
+
+    def shift(self, db, name, start, delta):
+        # Renumber ids >= start by delta; done through negative ids so the
+        # primary key never collides halfway through the update.
+        table, kind, _ = TABLES[name]
+        self.log_change(db, name)
+        where, params = ('kind = ? AND ', (kind,)) if kind else ('', ())
+        db.execute(f'UPDATE {table} SET id = -id - 1 WHERE {where}id >= ?', params + (start,))
+        db.execute(f'UPDATE {table} SET id = -id - 1 + ? WHERE {where}id < 0', (delta,) + params)
+        if table == 'reports':
+            db.execute('UPDATE approvals SET report_id = -report_id - 1 WHERE report_id >= ?', (start,))
+            db.execute('UPDATE approvals SET report_id = -report_id - 1 + ? WHERE report_id < 0', (delta,))
+
+    def load(self, name, default):
+        db = self.conn()
+        if name == 'institutes':
+            data = [r[0] for r in db.execute('SELECT name FROM institutes ORDER BY id')]
+        elif name in KEYED:
+            table, key, value = KEYED[name]
+            data = dict(db.execute(f'SELECT {key}, {value} FROM {table}'))
+            if name in ENCODED:
+                data = {k: json.loads(v) for k, v in data.items()}
+        elif name in TABLES:
+            data = SqliteList(self, name)
+        else:
+            return default
+        self.live.setdefault(name, data)
+        return data
+
+    def save(self, name, data, changed=None):
+        if isinstance(data, SqliteList):
+            # appends were written through; persist the entries edited in place
+            with self.transaction() as db:
+                for index in changed or ():
+                    entry = data.cached(index)
+                    if entry is None:
+                        # the edited entry was dropped (they are only held
+                        # weakly): fail rather than lose the edit
+                        raise RuntimeError(f'{name}[{index}] was changed but is no longer loaded; '
+                                           'keep edited entries referenced until they are saved')
+                    self.write_row(db, name, index, entry)
+            return
+        with self.transaction() as db:
+            if name == 'institutes':
+                db.execute('DELETE FROM institutes')
+                db.executemany('INSERT INTO institutes (id, name) VALUES (?, ?)', enumerate(data))
+                self.wrote(name, ''.join(data))
+                self.log_change(db, name)
+            elif name in KEYED:
+                table, column, value = KEYED[name]
+                keys = changed or list(data)
+                if not changed:
+                    db.execute(f'DELETE FROM {table}')
+                    self.log_change(db, name)
+                for key in keys:
+                    if changed:
+                        self.log_change(db, name, key)
+                    if key in data:
+                        stored = json.dumps(data[key]) if name in ENCODED else data[key]
+                        db.execute(f'INSERT OR REPLACE INTO {table} ({column}, {value}) VALUES (?, ?)',
+                                   (key, stored))
+                        self.wrote(name, stored)
+                    else:
+                        db.execute(f'DELETE FROM {table} WHERE {column} = ?', (key,))
+            elif name in TABLES:
+                # a plain list was swapped in; replace the whole collection
+                self.replace(db, name, data)
+
+    def replace(self, db, name, entries):
+        table, kind, _ = TABLES[name]
+        self.log_change(db, name)
+        if kind:
+            db.execute(f'DELETE FROM {table} WHERE kind = ?', (kind,))
+        else:
+            db.execute(f'DELETE FROM {table}')
+        if table == 'reports':
+            db.execute('DELETE FROM approvals')
+        for index, entry in enumerate(entries):
+            self.write_row(db, name, index, entry)
+
+    def where(self, name, filters):
+        table, kind, columns = TABLES[name]
+        clauses, params = [], []
+        if kind:
+            clauses.append('kind = ?')
+            params.append(kind)
+        for key, value in filters.items():
+            if value in (None, ''):
+                continue
+            if key == 'awaiting':
+                clauses.append("status = 'pending' AND NOT EXISTS (SELECT 1 FROM approvals a "
+                               "WHERE a.report_id = reports.id AND a.role = ?)")
+                params.append(value)
+            elif key == 'title_like':
+                clauses.append("title LIKE ? ESCAPE '\\'")
+                escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                params.append(f'%{escaped}%')
+            elif key in ('date_from', 'date_to') and 'date' in columns:
+                clauses.append('date >= ?' if key == 'date_from' else 'date <= ?')
+                params.append(value if key == 'date_from' else value + '\uffff')
+            elif key in columns:
+                clauses.append(f'{key} IS ?')
+                params.append(value)
+            else:
+                raise ValueError(f'{name} cannot be filtered on {key!r}')
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def page(self, name, data, limit=None, offset=0, newest_first=False, **filters):
+        if not isinstance(data, SqliteList):
+            return page_of(name, data, limit, offset, newest_first, **filters)
+        table = TABLES[name][0]
+        where, params = self.where(name, filters)
+        db = self.conn()
+        total = db.execute(f'SELECT COUNT(*) FROM {table}{where}', params).fetchone()[0]
+        sql = f'SELECT id, data FROM {table}{where} ORDER BY id {"DESC" if newest_first else "ASC"}'
+        if limit is not None or offset:
+            sql += ' LIMIT ? OFFSET ?'
+            params = params + [-1 if limit is None else limit, offset]
+        return total, [(index, data.record(index, row)) for index, row in db.execute(sql, params)]
+
+    def query(self, name, data, limit=None, offset=0, newest_first=False, **filters):
+        return self.page(name, data, limit, offset, newest_first, **filters)[1]
+
+    def rows(self, name, start, filters):
+        # (id, data) of the matching rows from id start on, in id order
+        table = TABLES[name][0]
+        where, params = self.where(name, filters)
+        if start:
+            where += f'{" AND" if where else " WHERE"} id >= ?'
+            params.append(start)
+        cursor = self.conn().execute(f'SELECT id, data FROM {table}{where} ORDER BY id', params)
+        while True:
+            rows = cursor.fetchmany(500)
+            if not rows:
+                return
+            yield from rows
+
+    def scan(self, name, data, start=0, **filters):
+        if not isinstance(data, SqliteList):
+            yield from JsonFileBackend.scan(self, name, data, start, **filters)
+            return
+        for index, row in self.rows(name, start, filters):
+            yield index, data.record(index, row)
+
+    def scan_text(self, name, data, start=0, **filters):
+        # rows are passed on as stored, without decoding them
+        if not isinstance(data, SqliteList):
+            yield from JsonFileBackend.scan_text(self, name, data, start, **filters)
+            return
+        yield from self.rows(name, start, filters)
+
+    def flush(self):
+        # every save is committed before it returns
+        pass
+
+    def close(self):
+        db = getattr(self.local, 'db', None)
+        if db is not None:
+            db.close()
+            self.local.db = None
+
+
+def connect(path, synchronous='NORMAL'):
+    db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute(f'PRAGMA synchronous={synchronous}')
+    return db
+
+
+# statements bringing a database at version N-1 up to version N
+UPGRADES = {
+    2: """
+    ALTER TABLE reports ADD COLUMN date TEXT;
+    UPDATE reports SET date = json_extract(data, '$.date');
+    """,
+    # the changes, counters, search_terms, profiles, question_bank and
+    # grade_history tables are created by SCHEMA
+    3: "",
+    4: "",
+    5: "",
+    6: "",
+    7: "",
+    8: "",
+}
+
+
+def init_db(db):
+    version = db.execute('PRAGMA user_version').fetchone()[0]
+    if version < SCHEMA_VERSION:
+        if version:
+            for step in range(version + 1, SCHEMA_VERSION + 1):
+                db.executescript(UPGRADES[step])
+        db.executescript(SCHEMA)
+        db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+
+def migrate_json(data_dir='.', db_path=None, replace=False):
+    """Import every JSON collection (journals included) into the database.
+
+    Returns a {collection: entry count} summary.
+    """
+    db_path = db_path or os.path.join(data_dir, DB_NAME)
+    if replace:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+    source = JournalBackend(data_dir)
+    backend = SqliteBackend(data_dir, db_path)
+    counts = {}
+    with backend.transaction() as db:
+        for name in TABLES:
+            entries = source.load(name, [])
+            if name == 'faculty_reports':
+                legacy_report_ids(entries)
+            backend.replace(db, name, entries)
+            counts[name] = len(entries)
+        institutes = source.load('institutes', [])
+        db.execute('DELETE FROM institutes')
+        db.executemany('INSERT INTO institutes (id, name) VALUES (?, ?)', enumerate(institutes))
+        counts['institutes'] = len(institutes)
+        for name, (table, column, value) in KEYED.items():
+            data = source.load(name, {})
+            db.execute(f'DELETE FROM {table}')
+            db.executemany(f'INSERT INTO {table} ({column}, {value}) VALUES (?, ?)',
+                           [(k, json.dumps(v) if name in ENCODED else v) for k, v in data.items()])
+            counts[name] = len(data)
+    backend.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import the JSON collections into the SQLite database.')
+    parser.add_argument('--data-dir', default=os.environ.get('IQAC_DATA_DIR', '.'))
+    parser.add_argument('--replace', action='store_true', help='Delete an existing (or malformed) database first.')
+    args = parser.parse_args()
+    for name, count in migrate_json(args.data_dir, replace=args.replace).items():
+        print(f'{name}: {count}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,854 @@
+"""Storage backends for the portal's JSON collections.
+
+Each collection (institutes, faculty_reports, grades, ...) is persisted as
+``<name>.json`` in the data directory.  Three backends are available:
+
+* ``json``    - rewrites the whole file on every save (the original
+                behaviour), but through a temp file + rename so a crash
+                can never leave a truncated collection behind.
+* ``journal`` - appends only the changed entries to ``<name>.json.journal``
+                (one JSON object per line) and folds the journal back into
+                the snapshot in a background thread once it grows past a
+                size threshold.
+* ``sqlite``  - stores every collection in ``iqac.db`` with indexed
+                columns (see sqlite_store.py); large collections are read
+                from the database on demand instead of held in memory.
+
+Select one with ``open_store(kind, data_dir)``.  With ``shared=True`` several
+processes (e.g. WSGI workers) can serve the same data directory: wrap each
+read-modify-write in ``store.locked(name)`` and call ``store.refresh_all()``
+before handling a request so changes made elsewhere are picked up.
+
+``durability`` decides when a save reaches the disk:
+
+* ``sync``  - before ``save`` returns (the default).
+* ``group`` - a background writer coalesces the saves of concurrent requests:
+              whatever arrives while one write is in progress goes out
+              together in the next, one write per collection.  Each request
+              still waits for the write that covers it.
+* ``async`` - saves are written every ``FLUSH_INTERVAL`` seconds (or after
+              ``BATCH_SIZE`` saves) and requests do not wait; up to one
+              interval of saves is lost if the process dies.
+
+``store.flush()`` writes everything pending and ``store.close()`` flushes on
+shutdown.  The sqlite backend maps the modes onto ``PRAGMA synchronous``.
+"""
+from bisect import bisect_left, insort
+from collections.abc import MutableSequence
+from contextlib import ExitStack, contextmanager
+from itertools import islice
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DURABILITY_MODES = ('sync', 'group', 'async')
+
+log = logging.getLogger(__name__)
+
+PUBLICATION_KINDS = {
+    'research_papers': 'research_paper',
+    'conference_papers': 'conference_paper',
+    'book_publications': 'book_publication',
+    'book_chapters': 'book_chapter',
+}
+
+
+def year_of(value):
+    match = re.match(r'\s*(\d{4})', value or '')
+    return int(match.group(1)) if match else None
+
+
+def index_fields(name, entry):
+    # Columns a collection is filtered on; the sqlite backend indexes them.
+    if name == 'faculty_reports':
+        return {
+            'title': entry.get('title'),
+            'status': entry.get('status'),
+            'institute': entry.get('audited_institute') or entry.get('institute'),
+            'year': year_of(entry.get('date')),
+            'date': entry.get('date'),
+            'submitted_by': entry.get('submitted_by'),
+        }
+    if name in PUBLICATION_KINDS:
+        return {
+            'title': entry.get('title') or entry.get('chapter_title') or entry.get('book_title'),
+            'institute': entry.get('institute'),
+            'year': year_of(entry.get('year') or entry.get('publication_date')
+                            or entry.get('conference_date') or entry.get('submitted_at')),
+            'submitted_by': entry.get('authors') or entry.get('faculty_members'),
+            'indexing': entry.get('indexing'),
+        }
+    if name == 'faculty_details':
+        return {
+            'name': entry.get('name'),
+            'email': entry.get('email'),
+            'department': entry.get('department'),
+        }
+    return {}
+
+
+def entry_matches(name, entry, filters):
+    # Equality on index_fields, plus a few special filters:
+    # awaiting=<role>, title_like=<substring>, date_from / date_to (ISO
+    # prefixes, both inclusive).
+    fields = index_fields(name, entry)
+    for key, value in filters.items():
+        if key == 'awaiting':
+            if not awaiting(entry, value):
+                return False
+        elif key == 'title_like':
+            if value.lower() not in (fields.get('title') or '').lower():
+                return False
+        elif key == 'date_from':
+            if (fields.get('date') or '') < value:
+                return False
+        elif key == 'date_to':
+            if (fields.get('date') or '') > value + '\uffff':
+                return False
+        elif fields.get(key) != value:
+            return False
+    return True
+
+
+def awaiting(entry, role):
+    # a pending report the given approver role has not decided on yet
+    return entry.get('status') == 'pending' and role not in (entry.get('approvals') or {})
+
+
+def page_of(name, data, limit=None, offset=0, newest_first=False, positions=None, **filters):
+    # Return (total matches, [(index, entry), ...]) for one window of the
+    # entries matching every filter (see entry_matches); empty filter
+    # values are ignored.  Position doubles as the submission-order key.
+    # positions (ascending) narrows the candidates to entries already known
+    # to match other filters.  Without per-entry filters only the window is
+    # touched.
+    filters = {k: v for k, v in filters.items() if v not in (None, '')}
+    if positions is None:
+        positions = range(len(data))
+    if newest_first:
+        positions = positions[::-1]
+    end = None if limit is None else offset + limit
+    if not filters:
+        return len(positions), [(i, data[i]) for i in positions[offset:end]]
+    total, window = 0, []
+    for i in positions:
+        entry = data[i]
+        if not entry_matches(name, entry, filters):
+            continue
+        if total >= offset and (end is None or total < end):
+            window.append((i, entry))
+        total += 1
+    return total, window
+
+
+# equality filters answered from a FieldIndex instead of a scan
+INDEXED_FIELDS = {
+    'faculty_reports': ('status', 'institute'),
+}
+
+
+class FieldIndex:
+    """Ascending positions per value of a list collection's INDEXED_FIELDS.
+
+    Entries appended since the last lookup are indexed by ``extend``;
+    ``update`` re-keys entries edited in place."""
+
+    def __init__(self, name):
+        self.name = name
+        self.fields = INDEXED_FIELDS[name]
+        # number of entries indexed, and the indexed values of each
+        self.size = 0
+        self.values = []
+        # field -> value -> ascending positions
+        self.positions = {field: {} for field in self.fields}
+
+    def keys(self, entry):
+        fields = index_fields(self.name, entry)
+        return tuple(fields.get(field) for field in self.fields)
+
+    def extend(self, data):
+        for i in range(self.size, len(data)):
+            keys = self.keys(data[i])
+            self.values.append(keys)
+            for field, value in zip(self.fields, keys):
+                self.positions[field].setdefault(value, []).append(i)
+        self.size = len(self.values)
+
+    def update(self, data, changed):
+        for i in changed:
+            if not isinstance(i, int) or not 0 <= i < self.size:
+                continue
+            old, new = self.values[i], self.keys(data[i])
+            for field, before, after in zip(self.fields, old, new):
+                if before != after:
+                    positions = self.positions[field][before]
+                    del positions[bisect_left(positions, i)]
+                    insort(self.positions[field].setdefault(after, []), i)
+            self.values[i] = new
+
+    def lookup(self, filters):
+        # (ascending positions matching the indexed filters, the filters
+        # left to check per entry); positions is None when none applies
+        indexed = [self.positions[field].get(filters[field], [])
+                   for field in self.fields if filters.get(field) not in (None, '')]
+        rest = {k: v for k, v in filters.items() if k not in self.fields}
+        if not indexed:
+            return None, rest
+        indexed.sort(key=len)
+        others = [set(positions) for positions in indexed[1:]]
+        return [i for i in indexed[0] if all(i in other for other in others)], rest
+
+
+def atomic_write(path, text):
+    # write next to the target and rename over it so readers only ever see
+    # the old or the new file, never a half-written one
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def file_stamp(path):
+    # cheap change marker: a rename or rewrite changes inode/mtime/size
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    # inter-process lock on path: exclusive for writers, shared for readers
+    with open(path, 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def replace_contents(data, fresh):
+    # reload in place so references held elsewhere (app.config) stay valid
+    if isinstance(data, dict):
+        data.clear()
+        data.update(fresh)
+    else:
+        data[:] = fresh
+
+
+class JsonFileBackend:
+    def __init__(self, data_dir='.', shared=False):
+        self.data_dir = data_dir
+        # shared: other processes write the same data directory, so writes
+        # take a file lock and collections are refreshed when they change
+        self.shared = shared
+        self.lock = threading.RLock()
+        # the live object last handed to load/save, per collection
+        self.live = {}
+        self.stamps = {}
+        self.held = {}
+        self.listeners = []
+        # bytes of JSON written, per collection (exported as a metric)
+        self.written = {}
+        # FieldIndex per list collection, built by the first filtered page
+        self.indexes = {}
+
+    def wrote(self, name, text):
+        self.written[name] = self.written.get(name, 0) + len(text)
+
+    def path(self, name):
+        return os.path.join(self.data_dir, f'{name}.json')
+
+    def read_snapshot(self, name, default):
+        try:
+            with open(self.path(name), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return default
+
+    def lock_path(self, name):
+        return self.path(name) + '.lock'
+
+    def stamp(self, name):
+        return file_stamp(self.path(name))
+
+    def load(self, name, default):
+        with self.lock:
+            # stamp before reading, so a rewrite racing the read is noticed
+            self.stamps[name] = self.stamp(name)
+            data = self.read_snapshot(name, default)
+            self.live[name] = data
+            return data
+
+    def save(self, name, data, changed=None, full=False):
+        # changed is only a hint for incremental backends; full forces a
+        # complete rewrite
+        with self.locked(name):
+            self.live[name] = data
+            text = json.dumps(data)
+            atomic_write(self.path(name), text)
+            self.wrote(name, text)
+            self.stamps[name] = self.stamp(name)
+            self.reindex(name, data, None if full else changed)
+
+    def flush(self):
+        # saves are written before they return
+        pass
+
+    def subscribe(self, listener):
+        # listener(name, changed) runs after changes made by another process
+        # are applied; changed lists the indexes/keys touched, None = all
+        self.listeners.append(listener)
+
+    @contextmanager
+    def locked(self, *names):
+        # Serialize a read-modify-write: within the block no other thread
+        # or (in shared mode) process writes these collections, and they
+        # have been brought up to date first.
+        with self.lock, ExitStack() as stack:
+            for name in sorted(names):
+                first = not self.held.get(name)
+                if self.shared and first:
+                    stack.enter_context(file_lock(self.lock_path(name)))
+                self.held[name] = self.held.get(name, 0) + 1
+                stack.callback(self.release, name)
+                if self.shared and first:
+                    self.refresh(name)
+            yield
+
+    def release(self, name):
+        self.held[name] -= 1
+
+    def refresh_all(self):
+        for name in list(self.live):
+            self.refresh(name)
+
+    def refresh(self, name):
+        with self.lock:
+            # a stat is enough to tell that nothing changed
+            if name not in self.live or self.stamp(name) == self.stamps.get(name):
+                return
+            if self.shared and not self.held.get(name):
+                # never read while a writer is halfway through a compaction
+                with file_lock(self.lock_path(name), shared=True):
+                    changed = self.catch_up(name)
+            else:
+                changed = self.catch_up(name)
+            if changed is None:
+                self.indexes.pop(name, None)
+            elif changed:
+                self.reindex(name, self.live[name], changed)
+            if changed is None or changed:
+                for listener in self.listeners:
+                    listener(name, changed)
+
+    def catch_up(self, name):
+        # Apply changes other processes wrote since we last looked; returns
+        # the indexes/keys touched, or None after a full reload.
+        stamp = self.stamp(name)
+        if stamp == self.stamps.get(name):
+            return []
+        self.stamps[name] = stamp
+        data = self.live[name]
+        replace_contents(data, self.read_snapshot(name, type(data)()))
+        return None
+
+    def page(self, name, data, limit=None, offset=0, newest_first=False, **filters):
+        # see page_of; status/institute filters on a live collection come
+        # from its FieldIndex
+        filters = {k: v for k, v in filters.items() if v not in (None, '')}
+        index = self.field_index(name, data) if filters else None
+        if index is None:
+            return page_of(name, data, limit, offset, newest_first, **filters)
+        with self.lock:
+            positions, rest = index.lookup(filters)
+        return page_of(name, data, limit, offset, newest_first, positions, **rest)
+
+    def field_index(self, name, data):
+        # the FieldIndex of a live list collection, with entries appended
+        # since the last lookup added; None for other data
+        if name not in INDEXED_FIELDS or data is not self.live.get(name) or not isinstance(data, list):
+            return None
+        with self.lock:
+            index = self.indexes.get(name)
+            if index is None or len(data) < index.size:
+                index = self.indexes[name] = FieldIndex(name)
+            index.extend(data)
+            return index
+
+    def reindex(self, name, data, changed):
+        # Keep a built FieldIndex in step with a save: hinted entries are
+        # re-keyed; an unhinted save that did not only append may have
+        # changed anything, so the index is rebuilt on next use.
+        index = self.indexes.get(name)
+        if index is None:
+            return
+        if changed:
+            index.update(data, changed)
+        elif not isinstance(data, list) or len(data) <= index.size:
+            del self.indexes[name]
+
+    def query(self, name, data, limit=None, offset=0, newest_first=False, **filters):
+        return self.page(name, data, limit, offset, newest_first, **filters)[1]
+
+    def scan(self, name, data, start=0, **filters):
+        # Yield (index, entry) for every match from index start on, oldest
+        # first, without building a list; for exports that must not hold a
+        # copy of the collection.
+        filters = {k: v for k, v in filters.items() if v not in (None, '')}
+        for i, entry in enumerate(islice(data, start, None), start):
+            if not filters or entry_matches(name, entry, filters):
+                yield i, entry
+
+    def scan_text(self, name, data, start=0, **filters):
+        # scan, with each entry as JSON text
+        for i, entry in self.scan(name, data, start, **filters):
+            yield i, json.dumps(entry)
+
+    def close(self):
+        pass
+
+
+class JournalBackend(JsonFileBackend):
+    # journal size (bytes) after which the collection is compacted
+    COMPACT_THRESHOLD = 1024 * 1024
+
+    def __init__(self, data_dir='.', shared=False, compact_threshold=None):
+        super().__init__(data_dir, shared)
+        if compact_threshold is not None:
+            self.COMPACT_THRESHOLD = compact_threshold
+        # number of list entries already persisted, per collection
+        self.persisted = {}
+        # bytes of the journal already applied, per collection
+        self.offsets = {}
+        self.compacting = set()
+
+    def journal_path(self, name):
+        return f'{self.path(name)}.journal'
+
+    def stamp(self, name):
+        # (snapshot stamp, journal stamp): compaction changes the first,
+        # appends the second
+        return file_stamp(self.path(name)), file_stamp(self.journal_path(name))
+
+    def load(self, name, default):
+        with self.lock:
+            self.stamps[name] = self.stamp(name)
+            data = self.read_snapshot(name, default)
+            ops, self.offsets[name] = self.read_journal(name)
+            for op in ops:
+                apply_op(data, op)
+            self.live[name] = data
+            if isinstance(data, list):
+                self.persisted[name] = len(data)
+            return data
+
+    def read_journal(self, name, offset=0):
+        # Return (ops, end offset) for the complete lines after offset; a
+        # torn final line (crash mid-append, or a writer still busy) is
+        # left for the next read.
+        try:
+            with open(self.journal_path(name), 'rb') as f:
+                f.seek(offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return [], 0
+        ops = []
+        for line in chunk.splitlines(keepends=True):
+            if not line.endswith(b'\n'):
+                break
+            try:
+                ops.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+            offset += len(line)
+        return ops, offset
+
+    def catch_up(self, name):
+        data = self.live[name]
+        # entries appended locally but not saved yet go back on the end
+        persisted = self.persisted.get(name, 0)
+        pending = []
+        if isinstance(data, list) and len(data) > persisted:
+            pending = data[persisted:]
+            del data[persisted:]
+        snapshot, journal = self.stamp(name)
+        known_snapshot, known_journal = self.stamps.get(name) or (None, None)
+        self.stamps[name] = (snapshot, journal)
+        size = journal[2] if journal else 0
+        offset = self.offsets.get(name, 0)
+        # the journal we have been reading, or a fresh one read from the start
+        same_journal = (journal and known_journal and journal[0] == known_journal[0]) or offset == 0
+        if snapshot != known_snapshot or not same_journal or size < offset:
+            # compacted (or rewritten) elsewhere: reload snapshot + journal
+            fresh = self.read_snapshot(name, type(data)())
+            ops, self.offsets[name] = self.read_journal(name)
+            for op in ops:
+                apply_op(fresh, op)
+            replace_contents(data, fresh)
+            changed = None
+        elif size == offset:
+            changed = []
+        else:
+            ops, self.offsets[name] = self.read_journal(name, offset)
+            for op in ops:
+                apply_op(data, op)
+            changed = [op.get('index', op.get('key')) for op in ops]
+        if isinstance(data, list):
+            self.persisted[name] = len(data)
+            if pending and changed:
+                # unsaved local entries moved up behind the new ones
+                changed.extend(range(len(data), len(data) + len(pending)))
+            data.extend(pending)
+        return changed
+
+    def save(self, name, data, changed=None, full=False):
+        with self.locked(name):
+            self.live[name] = data
+            self.reindex(name, data, None if full else changed)
+            ops = None if full else self.diff(name, data, changed)
+            if ops is None:
+                self.write_snapshot(name, data)
+                return
+            if ops:
+                self.append_ops(name, ops)
+
+    def diff(self, name, data, changed):
+        # Return the journal ops describing this save, or None when the
+        # change cannot be expressed incrementally (deletes, unhinted edits).
+        if isinstance(data, dict):
+            if not changed:
+                return None
+            return [{'op': 'set', 'key': k, 'value': data[k]} if k in data
+                    else {'op': 'del', 'key': k} for k in changed]
+        persisted = self.persisted.get(name, 0)
+        if len(data) < persisted or (not changed and len(data) == persisted):
+            return None
+        ops = [{'op': 'update', 'index': i, 'value': data[i]}
+               for i in (changed or ()) if 0 <= i < persisted]
+        ops.extend({'op': 'insert', 'index': i, 'value': data[i]}
+                   for i in range(persisted, len(data)))
+        self.persisted[name] = len(data)
+        return ops
+
+    def append_ops(self, name, ops):
+        path = self.journal_path(name)
+        text = ''.join(json.dumps(op) + '\n' for op in ops)
+        with open(path, 'a') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        self.wrote(name, text)
+        # we are caught up (see locked), so everything up to here is applied
+        self.offsets[name] = size
+        self.stamps[name] = self.stamp(name)
+        if size > self.COMPACT_THRESHOLD and name not in self.compacting:
+            self.compacting.add(name)
+            threading.Thread(target=self.compact, args=(name,), daemon=True).start()
+
+    def write_snapshot(self, name, data):
+        text = json.dumps(data)
+        atomic_write(self.path(name), text)
+        self.wrote(name, text)
+        # only drop the journal once the snapshot that covers it is in place
+        try:
+            os.remove(self.journal_path(name))
+        except FileNotFoundError:
+            pass
+        self.stamps[name] = self.stamp(name)
+        self.offsets[name] = 0
+        if isinstance(data, list):
+            self.persisted[name] = len(data)
+
+    def compact(self, name):
+        # Fold the journal into the snapshot without holding the lock while
+        # the collection is serialized and written: copy it under the lock,
+        # write the copy, then swap in the snapshot and what was appended to
+        # the journal meanwhile.  The copy goes to a temp file of its own, as
+        # other processes sharing the data directory may be compacting too.
+        path, journal = self.path(name), self.journal_path(name)
+        tmp = None
+        try:
+            with self.locked(name):
+                data = self.live[name]
+                if isinstance(data, list):
+                    # entries appended but not saved yet stay out
+                    data = data[:self.persisted.get(name, len(data))]
+                else:
+                    data = dict(data)
+                stamp = self.stamp(name)
+                offset = self.offsets.get(name, 0)
+            text = json.dumps(data)
+            fd, tmp = tempfile.mkstemp(dir=self.data_dir or '.', prefix=f'{name}.',
+                                       suffix='.json.compact.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            with self.locked(name):
+                snapshot, current = self.stamp(name)
+                if (snapshot != stamp[0] or not current or not stamp[1]
+                        or current[0] != stamp[1][0] or current[2] < offset):
+                    # rewritten or compacted meanwhile
+                    return
+                with open(journal, 'rb') as f:
+                    f.seek(offset)
+                    tail = f.read()
+                # snapshot first: replaying the whole old journal on top of
+                # it after a crash is harmless (see apply_op)
+                os.replace(tmp, path)
+                tmp = None
+                if tail:
+                    atomic_write(journal, tail.decode())
+                else:
+                    os.remove(journal)
+                self.wrote(name, text)
+                self.stamps[name] = self.stamp(name)
+                self.offsets[name] -= offset
+        except RuntimeError:
+            # collection mutated mid-serialisation; the next save retries
+            pass
+        finally:
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+            self.compacting.discard(name)
+
+    def close(self):
+        for name in list(self.live):
+            with self.locked(name):
+                if os.path.exists(self.journal_path(name)):
+                    self.write_snapshot(name, self.live[name])
+
+
+class GroupCommitWriter:
+    """Defers a file backend's saves to a background thread (see the module
+    docstring for the durability modes).  Everything but save/flush/close is
+    passed through to the backend."""
+
+    # seconds an async flush waits for more saves to join it, and the number
+    # of saves that triggers one early; group mode never waits, as its
+    # callers are blocked until the write
+    FLUSH_INTERVAL = 0.05
+    BATCH_SIZE = 64
+
+    def __init__(self, backend, mode='group', flush_interval=None, batch_size=None):
+        if mode not in ('group', 'async'):
+            raise ValueError(f'unknown deferred durability mode: {mode!r}')
+        self.backend = backend
+        self.mode = mode
+        if mode == 'group':
+            self.FLUSH_INTERVAL = 0
+        if flush_interval is not None:
+            self.FLUSH_INTERVAL = flush_interval
+        if batch_size is not None:
+            self.BATCH_SIZE = batch_size
+        self.cond = threading.Condition()
+        # name -> [data, changed indexes/keys, full rewrite needed]
+        self.dirty = {}
+        # list lengths as of the last save, to spot removals
+        self.lengths = {}
+        self.pending = 0
+        # batches taken by the writer / batches written (or failed)
+        self.taken = 0
+        self.flushed = 0
+        self.failure = None
+        self.forced = False
+        self.closing = False
+        self.thread = None
+        # per-thread: depth inside locked() and the batch a save waits for
+        self.local = threading.local()
+
+    def __getattr__(self, attr):
+        return getattr(self.backend, attr)
+
+    def load(self, name, default):
+        data = self.backend.load(name, default)
+        if isinstance(data, list):
+            self.lengths[name] = len(data)
+        return data
+
+    @contextmanager
+    def locked(self, *names):
+        # A group-mode save inside the block waits for its flush only once
+        # the block has released the backend lock the writer needs.
+        depth = getattr(self.local, 'depth', 0)
+        self.local.depth = depth + 1
+        try:
+            with self.backend.locked(*names):
+                yield
+        finally:
+            self.local.depth = depth
+            ticket = self.local.__dict__.pop('ticket', None) if depth == 0 else None
+        if ticket is not None:
+            self.wait(ticket)
+
+    def save(self, name, data, changed=None):
+        with self.cond:
+            entry = self.dirty.setdefault(name, [data, set(), False])
+            entry[0] = data
+            if changed:
+                entry[1].update(changed)
+            elif isinstance(data, dict) or len(data) <= self.lengths.get(name, 0):
+                # an unhinted edit or a removal cannot be journaled
+                entry[2] = True
+            if isinstance(data, list):
+                if len(data) < self.lengths.get(name, 0):
+                    entry[2] = True
+                self.lengths[name] = len(data)
+            self.pending += 1
+            ticket = self.taken + 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='group-commit', daemon=True)
+                self.thread.start()
+            if self.pending == 1 or self.pending >= self.BATCH_SIZE:
+                # wake the writer: a batch has started, or is full
+                self.cond.notify_all()
+        if self.mode == 'group':
+            if getattr(self.local, 'depth', 0):
+                self.local.ticket = ticket
+            else:
+                self.wait(ticket)
+
+    def wait(self, ticket):
+        with self.cond:
+            while self.flushed < ticket:
+                self.cond.wait()
+            if self.failure and self.failure[0] == ticket:
+                raise self.failure[1]
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.dirty and not self.closing:
+                    self.cond.wait()
+                if not self.dirty:
+                    return
+                # give more saves a moment to join this batch
+                deadline = time.monotonic() + self.FLUSH_INTERVAL
+                while (self.pending < self.BATCH_SIZE and not self.forced
+                       and not self.closing):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                batch, self.dirty = self.dirty, {}
+                self.pending = 0
+                self.forced = False
+                self.taken += 1
+                number = self.taken
+            failure = self.write(batch)
+            with self.cond:
+                if failure:
+                    self.failure = (number, failure)
+                    # keep the data dirty so the next batch retries it
+                    for name, (data, changed, full) in batch.items():
+                        entry = self.dirty.setdefault(name, [data, set(), False])
+                        entry[1].update(changed)
+                        entry[2] = entry[2] or full
+                self.flushed = number
+                self.cond.notify_all()
+
+    def write(self, batch):
+        for name, (data, changed, full) in batch.items():
+            try:
+                self.backend.save(name, data, tuple(changed), full=full)
+            except Exception as exc:
+                log.exception('flushing %s failed', name)
+                return exc
+        return None
+
+    def flush(self):
+        # Write everything saved so far before returning (for tests and
+        # shutdown); raises if that write failed.
+        with self.cond:
+            if self.dirty:
+                self.forced = True
+                ticket = self.taken + 1
+                self.cond.notify_all()
+            else:
+                # nothing new; just let a batch being written finish
+                ticket = self.taken
+        self.wait(ticket)
+
+    def close(self):
+        with self.cond:
+            self.closing = True
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+        if self.dirty:
+            # the writer gave up on a failing batch; last attempt inline
+            self.write(self.dirty)
+        self.backend.close()
+
+
+def apply_op(data, op):
+    # Replaying is idempotent: inserts carry their position, so a journal
+    # that survives a crash between snapshot and truncate replays cleanly.
+    kind = op.get('op')
+    if kind == 'set':
+        data[op['key']] = op['value']
+    elif kind == 'del':
+        data.pop(op['key'], None)
+    elif kind in ('insert', 'update'):
+        index = op['index']
+        if index < len(data):
+            data[index] = op['value']
+        elif index == len(data):
+            data.append(op['value'])
+
+
+BACKENDS = {
+    'json': JsonFileBackend,
+    'journal': JournalBackend,
+}
+
+
+def open_store(kind='journal', data_dir='.', shared=False, durability='sync'):
+    if kind == 'sqlite':
+        # imported lazily so the JSON backends never need sqlite3
+        from sqlite_store import SqliteBackend
+        BACKENDS.setdefault('sqlite', SqliteBackend)
+    try:
+        backend = BACKENDS[kind]
+    except KeyError:
+        raise ValueError(f'unknown storage backend: {kind!r}')
+    if durability not in DURABILITY_MODES:
+        raise ValueError(f'unknown durability mode: {durability!r}')
+    if kind == 'sqlite':
+        return backend(data_dir, shared=shared, durability=durability)
+    store = backend(data_dir, shared=shared)
+    if durability == 'sync':
+        return store
+    if shared:
+        # other workers would not see (and could overwrite) unflushed saves
+        raise ValueError(f'{durability!r} durability needs a single writer process; '
+                         'use sync with shared storage')
+    return GroupCommitWriter(store, durability)
+
+
+def is_collection(value):
+    # plain lists and the sqlite backend's lazy sequences both qualify
+    return isinstance(value, MutableSequence)
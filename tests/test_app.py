@@ -0,0 +1,43 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+pytest.importorskip('flask')
+
+
+@pytest.fixture
+def portal(tmp_path, monkeypatch):
+    monkeypatch.setenv('IQAC_DATA_DIR', str(tmp_path))
+    monkeypatch.setenv('IQAC_STORAGE', 'journal')
+    sys.modules.pop('app', None)
+    module = importlib.import_module('app')
+    yield module
+    module.store.close()
+    sys.modules.pop('app', None)
+
+
+def save_profile(client, email, name):
+    client.post('/faculty_details', data={'name': name, 'email': email, 'phone': '',
+                                          'department': 'Physics'})
+
+
+def test_viewing_a_profile_keeps_the_submitter(portal):
+    other = portal.app.test_client()
+    with other.session_transaction() as s:
+        s['role'] = 'faculty'
+    save_profile(other, 'other@example.edu', 'Other')
+
+    client = portal.app.test_client()
+    with client.session_transaction() as s:
+        s['role'] = 'faculty'
+    save_profile(client, 'me@example.edu', 'Me')
+    client.get('/faculty_details?email=other@example.edu')
+    client.post('/faculty_reports', data={'report_title': 'mine', 'report_content': 'body'})
+
+    report = next(r for r in portal.app.config['FACULTY_REPORTS'] if r['title'] == 'mine')
+    assert report['submitted_by'] == 'me@example.edu'
@@ -0,0 +1,32 @@
+import io
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import assets  # noqa: E402
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def test_build_makes_resized_progressive_backgrounds(tmp_path):
+    out = io.BytesIO()
+    Image.new('RGB', (1000, 500), 'navy').save(out, 'JPEG')
+    (tmp_path / 'images').mkdir()
+    (tmp_path / 'images' / 'bg.jpeg').write_bytes(out.getvalue())
+    (tmp_path / 'style.css').write_text("body { background-image: url('/static/images/bg.jpeg'); }\n")
+
+    files = assets.build(str(tmp_path))['files']
+
+    for width in assets.VARIANT_WIDTHS:
+        with Image.open(tmp_path / 'dist' / files[f'images/bg.{width}w.jpeg']) as image:
+            assert image.size == (width, width // 2)
+            assert image.info.get('progressive')
+    css = (tmp_path / 'dist' / files['style.css']).read_text()
+    assert f"url('{files['images/bg.jpeg']}')" in css
+    # the narrowest copy comes last, so it wins where both match
+    assert css.index(files['images/bg.800w.jpeg']) < css.index(files['images/bg.480w.jpeg'])
+    assert '@media (max-width: 480px)' in css
@@ -0,0 +1,71 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import dedup  # noqa: E402
+from dedup import DuplicateIndex  # noqa: E402
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1234-5678', '12345678'),
+    ('ISSN 2049-372X', '2049372x'),
+    ('0-306-40615-2', '9780306406157'),
+    ('978-0-306-40615-7', '9780306406157'),
+    ('81-XXX-XXXX-X', None),
+    ('applied for', None),
+    ('', None),
+])
+def test_identifiers(value, expected):
+    assert dedup.normalize_identifier(value) == expected
+
+
+@pytest.mark.parametrize('name, first, second, duplicate', [
+    # same ISSN and title, written differently
+    ('research_papers', {'title': 'Quality Audits', 'isbn_issn': '1234-5678'},
+     {'title': 'quality  audits!', 'isbn_issn': '12345678'}, True),
+    # same ISSN, another paper in the journal
+    ('research_papers', {'title': 'Quality Audits', 'isbn_issn': '1234-5678'},
+     {'title': 'Teaching Loads', 'isbn_issn': '1234-5678'}, False),
+    # ISBN-10 and ISBN-13 of the same book
+    ('book_publications', {'book_title': 'Audits', 'isbn': '0-306-40615-2'},
+     {'book_title': 'Audits', 'isbn': '9780306406157'}, True),
+    # a placeholder ISBN is no identifier
+    ('book_publications', {'book_title': 'Audits', 'isbn': '81-XXX-XXXX-X'},
+     {'book_title': 'Audits', 'isbn': '81-XXX-XXXX-X'}, False),
+    # a DOI, bare or as a link
+    ('conference_papers', {'title': 'A', 'link': '10.1000/XYZ123'},
+     {'title': 'B', 'link': 'https://doi.org/10.1000/xyz123.'}, True),
+    # the same page, with and without www and a trailing slash
+    ('research_papers', {'title': 'A', 'link': 'https://www.example.org/papers/7/'},
+     {'title': 'B', 'link': 'http://example.org/papers/7'}, True),
+    # a publisher's home page names no paper
+    ('research_papers', {'title': 'A', 'link': 'https://www.springer.com/index.html'},
+     {'title': 'B', 'link': 'https://springer.com'}, False),
+    ('research_papers', {'title': 'A', 'link': 'NA'}, {'title': 'B', 'link': 'NA'}, False),
+])
+def test_duplicates(name, first, second, duplicate):
+    index = DuplicateIndex()
+    assert index.claim(name, 0, first) is None
+    assert (index.claim(name, 1, second) == (name, 0)) is duplicate
+
+
+def test_duplicates_are_per_collection():
+    index = DuplicateIndex()
+    index.build({'research_papers': [{'title': 'A', 'link': '10.1000/xyz'}]})
+    assert index.find('conference_papers', {'title': 'A', 'link': '10.1000/xyz'}) is None
+
+
+def test_clusters_group_near_duplicate_titles():
+    papers = [
+        {'title': 'Outcome based education in engineering colleges'},
+        {'title': 'Outcome-based education in engineering colleges.'},
+        {'title': 'Outcome based educaton in engineering colleges'},
+        {'title': 'Library usage among postgraduate students'},
+    ]
+    groups = dedup.clusters({'research_papers': papers})
+    assert [sorted(members) for members, _ in groups] == [
+        [('research_papers', 0), ('research_papers', 1), ('research_papers', 2)]]
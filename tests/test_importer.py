@@ -0,0 +1,68 @@
+import io
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from importer import ImportFormatError, collect  # noqa: E402
+
+CSV_HEADER = 'Title,Authors,Journal Name,Year,ISBN ISSN\n'
+
+
+@pytest.mark.parametrize('rows, accepted, errors', [
+    ('A study,X,J,2021,1234-5678\n', ['A study'], []),
+    (',X,J,2021,\n', [], [(2, 'missing title')]),
+    ('Old,X,J,1850,\n', [], [(2, "invalid year '1850'")]),
+    ('Undated,X,J,soon,\n', [], [(2, "invalid year 'soon'")]),
+    ('Good,X,J,2020,\n,Y,J,2020,\nAlso good,Z,J,,\n', ['Good', 'Also good'], [(3, 'missing title')]),
+])
+def test_csv_rows(rows, accepted, errors):
+    found, problems = collect(io.StringIO(CSV_HEADER + rows), 'csv', 'research_papers', institute='JNEC')
+    assert [entry['title'] for _, entry in found.get('research_papers', [])] == accepted
+    assert all(entry['institute'] == 'JNEC' for _, entry in found.get('research_papers', []))
+    assert problems == errors
+
+
+@pytest.mark.parametrize('text, kind', [
+    ('Title,Colour\nA,red\n', 'research_papers'),
+    ('Title\nA\n', None),
+])
+def test_csv_format_errors(text, kind):
+    with pytest.raises(ImportFormatError):
+        collect(io.StringIO(text), 'csv', kind)
+
+
+BIBTEX = '''@comment{exported by a reference manager}
+@article{smith2021,
+  title = {Quality {Assurance} in Higher Education},
+  author = {Smith, A. and Rao, B.},
+  journal = "Journal of Audits",
+  year = 2021,
+  doi = {10.1000/xyz123}
+}
+@misc{note1, title = {A blog post}, year = 2020}
+@inproceedings{rao2022, title={Peer Review}, booktitle={ICQA}, year={2022}, month=mar}
+@book{nobody, author = {Rao, B.}, year = 2019}
+@incollection{ch1, title={Chapter One}, booktitle={Collected Works}, year={1890}}
+@article{broken, title = {Never closed}
+'''
+
+
+def test_bibtex_entries():
+    found, problems = collect(io.StringIO(BIBTEX), 'bibtex')
+    (_, article), = found['research_papers']
+    assert article['title'] == 'Quality Assurance in Higher Education'
+    assert article['authors'] == 'Smith, A., Rao, B.'
+    assert article['link'] == 'https://doi.org/10.1000/xyz123'
+    (_, paper), = found['conference_papers']
+    assert paper['conference_date'] == '2022-03'
+    assert set(found) == {'research_papers', 'conference_papers'}
+    assert problems == [
+        (9, 'unsupported entry type @misc'),
+        (11, 'missing book_title'),
+        (12, "invalid publication_date '1890'"),
+        (13, 'unterminated @article entry'),
+    ]
@@ -0,0 +1,60 @@
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import questionbank  # noqa: E402
+from questionbank import DEFAULT_QUESTIONS, QuestionBank  # noqa: E402
+
+
+def seeded():
+    bank = QuestionBank({})
+    bank.seed()
+    return bank
+
+
+def test_answers_round_trip_across_versions():
+    bank = seeded()
+    changed = set()
+    extended = bank.extend(0, ['Is the library catalogue current?', 'Are labs audited?'], changed)
+    assert extended == 1 and changed == {'questions', 'sets'}
+    rng = random.Random(5)
+    for version in (0, extended):
+        questions = bank.questions(version)
+        for _ in range(20):
+            values = [rng.choice('YN') for _ in questions]
+            audit = {'version': version, 'yes': questionbank.encode(values)}
+            assert [(i, text, value) for i, text, value in bank.answers(audit)] == [
+                (i, text, value) for (i, text), value in zip(questions, values)]
+    # the first set is untouched, and extending it again reuses the second
+    assert [text for _, text in bank.questions(0)] == DEFAULT_QUESTIONS
+    assert bank.extend(0, ['Are labs audited?', 'Is the library catalogue current?'], set()) != extended
+    assert bank.extend(0, ['Is the library catalogue current?', 'Are labs audited?'], set()) == extended
+
+
+def test_legacy_answers_keep_their_values():
+    bank = seeded()
+    answers = {DEFAULT_QUESTIONS[1]: 'Y', 'A question asked once': 'N', DEFAULT_QUESTIONS[0]: 'Y'}
+    version, yes = bank.legacy(answers, set())
+    audit = {'version': version, 'yes': yes}
+    assert {text: value for _, text, value in bank.answers(audit)} == answers
+
+
+def test_pass_rates_match_a_naive_count():
+    bank = seeded()
+    sets = bank.data['sets']
+    bank.extend(0, ['Extra question'], set())
+    bank.extend(1, ['Another one'], set())
+    rng = random.Random(7)
+    audits = [(rng.choice(['JNEC', 'IHM']), rng.choice(['2023', '2024']), rng.randrange(len(sets)),
+               rng.getrandbits(8)) for _ in range(300)]
+
+    expected = {}
+    for institute, period, version, yes in audits:
+        for n, question in enumerate(sets[version]):
+            count = expected.setdefault((question, institute, period), [0, 0])
+            count[0] += yes >> n & 1
+            count[1] += 1
+    assert questionbank.pass_rates(sets, audits) == expected
@@ -0,0 +1,131 @@
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import storage  # noqa: E402
+from storage import GroupCommitWriter, JournalBackend, JsonFileBackend, entry_matches  # noqa: E402
+
+
+def append_entries(data_dir, worker_id, count):
+    store = JournalBackend(data_dir, shared=True, compact_threshold=300)
+    reports = store.load('faculty_reports', [])
+    for i in range(count):
+        with store.locked('faculty_reports'):
+            reports.append({'title': f'worker {worker_id} report {i}', 'body': 'x' * 40})
+            store.save('faculty_reports', reports)
+    # let background compactions finish before folding the journal
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join()
+    store.close()
+
+
+def test_compaction_across_processes_keeps_every_entry(tmp_path):
+    workers, count = 6, 150
+    ctx = multiprocessing.get_context('spawn')
+    procs = [ctx.Process(target=append_entries, args=(str(tmp_path), w, count))
+             for w in range(workers)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(120)
+        assert proc.exitcode == 0
+
+    titles = [r['title'] for r in JournalBackend(str(tmp_path)).load('faculty_reports', [])]
+    expected = [f'worker {w} report {i}' for w in range(workers) for i in range(count)]
+    assert sorted(titles) == sorted(expected)
+    assert not [f for f in os.listdir(tmp_path) if f.endswith('.compact.tmp')]
+
+
+@pytest.mark.parametrize('backend', [JsonFileBackend, JournalBackend])
+def test_indexed_pages_match_a_scan(tmp_path, backend):
+    store = backend(str(tmp_path))
+    reports = store.load('faculty_reports', [])
+    rng = random.Random(3)
+    for step in range(120):
+        if step % 3 or not reports:
+            reports.append({'title': f'report {step}', 'status': rng.choice(['pending', 'approved']),
+                            'institute': rng.choice('AB')})
+            store.save('faculty_reports', reports)
+        else:
+            position = rng.randrange(len(reports))
+            reports[position]['status'] = rng.choice(['pending', 'approved', 'rejected'])
+            store.save('faculty_reports', reports, [position])
+        for filters in ({}, {'status': 'pending'}, {'status': 'approved', 'institute': 'B'},
+                        {'institute': 'A', 'title_like': '1'}):
+            expected = [i for i, r in enumerate(reports) if entry_matches('faculty_reports', r, filters)]
+            for newest_first in (False, True):
+                order = expected[::-1] if newest_first else expected
+                total, window = store.page('faculty_reports', reports, 5, 5, newest_first, **filters)
+                assert total == len(expected)
+                assert [i for i, _ in window] == order[5:10]
+
+
+def test_journal_replay_ignores_a_torn_last_line(tmp_path):
+    store = JournalBackend(str(tmp_path))
+    reports = store.load('faculty_reports', [])
+    for i in range(3):
+        reports.append({'title': f'report {i}'})
+        store.save('faculty_reports', reports)
+    # a crash halfway through appending the next entry
+    with open(store.journal_path('faculty_reports'), 'a') as f:
+        f.write('{"op": "insert", "index": 3, "value": {"tit')
+
+    reloaded = JournalBackend(str(tmp_path)).load('faculty_reports', [])
+    assert [r['title'] for r in reloaded] == ['report 0', 'report 1', 'report 2']
+
+
+def test_compaction_keeps_entries_appended_meanwhile(tmp_path):
+    store = JournalBackend(str(tmp_path), compact_threshold=10 ** 9)
+    reports = store.load('faculty_reports', [])
+    for i in range(20):
+        reports.append({'title': f'report {i}'})
+        store.save('faculty_reports', reports)
+    # a writer appending while the snapshot is being written
+    dumps = json.dumps
+
+    def dumps_then_append(data, *args, **kwargs):
+        text = dumps(data, *args, **kwargs)
+        if data is not reports and isinstance(data, list):
+            reports.append({'title': 'appended meanwhile'})
+            store.save('faculty_reports', reports)
+        return text
+
+    storage.json.dumps = dumps_then_append
+    try:
+        store.compact('faculty_reports')
+    finally:
+        storage.json.dumps = dumps
+
+    assert os.path.getsize(store.path('faculty_reports')) > 0
+    assert len(JournalBackend(str(tmp_path)).read_journal('faculty_reports')[0]) == 1
+    reloaded = JournalBackend(str(tmp_path)).load('faculty_reports', [])
+    assert [r['title'] for r in reloaded] == [f'report {i}' for i in range(20)] + ['appended meanwhile']
+
+
+@pytest.mark.parametrize('mode', ['group', 'async'])
+def test_group_commit_close_writes_every_save(tmp_path, mode):
+    # async saves would otherwise only reach the disk once a minute
+    writer = GroupCommitWriter(JournalBackend(str(tmp_path)), mode,
+                               flush_interval=60 if mode == 'async' else None)
+    reports = writer.load('faculty_reports', [])
+    grades = writer.load('grades', {})
+    for i in range(50):
+        with writer.locked('faculty_reports', 'grades'):
+            reports.append({'title': f'report {i}'})
+            writer.save('faculty_reports', reports)
+            grades[f'institute {i}'] = 'A'
+            writer.save('grades', grades, [f'institute {i}'])
+    writer.close()
+
+    store = JournalBackend(str(tmp_path))
+    assert len(store.load('faculty_reports', [])) == 50
+    assert len(store.load('grades', {})) == 50
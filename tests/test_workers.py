@@ -0,0 +1,77 @@
+"""A reduced benchmarks.stress_workers run: a couple of processes sharing one
+data directory, each writing and picking up the others' writes, must not
+lose anything."""
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import open_store  # noqa: E402
+
+BACKENDS = ['json', 'journal', 'sqlite']
+
+
+def submit_and_approve(data_dir, kind, worker_id, count):
+    store = open_store(kind, data_dir, shared=True)
+    reports = store.load('faculty_reports', [])
+    for i in range(count):
+        # what a worker does before each request
+        store.refresh_all()
+        with store.locked('faculty_reports'):
+            reports.append({'title': f'worker {worker_id} report {i}', 'approvals': {}})
+            store.save('faculty_reports', reports)
+        with store.locked('faculty_reports'):
+            # decide on the oldest report this worker has not decided on,
+            # whoever submitted it
+            position = next(p for p, r in enumerate(reports) if str(worker_id) not in r['approvals'])
+            report = reports[position]
+            report['approvals'][str(worker_id)] = {'decision': 'approved'}
+            reports[position] = report
+            store.save('faculty_reports', reports, [position])
+    store.close()
+
+
+@pytest.mark.parametrize('kind', BACKENDS)
+def test_workers_lose_no_writes(tmp_path, kind):
+    workers, count = 2, 8
+    ctx = multiprocessing.get_context('spawn')
+    procs = [ctx.Process(target=submit_and_approve, args=(str(tmp_path), kind, w, count))
+             for w in range(workers)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(120)
+        assert proc.exitcode == 0
+
+    store = open_store(kind, str(tmp_path))
+    reports = list(store.load('faculty_reports', []))
+    store.close()
+    titles = sorted(r['title'] for r in reports)
+    assert titles == sorted(f'worker {w} report {i}' for w in range(workers) for i in range(count))
+    decisions = [worker for r in reports for worker in r['approvals']]
+    for w in range(workers):
+        assert decisions.count(str(w)) == count
+
+
+@pytest.mark.parametrize('kind', BACKENDS)
+def test_app_workers_lose_no_submissions(tmp_path, kind):
+    pytest.importorskip('flask')
+    from benchmarks.stress_workers import verify, worker
+
+    workers, iterations = 2, 5
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(w, str(tmp_path), kind, iterations, 0, results))
+             for w in range(workers)]
+    for proc in procs:
+        proc.start()
+    collected = [results.get(timeout=120) for _ in procs]
+    for proc in procs:
+        proc.join(120)
+        assert proc.exitcode == 0
+    _, _, problems = verify(str(tmp_path), kind, collected)
+    assert problems == []